@@ -0,0 +1,148 @@
+# actor_learner.py
+# Asynchronous self-play: long-lived actor processes play game after game
+# and stream the finished games into a bounded queue, while the learner
+# trains on what has arrived. There is no per-batch barrier: actors keep
+# playing during fit, and pick up new weights from the shared weight store
+# (weight_store.py) at the start of their next game.
+#
+# Each game is tagged with the weight version it was played with; the
+# learner drops games more than max_staleness versions old, and the bounded
+# queue makes actors wait when the learner falls behind.
+#
+# TaskStream does the streaming half for an ordinary multiprocessing.Pool:
+# a window of tasks stays in flight and finished games come back one at a
+# time in completion order, so a long game no longer holds up a whole batch
+# the way pool.map did.
+
+import queue
+import traceback
+import multiprocessing as mp
+from collections import deque
+from weight_store import attach, task_bytes
+
+_ERROR = -1  # version tag of an actor's crash report
+
+def _actor_main(play_fn, handle, epsilon, results, stop, initializer, initargs):
+    try:
+        if initializer is not None:
+            initializer(*initargs)
+        store = attach(handle)
+        while not stop.is_set():
+            version = store.version
+            result = play_fn((handle, epsilon.value))
+            for game in (result if isinstance(result, list) else [result]):
+                while not stop.is_set():
+                    try:
+                        results.put((version, game), timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+    except Exception:
+        results.put((_ERROR, traceback.format_exc()))
+
+class ActorPool:
+    """
+    play_fn((weight handle, epsilon)) -> result: the trainers' simulation_worker, run in a loop
+    by num_actors processes (a list of results, e.g. from a batched worker, counts as that many
+    games). collect(n) returns the next n fresh results.
+    """
+    def __init__(self, play_fn, store, num_actors, epsilon=0.0, queue_size=None, max_staleness=2,
+                 initializer=None, initargs=()):
+        ctx = mp.get_context("spawn")
+        self.store = store
+        self.max_staleness = max_staleness
+        self.epsilon = ctx.Value("d", epsilon)
+        self.results = ctx.Queue(maxsize=queue_size or 2 * num_actors)
+        self.stop_event = ctx.Event()
+        self.actors = [ctx.Process(target=_actor_main, daemon=True,
+                                   args=(play_fn, store.handle(), self.epsilon, self.results, self.stop_event,
+                                         initializer, initargs))
+                       for _ in range(num_actors)]
+        self.received = 0
+        self.dropped = 0  # games older than max_staleness versions
+
+    def start(self):
+        for actor in self.actors:
+            actor.start()
+        return self
+
+    def set_epsilon(self, epsilon):
+        self.epsilon.value = epsilon
+
+    def collect(self, n):
+        """Block until n games played with weights at most max_staleness versions old have arrived."""
+        return list(self.stream(n))
+
+    def stream(self, n):
+        """collect(n) as a generator: each game as soon as it arrives."""
+        taken = 0
+        while taken < n:
+            version, result = self.results.get()
+            if version == _ERROR:
+                raise RuntimeError(f"actor crashed:\n{result}")
+            self.received += 1
+            if self.store.version - version > self.max_staleness:
+                self.dropped += 1
+                continue
+            taken += 1
+            yield result
+
+    def stop(self):
+        self.stop_event.set()
+        # Drain so no actor stays blocked on a full queue
+        while any(actor.is_alive() for actor in self.actors):
+            try:
+                self.results.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for actor in self.actors:
+            actor.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+class TaskStream:
+    """
+    Finished games from a multiprocessing.Pool in completion order. Up to window play_fn tasks are
+    kept in flight (apply_async, results through a queue). A task that returns a list (a batched
+    worker) arrives whole, when its last game ends, and its games are then handed out one by one:
+    those stream per task, not per game. set_task() changes what later submissions carry (weights,
+    epsilon); tasks already queued keep theirs. bytes_sent: pickled size of every task submitted.
+    """
+    def __init__(self, pool, play_fn, window):
+        self.pool = pool
+        self.play_fn = play_fn
+        self.window = window
+        self.results = queue.Queue()
+        self.ready = deque()  # games of returned tasks not handed out yet
+        self.task = None
+        self.task_size = 0
+        self.in_flight = 0
+        self.bytes_sent = 0
+
+    def set_task(self, task):
+        if task is not self.task:
+            self.task, self.task_size = task, task_bytes([task])
+
+    def _fill(self):
+        while self.in_flight < self.window:
+            self.pool.apply_async(self.play_fn, (self.task,), callback=self.results.put,
+                                  error_callback=self.results.put)
+            self.in_flight += 1
+            self.bytes_sent += self.task_size
+
+    def games(self, n):
+        """Generator over the next n finished games; the window is topped up as each task returns."""
+        for _ in range(n):
+            while not self.ready:
+                self._fill()
+                result = self.results.get()
+                self.in_flight -= 1
+                if isinstance(result, BaseException):
+                    raise RuntimeError("self-play task failed") from result
+                self.ready.extend(result if isinstance(result, list) else [result])
+                self._fill()  # keep the workers busy while the caller handles these games
+            yield self.ready.popleft()
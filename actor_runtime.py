@@ -0,0 +1,117 @@
+# actor_runtime.py
+# Per-process self-play objects for the trainers' worker pools. The pool
+# initializer builds the board, the teacher bound to it (with its incremental
+# score maps), the student and the adjudicator once; every game after that
+# starts with new_game(), which empties them in place (GameBoard.reset,
+# teacher.new_game, ThreatSolver.new_game) instead of constructing them
+# again. A batched actor (batched_actor.py) is kept the same way, so its
+# per-slot boards and teachers also live as long as the process.
+#
+#   python actor_runtime.py   per-game setup: built fresh vs reset, for each rule
+
+import os
+import sys
+import time
+from game_board import GameBoard
+from rl_ai_player import RL_AIPlayer
+from weight_store import sync_weights
+
+class ActorRuntime:
+    """
+    make_board() -> GameBoard; make_teacher(board) -> a teacher bound to it, with new_game().
+    model: the student network (NumpyNet, keras model, InferenceClient, ...).
+    adjudicator: optional ThreatSolver, shared by every game of the process.
+    served: the model is an InferenceClient, whose weights the server keeps current.
+    """
+    def __init__(self, make_board, make_teacher, model, adjudicator=None, served=False):
+        self.make_teacher = make_teacher
+        self.board = make_board()
+        self.teacher = make_teacher(self.board)
+        self.student = RL_AIPlayer(model=model)
+        self.adjudicator = adjudicator
+        self.served = served
+        self.batched = None
+        self.games = 0
+
+    @property
+    def model(self):
+        return self.student.model
+
+    def sync(self, weights):
+        """A task's weights (shared-memory handle or list) into the student; True if they changed."""
+        if self.served: return False
+        return sync_weights(self.student.model, weights)
+
+    def new_game(self):
+        """The empty board and its teacher, ready for the next game."""
+        if self.games:
+            self.board.reset()
+            self.teacher.new_game()
+            if self.adjudicator is not None: self.adjudicator.new_game()
+        self.games += 1
+        return self.board, self.teacher
+
+    def batched_actor(self, num_slots, student_color, teacher_move, move_reward, target_length=5):
+        """A BatchedSelfPlay with num_slots slots on this process's student, built on first use and kept."""
+        if self.batched is None or self.batched.num_slots != num_slots:
+            from batched_actor import BatchedSelfPlay
+            self.batched = BatchedSelfPlay(self.student.model, self.make_teacher, student_color, teacher_move,
+                                           move_reward, target_length=target_length, num_slots=num_slots,
+                                           adjudicator=self.adjudicator)
+        return self.batched
+
+def _benchmark(games=200):
+    """Per-game setup as the workers used to do it (everything built per game) vs ActorRuntime.new_game."""
+    from numpy_net import NumpyNet
+    from threat_search import ThreatSolver
+    from ai_player import AIPlayer
+    from ai_player_connect6 import AIPlayer as Connect6Teacher
+    from ai_player_connect4 import TeacherAI_4Row
+    from opening_book import get_book
+    rules = (("gomoku", 5, AIPlayer), ("connect6", 6, Connect6Teacher), ("connect4", 4, TeacherAI_4Row))
+
+    start = time.perf_counter()
+    RL_AIPlayer()  # what a worker without a kept model paid per game: build + compile (imports TensorFlow)
+    keras_s = time.perf_counter() - start
+    print(f"RL_AIPlayer() build + compile: {keras_s:.2f} s")
+    try:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        from gomoku_game import GomokuGame
+        start = time.perf_counter()
+        GomokuGame()  # train_connect4 built one (pygame init, display, fonts, sounds) per game
+        print(f"GomokuGame(): {time.perf_counter() - start:.2f} s")
+    except Exception as e:
+        print(f"GomokuGame() not timed ({e})")
+
+    for name, rule, teacher_class in rules:
+        def make_board():
+            return GameBoard(target_length=rule, track_runs=True, numpy_grid=True, track_frontier=True)
+
+        def make_teacher(board):
+            teacher = teacher_class(target_length=rule, book=get_book(rule))
+            teacher.bind_board(board, incremental=True)
+            return teacher
+
+        start = time.perf_counter()
+        for _ in range(games):
+            board = make_board()
+            make_teacher(board)
+            RL_AIPlayer(model=NumpyNet(None))
+            ThreatSolver(target_length=rule, max_nodes=200, time_ms=20)
+        fresh = (time.perf_counter() - start) / games
+
+        runtime = ActorRuntime(make_board, make_teacher, NumpyNet(None),
+                               ThreatSolver(target_length=rule, max_nodes=200, time_ms=20))
+        reset = 0.0
+        for _ in range(games):
+            start = time.perf_counter()
+            board, teacher = runtime.new_game()
+            reset += time.perf_counter() - start
+            for x, y in ((7, 7), (7, 8), (8, 8), (6, 6), (8, 7), (9, 6)):  # a few stones to undo
+                board.place_stone(x, y, 1 if board.move_count % 2 == 0 else -1)
+        reset /= games
+        print(f"{name:9s} per-game setup: built fresh {fresh * 1e3:7.2f} ms "
+              f"(+{keras_s:.2f} s with a Keras student), reset {reset * 1e6:7.1f} us")
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -2,9 +2,12 @@
 #####################
 from random import randint
 from constants import LEVEL, GRADE, MAX_SCORE
+from game_board import DIRECTIONS
+from incremental_eval import IncrementalScoreMap
+import threat_scanner
 
 class AIPlayer:
-    def __init__(self, target_length=5):
+    def __init__(self, target_length=5, scorer="python", solver=None, book=None):
         self.level = LEVEL
         self.grade = GRADE
         self.MAX_SCORE = MAX_SCORE
@@ -12,38 +15,107 @@ class AIPlayer:
         self.target_length = 5 
         self.WIN_LEN = 5
         self.THREAT_LEN = 4
+        self.board = None  # [NEW] optional GameBoard(track_runs=True) to read line counts from
+        # [NEW] "python": ray walk per cell; "numpy": threat_scanner (same scores, whole board at once)
+        self.scorer = scorer
+        self.evaluator = None  # [NEW] IncrementalScoreMap, see bind_board
+        self.solver = solver  # [NEW] optional threat_search.ThreatSolver: play a forced win as soon as one exists
+        self.book = book  # [NEW] optional opening_book.OpeningBook, consulted before anything else
+
+    def bind_board(self, board, incremental=False):
+        """
+        Read run lengths from board's run index while get_move is given board.grid.
+        incremental=True also keeps persistent score maps that only rescore the
+        lines through each new/undone stone.
+        """
+        self.board = board
+        self.evaluator = IncrementalScoreMap(board, self._direction_score) if incremental else None
+
+    def new_game(self):
+        """[NEW] Ready for another game on the bound board (after board.reset()) without rebuilding."""
+        self.ai_move_count = 0
+        if self.evaluator is not None: self.evaluator.reset()
+        if self.solver is not None: self.solver.new_game()
+
+    def _run_index(self, board_grid):
+        if self.board is not None and self.board.track_runs and self.board.grid is board_grid:
+            return self.board
+        return None
+
+    def _frontier(self, board_grid):
+        if self.board is not None and self.board.track_frontier and self.board.grid is board_grid:
+            return self.board
+        return None
 
     def get_move(self, board_grid, last_move_x, last_move_y, ai_color):
         self.ai_move_count += 1
+        if self.book is not None:
+            move = self.book.choose(board_grid, ai_color)
+            if move is not None: return move
         
         if self.ai_move_count < 2:
             return self._autoplay(board_grid, last_move_x, last_move_y)
         
-        score_self = self._evaluate_board(board_grid, ai_color)
-        
-        score_opponent = self._evaluate_board(board_grid, -ai_color)
+        if self.solver is not None:
+            board = self.board if self.board is not None and self.board.grid is board_grid else board_grid
+            line = self.solver.solve(board, ai_color)
+            if line: return line[0]
+
+        if self.scorer == "numpy" and self.evaluator is None:
+            # Both colors in one vectorized pass
+            score_self, score_opponent = threat_scanner.score_maps(self._board_array(board_grid), ai_color)
+        else:
+            score_self = self._evaluate_board(board_grid, ai_color)
+            
+            score_opponent = self._evaluate_board(board_grid, -ai_color)
 
-        best_move = self._get_best_move(score_self, score_opponent)
+        # [NEW] A cell next to a stone always outscores one that is not (some
+        # line through it has count 2), so the best moves are all in the radius-1 frontier
+        frontier = self._frontier(board_grid)
+        cells = frontier.candidates(1) if frontier is not None and frontier.move_count else None
+        best_move = self._get_best_move(score_self, score_opponent, cells)
         
         if best_move is None:
             return self._autoplay(board_grid, last_move_x, last_move_y)
             
         return best_move
 
+    def _board_array(self, board_grid):
+        """Bound GameBoard's int8 array when available (no list conversion), else the grid itself."""
+        if self.board is not None and self.board.numpy_grid and self.board.grid is board_grid:
+            return self.board.array
+        return board_grid
+
     def _evaluate_board(self, board, color):
+        if self.evaluator is not None and self.board.grid is board and color in self.evaluator.colors:
+            return self.evaluator.scores(color)
+        if self.scorer == "numpy":
+            return threat_scanner.score_map(self._board_array(board), color)
+
         scores = [[0 for _ in range(self.level)] for _ in range(self.level)]
         directions = [(1, 0), (0, 1), (1, 1), (1, -1)]
+        index = self._run_index(board)
 
         for x in range(self.level):
             for y in range(self.level):
                 if board[x][y] != 0: continue 
 
+                if index is not None:
+                    # O(1) per direction from the board's run index
+                    for count, open_end_1, open_end_2 in index.lines_through(x, y, color):
+                        self._score_line(scores, x, y, count, open_end_1, open_end_2)
+                    continue
+
                 for dx, dy in directions:
                     self._analyze_line(board, x, y, dx, dy, color, scores)
                     
         return scores
 
     def _analyze_line(self, board, x, y, dx, dy, color, scores):
+        count, open_end_1, open_end_2 = self._walk_line(board, x, y, dx, dy, color)
+        self._score_line(scores, x, y, count, open_end_1, open_end_2)
+
+    def _walk_line(self, board, x, y, dx, dy, color):
         count = 1 
         i, j = x + dx, y + dy
         while 0 <= i < self.level and 0 <= j < self.level and board[i][j] == color:
@@ -58,46 +130,60 @@ class AIPlayer:
             i -= dx
             j -= dy
         open_end_2 = (0 <= i < self.level and 0 <= j < self.level and board[i][j] == 0)
-
+        return count, open_end_1, open_end_2
+
+    def _direction_score(self, board, x, y, d, color):
+        """Score of one direction for the empty cell (x, y), used by the incremental evaluator."""
+        dx, dy = DIRECTIONS[d]
+        index = self._run_index(board)
+        if index is not None:
+            count, open_end_1, open_end_2 = index.line_stats(x, y, dx, dy, color)
+        else:
+            count, open_end_1, open_end_2 = self._walk_line(board, x, y, dx, dy, color)
+        return self._line_value(count, open_end_1, open_end_2)
+
+    def _score_line(self, scores, x, y, count, open_end_1, open_end_2):
+        scores[x][y] += self._line_value(count, open_end_1, open_end_2)
+
+    def _line_value(self, count, open_end_1, open_end_2):
         if count >= 5:
-            scores[x][y] += 100000
-            return
+            return 100000
 
         if count == 4 and open_end_1 and open_end_2:
-            scores[x][y] += 10000 
-            return
+            return 10000 
 
         if count == 4 and (open_end_1 or open_end_2):
-            scores[x][y] += 1000 
-            return
+            return 1000 
 
         if count == 3 and open_end_1 and open_end_2:
-            scores[x][y] += 1000 
-            return
+            return 1000 
 
         if count == 3 and (open_end_1 or open_end_2):
-            scores[x][y] += 100
-            return
+            return 100
             
         if count == 2 and open_end_1 and open_end_2:
-            scores[x][y] += 50
-            return
+            return 50
+
+        return count * 10
 
-        scores[x][y] += count * 10
+    def _get_best_move(self, score_self, score_opponent, cells=None):
+        """cells: optional row-major candidate list (e.g. GameBoard.candidates) instead of all 225."""
+        if hasattr(score_self, "shape") and cells is None:  # ndarray maps from threat_scanner
+            return threat_scanner.best_move(score_self, score_opponent)
 
-    def _get_best_move(self, score_self, score_opponent):
         max_score = -1
         best_moves = []
+        if cells is None:
+            cells = [(x, y) for x in range(self.level) for y in range(self.level)]
 
-        for x in range(self.level):
-            for y in range(self.level):
-                total_score = score_self[x][y] + (score_opponent[x][y] * 1.2)
-                
-                if total_score > max_score:
-                    max_score = total_score
-                    best_moves = [(x, y)]
-                elif total_score == max_score:
-                    best_moves.append((x, y))
+        for x, y in cells:
+            total_score = score_self[x][y] + (score_opponent[x][y] * 1.2)
+            
+            if total_score > max_score:
+                max_score = total_score
+                best_moves = [(x, y)]
+            elif total_score == max_score:
+                best_moves.append((x, y))
         
         if not best_moves: return None
         
@@ -118,6 +204,8 @@ class AIPlayer:
         return self._find_random_empty(ch)
 
     def _find_random_empty(self, ch):
+        frontier = self._frontier(ch)
+        if frontier is not None: return frontier.random_empty()
         empty_spots = []
         for i in range(self.level):
             for j in range(self.level):
@@ -1,6 +1,9 @@
 import random
 from random import randint
 
+from game_board import DIRECTIONS
+from incremental_eval import IncrementalScoreMap
+
 # --- CONFIGURATION ---
 # These constants define "How scared" the AI is of certain shapes.
 SCORE_WIN = 100000       # 4-in-a-row (Immediate Win)
@@ -14,10 +17,40 @@ class TeacherAI_4Row:
     Advanced Heuristic AI for 4-in-a-row.
     Adapted from the robust logic of ai_player.py
     """
-    def __init__(self, target_length=4):
+    def __init__(self, target_length=4, book=None):
         self.level = 15      # Board Size
         self.target_length = target_length 
         self.ai_move_count = 0
+        self.board = None  # Optional GameBoard(track_runs=True), see bind_board
+        self.evaluator = None  # Optional IncrementalScoreMap, see bind_board
+        self.book = book  # Optional opening_book.OpeningBook, consulted before evaluating
+
+    def bind_board(self, board, incremental=False):
+        """
+        Read run lengths from board's run index while get_move is given board.grid.
+        incremental=True also keeps persistent score maps: each move only rescores
+        the 4 lines through it, plus the radius-2 area where _has_neighbor can flip.
+        """
+        self.board = board
+        self.evaluator = None
+        if incremental:
+            self.evaluator = IncrementalScoreMap(board, self._direction_score,
+                                                 gate=self._has_neighbor, gate_radius=2)
+
+    def new_game(self):
+        """Ready for another game on the bound board (after board.reset()) without rebuilding."""
+        self.ai_move_count = 0
+        if self.evaluator is not None: self.evaluator.reset()
+
+    def _run_index(self, board_grid):
+        if self.board is not None and self.board.track_runs and self.board.grid is board_grid:
+            return self.board
+        return None
+
+    def _frontier(self, board_grid):
+        if self.board is not None and self.board.track_frontier and self.board.grid is board_grid:
+            return self.board
+        return None
 
     def get_move(self, board_grid, last_x=-1, last_y=-1, ai_color=2):
         """
@@ -25,6 +58,9 @@ class TeacherAI_4Row:
         - ai_color: The color the Teacher is playing (usually 2/White)
         """
         self.ai_move_count += 1
+        if self.book is not None:
+            move = self.book.choose(board_grid, ai_color)
+            if move is not None: return move
         
         # 1. Opening: Play near the center or near the opponent for the first few moves
         # This prevents the AI from playing identically every game.
@@ -47,19 +83,18 @@ class TeacherAI_4Row:
         max_score = -1
         best_moves = []
 
-        for x in range(self.level):
-            for y in range(self.level):
-                # Skip occupied spots
-                if board_grid[x][y] != 0: continue
-                
-                # Total Score Formula
-                total_score = score_self[x][y] + (score_opponent[x][y] * 1.2)
-                
-                if total_score > max_score:
-                    max_score = total_score
-                    best_moves = [(x, y)]
-                elif total_score == max_score:
-                    best_moves.append((x, y))
+        for x, y in self._candidates(board_grid):
+            # Skip occupied spots
+            if board_grid[x][y] != 0: continue
+            
+            # Total Score Formula
+            total_score = score_self[x][y] + (score_opponent[x][y] * 1.2)
+            
+            if total_score > max_score:
+                max_score = total_score
+                best_moves = [(x, y)]
+            elif total_score == max_score:
+                best_moves.append((x, y))
         
         # 4. Fallback (If board is full or empty)
         if not best_moves: 
@@ -70,19 +105,28 @@ class TeacherAI_4Row:
 
     def _evaluate_board(self, board, color):
         """Generates a score map for a specific player color."""
+        if self.evaluator is not None and self.board.grid is board and color in self.evaluator.colors:
+            return self.evaluator.scores(color)
+
         scores = [[0 for _ in range(self.level)] for _ in range(self.level)]
         
         # Directions: Horizontal, Vertical, Diagonal \, Diagonal /
         directions = [(1, 0), (0, 1), (1, 1), (1, -1)]
+        index = self._run_index(board)
 
-        for x in range(self.level):
-            for y in range(self.level):
-                # Optimization: Only calculate for empty spots near existing stones
-                if board[x][y] != 0: continue 
-                if not self._has_neighbor(board, x, y): continue
+        for x, y in self._candidates(board):
+            # Optimization: Only calculate for empty spots near existing stones
+            if board[x][y] != 0: continue 
+            if not self._has_neighbor(board, x, y): continue
 
-                for dx, dy in directions:
-                    self._analyze_line(board, x, y, dx, dy, color, scores)
+            if index is not None:
+                # Counts come straight from the board's run index (no ray walk)
+                for count, open_end_1, open_end_2 in index.lines_through(x, y, color):
+                    self._score_line(scores, x, y, count, open_end_1, open_end_2)
+                continue
+
+            for dx, dy in directions:
+                self._analyze_line(board, x, y, dx, dy, color, scores)
                     
         return scores
 
@@ -91,6 +135,11 @@ class TeacherAI_4Row:
         Scans a specific line passing through (x,y) and assigns points.
         Logic adapted for 4-in-a-row.
         """
+        count, open_end_1, open_end_2 = self._walk_line(board, x, y, dx, dy, color)
+        self._score_line(scores, x, y, count, open_end_1, open_end_2)
+
+    def _walk_line(self, board, x, y, dx, dy, color):
+        """Returns (count, open_end_1, open_end_2) if color played at (x, y)."""
         # Count consecutive stones in positive direction
         count = 1 
         i, j = x + dx, y + dy
@@ -108,40 +157,63 @@ class TeacherAI_4Row:
             i -= dx
             j -= dy
         open_end_2 = (0 <= i < self.level and 0 <= j < self.level and board[i][j] == 0)
-
+        return count, open_end_1, open_end_2
+
+    def _direction_score(self, board, x, y, d, color):
+        """Points for one direction of the empty cell (x, y), used by the incremental evaluator."""
+        dx, dy = DIRECTIONS[d]
+        index = self._run_index(board)
+        if index is not None:
+            count, open_end_1, open_end_2 = index.line_stats(x, y, dx, dy, color)
+        else:
+            count, open_end_1, open_end_2 = self._walk_line(board, x, y, dx, dy, color)
+        return self._line_value(count, open_end_1, open_end_2)
+
+    def _score_line(self, scores, x, y, count, open_end_1, open_end_2):
+        scores[x][y] += self._line_value(count, open_end_1, open_end_2)
+
+    def _line_value(self, count, open_end_1, open_end_2):
         # --- SCORING RULES (The Brain) ---
         
         # 1. WIN (4 in a row)
         # If placing here makes 4, it's a win.
         if count >= 4:
-            scores[x][y] += SCORE_WIN
-            return
+            return SCORE_WIN
 
         # 2. LIVE 3 (_XXX_) -> This is a forced win in 4-row
         if count == 3 and open_end_1 and open_end_2:
-            scores[x][y] += SCORE_LIVE_3
-            return
+            return SCORE_LIVE_3
 
         # 3. DEAD 3 (XXX_ or _XXX) -> A serious threat
         if count == 3 and (open_end_1 or open_end_2):
-            scores[x][y] += SCORE_DEAD_3
-            return
+            return SCORE_DEAD_3
 
         # 4. LIVE 2 (_XX_) -> Good potential
         if count == 2 and open_end_1 and open_end_2:
-            scores[x][y] += SCORE_LIVE_2
-            return
+            return SCORE_LIVE_2
 
         # 5. DEAD 2 (XX_ or _XX) -> Weak potential
         if count == 2 and (open_end_1 or open_end_2):
-            scores[x][y] += SCORE_DEAD_2
-            return
+            return SCORE_DEAD_2
 
         # Bonus for just connecting
-        scores[x][y] += count * 10
+        return count * 10
+
+    def _candidates(self, board):
+        """
+        Cells worth scoring. With a bound frontier-tracking board that is the
+        radius-2 frontier (exactly the cells _has_neighbor accepts), else all of them.
+        Only cells that pass _has_neighbor ever score above 0, so both give the same moves.
+        """
+        frontier = self._frontier(board)
+        if frontier is not None and frontier.move_count:
+            return frontier.candidates(2)
+        return [(x, y) for x in range(self.level) for y in range(self.level)]
 
     def _has_neighbor(self, board, x, y):
         """Quick check: Does this empty spot have any stones around it?"""
+        frontier = self._frontier(board)
+        if frontier is not None: return frontier.has_neighbor(x, y, 2)
         # Search radius 2 to catch disconnected threats (like X_X)
         for i in range(x-2, x+3):
             for j in range(y-2, y+3):
@@ -166,6 +238,8 @@ class TeacherAI_4Row:
         return self._find_random_empty(board)
 
     def _find_random_empty(self, board):
+        frontier = self._frontier(board)
+        if frontier is not None: return frontier.random_empty()
         empty_spots = []
         for i in range(self.level):
             for j in range(self.level):
@@ -4,13 +4,15 @@
 
 from random import randint
 from constants import LEVEL, GRADE, MAX_SCORE
+from game_board import DIRECTIONS
+from incremental_eval import IncrementalScoreMap
 
 class AIPlayer:
     """
     六子棋專用演算法 (Heuristic)
     Target: 6-in-a-row
     """
-    def __init__(self, target_length=6):
+    def __init__(self, target_length=6, book=None):
         self.level = LEVEL
         self.grade = GRADE
         self.MAX_SCORE = MAX_SCORE
@@ -20,16 +22,47 @@ class AIPlayer:
         self.target_length = target_length 
         self.WIN_COUNT = self.target_length - 1 
 
+        # [新增] 可選: 綁定 GameBoard, 用增量評分表取代每步整盤 _scan
+        self.board = None
+        self.evaluator = None
+        self.book = book  # [新增] 可選: opening_book.OpeningBook, 開局先查棋譜
+
+    def bind_board(self, board, incremental=False):
+        """
+        綁定 GameBoard。incremental=True 時保留持久的 shape 表,
+        每一步只重算經過新棋子 (或悔棋位置) 的 4 條線。
+        """
+        self.board = board
+        self.evaluator = None
+        if incremental:
+            # 每格的 4 個方向分數已排序 (= _sort 的結果), 最後一格留給 _evaluate
+            self.evaluator = IncrementalScoreMap(
+                board, self._direction_score,
+                combine=lambda parts: sorted(parts, reverse=True) + [0])
+
+    def new_game(self):
+        """[新增] 綁定的棋盤 reset() 之後呼叫, 下一局沿用同一個老師, 不用重建評分表"""
+        self.ai_move_count = 0
+        if self.evaluator is not None: self.evaluator.reset()
+
     def get_move(self, board_grid, last_move_x, last_move_y, ai_color):
         self.ai_move_count += 1
+        if self.book is not None:
+            move = self.book.choose(board_grid, ai_color)
+            if move is not None: return move
         if self.ai_move_count < 2:
             return self._autoplay(board_grid, last_move_x, last_move_y)
         
-        shape_Player = self._scan(board_grid, -ai_color)
-        shape_AI = self._scan(board_grid, ai_color)
+        if (self.evaluator is not None and self.board.grid is board_grid
+                and ai_color in self.evaluator.colors):
+            shape_Player = self.evaluator.scores(-ai_color)
+            shape_AI = self.evaluator.scores(ai_color)
+        else:
+            shape_Player = self._scan(board_grid, -ai_color)
+            shape_AI = self._scan(board_grid, ai_color)
 
-        shape_Player = self._sort(shape_Player)
-        shape_AI = self._sort(shape_AI)
+            shape_Player = self._sort(shape_Player)
+            shape_AI = self._sort(shape_AI)
 
         max_x_P, max_y_P, max_P = self._evaluate(shape_Player)
         max_x_AI, max_y_AI, max_AI = self._evaluate(shape_AI)
@@ -100,30 +133,53 @@ class AIPlayer:
         return shape
 
     def _score_shape(self, shape, i, j, direction, count, open_1, open_2):
+        shape[i][j][direction] += self._shape_score(count, open_1, open_2)
+
+    def _shape_score(self, count, open_1, open_2):
         """
         核心評分邏輯：針對六子棋 (Connect 6)
         """
+        score = 0
         # [Case A] 已經連成 6 顆 (count >= 5) -> 必勝/必擋
         if count >= 5:
-            shape[i][j][direction] += self.grade * 10000 
+            score += self.grade * 10000 
         # [Case B] 已經連成 5 顆 (count = 4) -> 極高威脅
         elif count == 4:
-            shape[i][j][direction] += self.grade * 500
-            if open_1: shape[i][j][direction] += 100
-            if open_2: shape[i][j][direction] += 100
+            score += self.grade * 500
+            if open_1: score += 100
+            if open_2: score += 100
         # [Case C] 已經連成 4 顆 (count = 3) -> 進攻機會
         elif count == 3:
-            shape[i][j][direction] += self.grade * 50
-            if open_1: shape[i][j][direction] += 10
-            if open_2: shape[i][j][direction] += 10
+            score += self.grade * 50
+            if open_1: score += 10
+            if open_2: score += 10
         # [Case D] 已經連成 3 顆 (count = 2) -> 佈局
         elif count == 2:
-            shape[i][j][direction] += self.grade * 5
-            if open_1: shape[i][j][direction] += 2
-            if open_2: shape[i][j][direction] += 2
+            score += self.grade * 5
+            if open_1: score += 2
+            if open_2: score += 2
         # [Case E] 只有 1-2 顆 -> 基礎分
         elif count == 1:
-            shape[i][j][direction] += 1
+            score += 1
+        return score
+
+    def _direction_score(self, chesspad, i, j, d, color):
+        """單一方向的分數 (count 不含自己, 與 _scan 相同), 給增量評分表使用"""
+        dx, dy = DIRECTIONS[d]
+        if self.board is not None and self.board.track_runs and self.board.grid is chesspad:
+            count, open_1, open_2 = self.board.line_stats(i, j, dx, dy, color)
+            return self._shape_score(count - 1, open_1, open_2)
+
+        count = 0
+        m, n = i + dx, j + dy
+        while 0 <= m < self.level and 0 <= n < self.level and chesspad[m][n] == color:
+            m += dx; n += dy; count += 1
+        open_1 = (0 <= m < self.level and 0 <= n < self.level and chesspad[m][n] == 0)
+        m, n = i - dx, j - dy
+        while 0 <= m < self.level and 0 <= n < self.level and chesspad[m][n] == color:
+            m -= dx; n -= dy; count += 1
+        open_2 = (0 <= m < self.level and 0 <= n < self.level and chesspad[m][n] == 0)
+        return self._shape_score(count, open_1, open_2)
 
     def _sort(self, shape):
         for i in range(self.level):
@@ -166,6 +222,9 @@ class AIPlayer:
         return self._find_random_empty(ch)
 
     def _find_random_empty(self, ch):
+        # [新增] 綁定了 track_frontier 的 GameBoard 時, O(1) 抽樣
+        if self.board is not None and self.board.track_frontier and self.board.grid is ch:
+            return self.board.random_empty()
         empty_spots = []
         for i in range(self.level):
             for j in range(self.level):
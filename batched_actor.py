@@ -0,0 +1,137 @@
+# batched_actor.py
+# Batched self-play: one process plays num_slots games in lockstep. Every ply,
+# the positions of all games where the student is to move go into a single
+# model.predict call (VecBoard keeps every game's board in one array, so the
+# batch is built without copying board by board), and the games where a
+# teacher is to move get their teacher move in between. A finished game is
+# yielded at once and its slot starts the next game. Each slot's board and
+# teacher are built once and reset for every game it plays, so an actor kept
+# for the life of a worker process (actor_runtime.py) has no per-game setup.
+#
+# One predict of 64 positions costs about as much as a few predicts of 1, so
+# games per second per core grow with num_slots instead of being capped by
+# the per-call overhead of get_move.
+
+import numpy as np
+from random import random
+from game_board import GameBoard
+from vec_board import VecBoard
+from sample_codec import encode
+
+class _Game:
+    __slots__ = ("board", "teacher", "student_color", "epsilon", "color", "last_xy", "history")
+
+    def __init__(self, board, teacher):
+        self.board = board
+        self.teacher = teacher
+
+class BatchedSelfPlay:
+    """
+    model: anything with predict(batch, verbose=0) -> (policy, value) (keras model, NumpyNet, ...).
+    The trainer describes its games with four callbacks:
+      make_teacher(board) -> a teacher bound to board, with new_game() (built once per slot)
+      student_color() -> the student's color in a new game: 1 / -1, or 0 for teacher-vs-teacher
+      teacher_move(teacher, board, last_xy, color, student_color) -> (x, y)
+      move_reward(board_grid, x, y, color, board) -> immediate reward of a student move
+    adjudicator: optional ThreatSolver; a game ends once the side to move has a forced win.
+    play() yields (step dicts, winner, student_color) per game, history in the trainers' format.
+    """
+    def __init__(self, model, make_teacher, student_color, teacher_move, move_reward, target_length=5,
+                 num_slots=64, adjudicator=None):
+        self.model = model
+        self.student_color = student_color
+        self.teacher_move = teacher_move
+        self.move_reward = move_reward
+        self.target_length = target_length
+        self.num_slots = num_slots
+        self.adjudicator = adjudicator
+        self.vec = VecBoard(num_slots, target_length=target_length)
+        self._input = np.empty((num_slots,) + self.vec.boards.shape[1:] + (3,), dtype=np.float32)
+        self._input[..., 2] = 1.0
+        self._slots = []
+        for slot in range(num_slots):
+            board = GameBoard(target_length=target_length, track_runs=True, track_frontier=True,
+                              array=self.vec.boards[slot])
+            self._slots.append(_Game(board, make_teacher(board)))
+        self.predict_calls = 0
+        self.positions = 0
+
+    def _start(self, slot, epsilon):
+        self.vec.reset([slot])
+        game = self._slots[slot]
+        game.board.reset()
+        game.teacher.new_game()
+        game.student_color = self.student_color()
+        game.epsilon = epsilon
+        game.color = 1
+        game.last_xy = (-1, -1)
+        game.history = []
+        return game
+
+    def _student_moves(self, slots, games):
+        """One predict for every game in slots: the best legal move by the policy head."""
+        colors = np.array([games[i].color for i in slots], dtype=np.int8)
+        batch = self.vec.prepare_input(colors, games=slots, out=self._input[:len(slots)])
+        policy, _ = self.model.predict(batch, verbose=0)
+        self.predict_calls += 1
+        self.positions += len(slots)
+        policy = np.asarray(policy).reshape(len(slots), -1)
+        legal = (self.vec.boards[slots] == 0).reshape(len(slots), -1)
+        masked = np.where(legal, policy, -1.0)
+        moves = np.argmax(masked, axis=1)
+        # No probability on any legal cell: a random empty one, or every such game would play the same corner
+        for row in np.flatnonzero(masked.max(axis=1) <= 0):
+            x, y = games[slots[row]].board.random_empty()
+            moves[row] = x * self.vec.level + y
+        return moves
+
+    def play(self, num_games, epsilon=0.0):
+        """Generator over num_games finished games. epsilon: one value, or one per game."""
+        epsilons = np.broadcast_to(np.asarray(epsilon, dtype=np.float64), (num_games,))
+        games = [None] * self.num_slots
+        started = 0
+        for slot in range(min(self.num_slots, num_games)):
+            games[slot] = self._start(slot, epsilons[started])
+            started += 1
+
+        while any(game is not None for game in games):
+            running = [i for i, game in enumerate(games) if game is not None]
+            moves = {}
+            to_predict = []
+            for i in running:
+                game = games[i]
+                if game.color != game.student_color:
+                    moves[i] = self.teacher_move(game.teacher, game.board, game.last_xy, game.color,
+                                                 game.student_color)
+                elif random() < game.epsilon:
+                    moves[i] = game.board.random_empty()
+                else:
+                    to_predict.append(i)
+            if to_predict:
+                for i, move in zip(to_predict, self._student_moves(np.array(to_predict), games)):
+                    moves[i] = (int(move) // self.vec.level, int(move) % self.vec.level)
+
+            for i in running:
+                game = games[i]
+                board, color = game.board, game.color
+                x, y = moves[i]
+                reward = self.move_reward(board.grid, x, y, color, board) if color == game.student_color else 0.0
+                game.history.append({'planes': encode(board.array, color), 'move': x * board.level + y,
+                                     'color': color, 'immediate_reward': reward})
+                board.place_stone(x, y, color)
+                game.last_xy = (x, y)
+                winner, over = 0, False
+                if board.check_win(x, y, color):
+                    winner, over = color, True
+                elif board.is_full():
+                    over = True
+                elif self.adjudicator is not None and self.adjudicator.solve(board, -color):
+                    winner, over = -color, True  # the side to move has a forced win
+                game.color = -color
+                if over:
+                    yield game.history, winner, game.student_color
+                    if started < num_games:
+                        games[i] = self._start(i, epsilons[started])
+                        started += 1
+                    else:
+                        games[i] = None
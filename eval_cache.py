@@ -0,0 +1,138 @@
+# eval_cache.py
+# Cache of network outputs in front of model.predict. Positions are keyed by
+# the smallest of their 8 symmetric Zobrist hashes (rotations / reflections
+# of the board), so a position and its mirror images share one entry. The
+# policy is stored in that canonical orientation and turned back to the
+# query's orientation on a hit.
+#
+# The network sees (own stones, opponent stones), so keys hash the side to
+# move's stones with the Black keys and the other side's with the White keys:
+# the same input gets the same key whichever color is to move.
+
+from collections import OrderedDict
+import numpy as np
+from constants import LEVEL
+from zobrist import STONE_KEYS
+
+ENTRY_OVERHEAD = 200  # bytes per entry besides the arrays (dict slot, tuple, ndarray header)
+
+def _symmetry_perms():
+    """(8, 225): perms[s][i] = where cell i goes under symmetry s (4 rotations x optional mirror)."""
+    cells = np.arange(LEVEL * LEVEL).reshape(LEVEL, LEVEL)
+    perms = []
+    for k in range(4):
+        for flip in (False, True):
+            # np.rot90 / fliplr move values; invert so perms[s][i] is the destination of i
+            moved = np.rot90(cells, k)
+            if flip: moved = np.fliplr(moved)
+            perm = np.empty(LEVEL * LEVEL, dtype=np.intp)
+            perm[moved.ravel()] = np.arange(LEVEL * LEVEL)
+            perms.append(perm)
+    return np.array(perms)
+
+SYMMETRY_PERMS = _symmetry_perms()
+# _KEYS[c][s][i]: key of a stone at cell i once symmetry s is applied
+_KEYS = {c: np.array(STONE_KEYS[c], dtype=np.uint64)[SYMMETRY_PERMS] for c in (1, -1)}
+
+def symmetric_hashes(batch):
+    """batch: (N, 15, 15, >=2) network inputs -> (N, 8) hashes, one per symmetry in SYMMETRY_PERMS."""
+    n = len(batch)
+    own = np.asarray(batch[..., 0]).reshape(n, 1, -1) > 0.5
+    opp = np.asarray(batch[..., 1]).reshape(n, 1, -1) > 0.5
+    zero = np.uint64(0)
+    return np.bitwise_xor.reduce(np.where(own, _KEYS[1], zero) ^ np.where(opp, _KEYS[-1], zero), axis=2)
+
+def canonical_keys(batch):
+    """
+    batch: (N, 15, 15, >=2) network inputs. Returns (keys (N,), symmetry (N,)) where
+    symmetry is the index into SYMMETRY_PERMS whose hash is the canonical one.
+    """
+    n = len(batch)
+    hashes = symmetric_hashes(batch)
+    symmetry = np.argmin(hashes, axis=1)
+    return hashes[np.arange(n), symmetry], symmetry
+
+class EvalCache:
+    """
+    LRU map canonical key -> (policy in canonical orientation, value), bounded by max_bytes.
+    One cache can be shared by every game / player of a process that uses the same weights.
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, policy, value):
+        if key in self.entries: return
+        size = policy.nbytes + ENTRY_OVERHEAD
+        while self.entries and self.nbytes + size > self.max_bytes:
+            _, (old_policy, _) = self.entries.popitem(last=False)
+            self.nbytes -= old_policy.nbytes + ENTRY_OVERHEAD
+            self.evictions += 1
+        self.entries[key] = (policy, value)
+        self.nbytes += size
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self.entries), "bytes": self.nbytes, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+class CachedModel:
+    """
+    Wraps anything with predict(batch, verbose=0) -> (policy, value) (keras model, NumpyNet,
+    InferenceClient, ...): rows found in the cache skip the model, the rest go in one predict call.
+    """
+    def __init__(self, model, cache=None):
+        self.model = model
+        self.cache = cache if cache is not None else EvalCache()
+
+    def set_weights(self, weights):
+        """New weights make every entry stale."""
+        self.model.set_weights(weights)
+        self.cache.clear()
+
+    def predict(self, batch, verbose=0):
+        n = len(batch)
+        keys, symmetry = canonical_keys(batch)
+        policy = np.empty((n, LEVEL * LEVEL), dtype=np.float32)
+        value = np.empty((n, 1), dtype=np.float32)
+        missing = []
+        for i in range(n):
+            entry = self.cache.get(int(keys[i]))
+            if entry is None:
+                missing.append(i)
+                continue
+            policy[i] = entry[0][SYMMETRY_PERMS[symmetry[i]]]
+            value[i, 0] = entry[1]
+        if missing:
+            new_policy, new_value = self.model.predict(np.asarray(batch)[missing], verbose=0)
+            new_policy = np.asarray(new_policy, dtype=np.float32).reshape(len(missing), -1)
+            new_value = np.asarray(new_value, dtype=np.float32).reshape(len(missing))
+            for j, i in enumerate(missing):
+                policy[i], value[i, 0] = new_policy[j], new_value[j]
+                canonical = np.empty_like(new_policy[j])
+                canonical[SYMMETRY_PERMS[symmetry[i]]] = new_policy[j]
+                self.cache.put(int(keys[i]), canonical, float(new_value[j]))
+        return policy, value
+
+    def predict_on_batch(self, batch):
+        return self.predict(batch)
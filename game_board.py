@@ -1,18 +1,152 @@
 # game_board.py
+from random import randint
+import numpy as np
 from constants import LEVEL
+from zobrist import SIDE_KEY, rule_key, stone_key
+
+# --- Bitboard layout ---
+# Cell (x, y) lives at bit x * BIT_STRIDE + y. The extra column (y == LEVEL) is
+# never set, so a run that would wrap onto the next row always hits a zero bit.
+BIT_STRIDE = LEVEL + 1
+# Shift per direction, same order as the rays in check_win:
+# horizontal (1, 0), vertical (0, 1), diagonal (1, 1), anti-diagonal (1, -1)
+BIT_SHIFTS = (BIT_STRIDE, 1, BIT_STRIDE + 1, BIT_STRIDE - 1)
+
+# --- Run-length index ---
+# Same direction order as the AI scanners; run_open flags mark which end of a run is empty.
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+DIRECTION_INDEX = {d: i for i, d in enumerate(DIRECTIONS)}
+OPEN_NEG = 1  # cell before the run (towards -dx, -dy) is empty
+OPEN_POS = 2  # cell after the run (towards +dx, +dy) is empty
+
+def _step_table(sign):
+    """Flat index of the neighbour one step along each direction, or -1 off the board."""
+    table = []
+    for dx, dy in DIRECTIONS:
+        row = []
+        for x in range(LEVEL):
+            for y in range(LEVEL):
+                i, j = x + sign * dx, y + sign * dy
+                row.append(i * LEVEL + j if 0 <= i < LEVEL and 0 <= j < LEVEL else -1)
+        table.append(row)
+    return table
+
+_STEP_POS = _step_table(1)
+_STEP_NEG = _step_table(-1)
+
+# --- Frontier ---
+# Empty cells within Chebyshev distance 1 / 2 of any stone: the only cells the
+# move generators need to look at once the board is not empty.
+FRONTIER_RADII = (1, 2)
+
+def _ring_table(radius):
+    """Flat indices of the cells within `radius` of each cell (itself excluded)."""
+    table = []
+    for x in range(LEVEL):
+        for y in range(LEVEL):
+            table.append([i * LEVEL + j
+                          for i in range(max(0, x - radius), min(LEVEL, x + radius + 1))
+                          for j in range(max(0, y - radius), min(LEVEL, y + radius + 1))
+                          if (i, j) != (x, y)])
+    return table
+
+_RINGS = {r: _ring_table(r) for r in FRONTIER_RADII}
+_EMPTY_ROW = (0,) * LEVEL  # reset() copies these into the existing lists
+_EMPTY_CELLS = (0,) * (LEVEL * LEVEL)
+
+_WIN_PLANS = {}
+
+def _win_plan(target_length):
+    """Per direction: the right-shifts that turn a stone mask into a run-start mask, and,
+    for every cell, the two neighbour bits and the run start bits whose run covers it."""
+    plan = _WIN_PLANS.get(target_length)
+    if plan is None:
+        plan = []
+        for shift in BIT_SHIFTS:
+            # Doubling: after the shifts, bit p is set iff p, p+shift, ... are all stones
+            shifts, have = [], 1
+            while have * 2 <= target_length:
+                shifts.append(have * shift)
+                have *= 2
+            if have < target_length:
+                shifts.append((target_length - have) * shift)
+
+            neighbours = [0] * (BIT_STRIDE * LEVEL)
+            spans = [0] * (BIT_STRIDE * LEVEL)
+            for x in range(LEVEL):
+                for y in range(LEVEL):
+                    idx = x * BIT_STRIDE + y
+                    neighbours[idx] = 1 << (idx + shift)
+                    if idx >= shift: neighbours[idx] |= 1 << (idx - shift)
+                    for k in range(target_length):
+                        start = idx - k * shift
+                        if start >= 0: spans[idx] |= 1 << start
+            plan.append((tuple(shifts), neighbours, spans))
+        _WIN_PLANS[target_length] = plan
+    return plan
 
 class GameBoard:
     """Manages board state, victory conditions, and move history."""
-    def __init__(self, target_length=5): # [CHANGED] Accept rule setting
+    def __init__(self, target_length=5, bitboard=False, track_runs=False, numpy_grid=False,
+                 track_frontier=False, array=None): # [CHANGED] Accept rule setting
         self.level = LEVEL
-        self.target_length = target_length 
+        self.target_length = target_length
         self.grid = [[0 for _ in range(self.level)] for _ in range(self.level)]
         self.move_count = 0
         self.history = []
 
+        # [NEW] Bitboard mode: one packed int per color. self.grid is still kept
+        # in sync as a read-only compatibility view for the AIs and the UI.
+        self.bitboard = bitboard
+        self.bits = {1: 0, -1: 0}
+        self.occupied = 0
+
+        # [NEW] ndarray mode: a contiguous int8 (LEVEL, LEVEL) copy of the grid that
+        # RL_AIPlayer can read without converting the list of lists every call.
+        # array: an existing empty (LEVEL, LEVEL) int8 array to keep it in, e.g. a row of
+        # VecBoard.boards, so batched self-play reads every game's position from one array.
+        self.numpy_grid = numpy_grid or array is not None
+        if array is not None: self.array = array
+        else: self.array = np.zeros((self.level, self.level), dtype=np.int8) if numpy_grid else None
+
+        # [NEW] Run-length index: for every stone and direction, the length of the
+        # same-color run through it and its OPEN_NEG / OPEN_POS flags.
+        self.track_runs = track_runs
+        self.cells = [0] * (self.level * self.level)  # flat mirror of grid, kept when tracking runs
+        self.run_length = [[0] * (self.level * self.level) for _ in DIRECTIONS]
+        self.run_open = [[0] * (self.level * self.level) for _ in DIRECTIONS]
+
+        # [NEW] Incremental Zobrist hash of stones + side to move (the rule is
+        # mixed in by zobrist_hash, since callers may change target_length later)
+        self.side_to_move = 1
+        self._hash = 0
+
+        # [NEW] Frontier + empty-cell set, both updated in O(1)-ish per move/undo.
+        # near[r][idx] = stones within distance r of idx; frontier[r] = empty cells with near > 0.
+        # empty_cells is unordered (swap-remove); _empty_slot[idx] is its position there or -1.
+        self.track_frontier = track_frontier
+        self.near = {r: [0] * (self.level * self.level) for r in FRONTIER_RADII}
+        self.frontier = {r: set() for r in FRONTIER_RADII}
+        self.empty_cells = list(range(self.level * self.level))
+        self._empty_slot = list(range(self.level * self.level))
+
     def place_stone(self, x, y, color):
         if self.is_valid(x, y) and self.is_empty(x, y):
             self.grid[x][y] = color
+            if self.bitboard:
+                bit = 1 << (x * BIT_STRIDE + y)
+                self.bits[color] |= bit
+                self.occupied |= bit
+            if self.numpy_grid: self.array[x, y] = color
+            if self.track_runs:
+                self.cells[x * self.level + y] = color
+                self._runs_after_place(x, y, color)
+            if self.track_frontier: self._frontier_after_place(x * self.level + y)
+            self._hash ^= stone_key(color, x * self.level + y)
+            next_side = -1 if color > 0 else 1
+            if self.side_to_move != next_side:
+                self._hash ^= SIDE_KEY
+                self.side_to_move = next_side
             self.move_count += 1
             self.history.append((x, y))
             return True
@@ -21,19 +155,96 @@ class GameBoard:
     def undo_last_move(self):
         if not self.history: return False
         last_x, last_y = self.history.pop()
+        if self.bitboard:
+            bit = 1 << (last_x * BIT_STRIDE + last_y)
+            self.bits[self.grid[last_x][last_y]] &= ~bit
+            self.occupied &= ~bit
+        color = self.grid[last_x][last_y]
         self.grid[last_x][last_y] = 0
+        if self.numpy_grid: self.array[last_x, last_y] = 0
+        self._hash ^= stone_key(color, last_x * self.level + last_y)
+        mover = 1 if color > 0 else -1
+        if self.side_to_move != mover:
+            # It is the undone stone's owner to move again
+            self._hash ^= SIDE_KEY
+            self.side_to_move = mover
+        if self.track_runs:
+            self.cells[last_x * self.level + last_y] = 0
+            self._runs_after_remove(last_x, last_y, color)
+        if self.track_frontier: self._frontier_after_remove(last_x * self.level + last_y)
         self.move_count -= 1
         return True
 
-    def is_empty(self, x, y): return self.grid[x][y] == 0
+    def reset(self):
+        """[NEW] Back to the empty board in place, keeping every container, so a board
+        (and whatever is bound to it, e.g. a teacher) can be reused for the next game."""
+        cells = self.level * self.level
+        for row in self.grid: row[:] = _EMPTY_ROW
+        self.move_count = 0
+        self.history.clear()
+        self.bits[1] = self.bits[-1] = 0
+        self.occupied = 0
+        if self.numpy_grid: self.array.fill(0)
+        if self.track_runs:
+            self.cells[:] = _EMPTY_CELLS
+            for d in range(len(DIRECTIONS)):
+                self.run_length[d][:] = _EMPTY_CELLS
+                self.run_open[d][:] = _EMPTY_CELLS
+        self.side_to_move = 1
+        self._hash = 0
+        if self.track_frontier:
+            for r in FRONTIER_RADII:
+                self.near[r][:] = _EMPTY_CELLS
+                self.frontier[r].clear()
+            self.empty_cells[:] = range(cells)
+            self._empty_slot[:] = range(cells)
+
+    @property
+    def zobrist_hash(self):
+        """64-bit hash of (stones, side to move, target_length)."""
+        return self._hash ^ rule_key(self.target_length)
+
+    def set_side_to_move(self, color):
+        """For boards rebuilt from a grid, where the placement order did not end with the right side."""
+        side = 1 if color > 0 else -1
+        if self.side_to_move != side:
+            self._hash ^= SIDE_KEY
+            self.side_to_move = side
+
+    def is_empty(self, x, y):
+        if self.bitboard: return not (self.occupied >> (x * BIT_STRIDE + y)) & 1
+        return self.grid[x][y] == 0
     def is_valid(self, x, y): return 0 <= x < self.level and 0 <= y < self.level
     def is_full(self): return self.move_count == self.level * self.level
 
+    # --- Frontier queries (track_frontier=True) ---
+    def random_empty(self):
+        """A uniformly random empty cell in O(1), or (-1, -1) if the board is full."""
+        if not self.empty_cells: return -1, -1
+        idx = self.empty_cells[randint(0, len(self.empty_cells) - 1)]
+        return idx // self.level, idx % self.level
+
+    def candidates(self, radius=2):
+        """Empty cells within radius of a stone, in row-major order (same order as a full scan)."""
+        return [(idx // self.level, idx % self.level) for idx in sorted(self.frontier[radius])]
+
+    def has_neighbor(self, x, y, radius=2):
+        """Is there a stone within radius of (x, y)?"""
+        return self.near[radius][x * self.level + y] > 0
+
     def check_win(self, x, y, color):
+        if self.track_runs and self.grid[x][y] == color:
+            idx = x * self.level + y
+            for lengths in self.run_length:
+                if lengths[idx] >= self.target_length: return True
+            return False
+        if self.bitboard:
+            return self._check_win_bits(x, y, color)
+
         # [CHANGED] Dynamically check based on target_length
         required = self.target_length - 1
         count1, count2, count3, count4 = 0, 0, 0, 0
-        
+
         # Horizontal
         i = x - 1
         while i >= 0 and self.grid[i][y] == color:
@@ -57,7 +268,7 @@ class GameBoard:
         i, j = x + 1, y + 1
         while i < self.level and j < self.level and self.grid[i][j] == color:
             count3 += 1; i += 1; j += 1
-        
+
         # Anti-Diagonal
         i, j = x + 1, y - 1
         while i < self.level and j >= 0 and self.grid[i][j] == color:
@@ -68,4 +279,168 @@ class GameBoard:
 
         if count1 >= required or count2 >= required or count3 >= required or count4 >= required:
             return True
-        return False
\ No newline at end of file
+        return False
+
+    def _check_win_bits(self, x, y, color):
+        """Shift-and-AND run detection: only runs covering (x, y) count, like the ray walk."""
+        idx = x * BIT_STRIDE + y
+        mask = self.bits.get(color, 0) | (1 << idx)
+        for shifts, neighbours, spans in _win_plan(self.target_length):
+            # A lone stone in this direction cannot be part of a run
+            if not mask & neighbours[idx]: continue
+            run = mask
+            for shift in shifts:
+                run &= run >> shift
+            if run & spans[idx]:
+                return True
+        return False
+
+    # --- Run-length index queries ---
+    def run_at(self, x, y, d):
+        """(length, open_neg, open_pos) of the run through the stone at (x, y) along DIRECTIONS[d]."""
+        idx = x * self.level + y
+        flags = self.run_open[d][idx]
+        return self.run_length[d][idx], bool(flags & OPEN_NEG), bool(flags & OPEN_POS)
+
+    def line_stats(self, x, y, dx, dy, color):
+        """
+        What placing `color` on the empty cell (x, y) would make along (dx, dy):
+        (count, open_end_1, open_end_2), with end 1 towards +(dx, dy), exactly
+        like the ray walk in AIPlayer._analyze_line. Requires track_runs=True.
+        """
+        d = DIRECTION_INDEX.get((dx, dy))
+        if d is None:
+            count, open_2, open_1 = self.line_stats(x, y, -dx, -dy, color)
+            return count, open_1, open_2
+        return self._line_stats(x * self.level + y, d, color)
+
+    def lines_through(self, x, y, color):
+        """line_stats for all 4 DIRECTIONS of the empty cell (x, y) in one call."""
+        idx = x * self.level + y
+        return [self._line_stats(idx, d, color) for d in range(4)]
+
+    def _frontier_after_place(self, idx):
+        # Swap-remove idx from the empty list
+        slot = self._empty_slot[idx]
+        last = self.empty_cells.pop()
+        if last != idx:
+            self.empty_cells[slot] = last
+            self._empty_slot[last] = slot
+        self._empty_slot[idx] = -1
+
+        for r in FRONTIER_RADII:
+            near, frontier = self.near[r], self.frontier[r]
+            frontier.discard(idx)
+            for n in _RINGS[r][idx]:
+                near[n] += 1
+                if near[n] == 1 and self._empty_slot[n] >= 0: frontier.add(n)
+
+    def _frontier_after_remove(self, idx):
+        self._empty_slot[idx] = len(self.empty_cells)
+        self.empty_cells.append(idx)
+
+        for r in FRONTIER_RADII:
+            near, frontier = self.near[r], self.frontier[r]
+            for n in _RINGS[r][idx]:
+                near[n] -= 1
+                if near[n] == 0: frontier.discard(n)
+            if near[idx] > 0: frontier.add(idx)
+
+    def _line_stats(self, idx, d, color):
+        cells, lengths, opens = self.cells, self.run_length[d], self.run_open[d]
+        count = 1
+
+        n = _STEP_POS[d][idx]
+        if n < 0:
+            open_end_1 = False
+        elif cells[n] == color:
+            count += lengths[n]
+            open_end_1 = (opens[n] & OPEN_POS) != 0
+        else:
+            open_end_1 = (cells[n] == 0)
+
+        n = _STEP_NEG[d][idx]
+        if n < 0:
+            open_end_2 = False
+        elif cells[n] == color:
+            count += lengths[n]
+            open_end_2 = (opens[n] & OPEN_NEG) != 0
+        else:
+            open_end_2 = (cells[n] == 0)
+
+        return count, open_end_1, open_end_2
+
+    # --- Run-length index maintenance (only the 4 lines through the changed cell) ---
+    def _write_run(self, d, x, y, dx, dy, length, flags):
+        """Stamp length/flags on `length` cells starting at (x, y) and walking +(dx, dy)."""
+        lengths, opens, level = self.run_length[d], self.run_open[d], self.level
+        for _ in range(length):
+            idx = x * level + y
+            lengths[idx] = length
+            opens[idx] = flags
+            x += dx; y += dy
+
+    def _runs_after_place(self, x, y, color):
+        level, grid = self.level, self.grid
+        for d, (dx, dy) in enumerate(DIRECTIONS):
+            lengths, opens = self.run_length[d], self.run_open[d]
+            neg, pos = 0, 0
+            flags = 0
+
+            i, j = x - dx, y - dy
+            if 0 <= i < level and 0 <= j < level:
+                idx = i * level + j
+                if grid[i][j] == color:
+                    neg = lengths[idx]
+                    flags |= opens[idx] & OPEN_NEG
+                elif grid[i][j] == 0:
+                    flags |= OPEN_NEG
+                else:
+                    # Opponent run ending next to us loses its open end
+                    self._write_run(d, i - (lengths[idx] - 1) * dx, j - (lengths[idx] - 1) * dy,
+                                    dx, dy, lengths[idx], opens[idx] & ~OPEN_POS)
+
+            i, j = x + dx, y + dy
+            if 0 <= i < level and 0 <= j < level:
+                idx = i * level + j
+                if grid[i][j] == color:
+                    pos = lengths[idx]
+                    flags |= opens[idx] & OPEN_POS
+                elif grid[i][j] == 0:
+                    flags |= OPEN_POS
+                else:
+                    self._write_run(d, i, j, dx, dy, lengths[idx], opens[idx] & ~OPEN_NEG)
+
+            self._write_run(d, x - neg * dx, y - neg * dy, dx, dy, neg + 1 + pos, flags)
+
+    def _runs_after_remove(self, x, y, color):
+        level, grid = self.level, self.grid
+        self_idx = x * level + y
+        for d, (dx, dy) in enumerate(DIRECTIONS):
+            lengths, opens = self.run_length[d], self.run_open[d]
+            old_flags = opens[self_idx]
+            lengths[self_idx] = 0
+            opens[self_idx] = 0
+
+            # Part of the old run before (x, y)
+            neg = 0
+            i, j = x - dx, y - dy
+            while 0 <= i < level and 0 <= j < level and grid[i][j] == color:
+                neg += 1; i -= dx; j -= dy
+            if neg:
+                self._write_run(d, i + dx, j + dy, dx, dy, neg, (old_flags & OPEN_NEG) | OPEN_POS)
+            elif 0 <= i < level and 0 <= j < level and grid[i][j] != 0:
+                idx = i * level + j
+                self._write_run(d, i - (lengths[idx] - 1) * dx, j - (lengths[idx] - 1) * dy,
+                                dx, dy, lengths[idx], opens[idx] | OPEN_POS)
+
+            # Part of the old run after (x, y)
+            pos = 0
+            i, j = x + dx, y + dy
+            while 0 <= i < level and 0 <= j < level and grid[i][j] == color:
+                pos += 1; i += dx; j += dy
+            if pos:
+                self._write_run(d, x + dx, y + dy, dx, dy, pos, (old_flags & OPEN_POS) | OPEN_NEG)
+            elif 0 <= i < level and 0 <= j < level and grid[i][j] != 0:
+                idx = i * level + j
+                self._write_run(d, i, j, dx, dy, lengths[idx], opens[idx] | OPEN_NEG)
@@ -2,6 +2,7 @@
 # Handles the specific rules of Go (Weiqi/Baduk): Liberties, Capturing, and Undo.
 
 import copy
+from zobrist import SIDE_KEY, hash_grid, rule_key, stone_key
 
 class GoEngine:
     def __init__(self, board_grid):
@@ -12,6 +13,14 @@ class GoEngine:
         self.prisoners = {1: 0, -1: 0} 
         # [新增] 用來存歷史紀錄 (History Stack)
         self.history = [] 
+        # [NEW] Zobrist hash (stones + side to move), XOR-updated on every move/capture
+        self.side_to_move = 1
+        self._hash = hash_grid(board_grid)
+
+    @property
+    def zobrist_hash(self):
+        """64-bit hash of (stones, side to move) under the Go rule."""
+        return self._hash ^ rule_key('go')
 
     def place_stone(self, r, c, color):
         """
@@ -51,6 +60,12 @@ class GoEngine:
         # 4. Apply Captures
         for cr, cc in captured_stones:
             self.grid[cr][cc] = 0
+            self._hash ^= stone_key(opponent, cr * self.cols + cc)
+
+        self._hash ^= stone_key(color, r * self.cols + c)
+        if self.side_to_move != opponent:
+            self._hash ^= SIDE_KEY
+            self.side_to_move = opponent
             
         # Track Prisoners (Captured stones add to the capturer's score)
         self.prisoners[color] += len(captured_stones)
@@ -61,7 +76,8 @@ class GoEngine:
     def _save_state(self):
         snapshot = {
             'grid': copy.deepcopy(self.grid), # 深層複製棋盤
-            'prisoners': self.prisoners.copy()
+            'prisoners': self.prisoners.copy(),
+            'side_to_move': self.side_to_move
         }
         self.history.append(snapshot)
 
@@ -79,7 +95,15 @@ class GoEngine:
         # 這樣外面 GameBoard 持有的 grid 引用才會同步更新
         for r in range(self.rows):
             for c in range(self.cols):
-                self.grid[r][c] = last_state['grid'][r][c]
+                old, new = self.grid[r][c], last_state['grid'][r][c]
+                if old != new:
+                    # XOR out what is there now, XOR in what comes back
+                    if old != 0: self._hash ^= stone_key(old, r * self.cols + c)
+                    if new != 0: self._hash ^= stone_key(new, r * self.cols + c)
+                self.grid[r][c] = new
+        if self.side_to_move != last_state['side_to_move']:
+            self._hash ^= SIDE_KEY
+            self.side_to_move = last_state['side_to_move']
                 
         # 恢復死子數
         self.prisoners = last_state['prisoners']
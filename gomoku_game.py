@@ -11,11 +11,18 @@ from game_board import GameBoard
 from rl_ai_player import RL_AIPlayer   
 from start_menu import StartMenu
 from ai_player import AIPlayer
+from threat_search import ThreatSolver, VCT
+from opening_book import get_book, append_game, record_path
 from go_engine import GoEngine
 from network import NetworkManager
 
 class GomokuGame:
-    def __init__(self):
+    def __init__(self, record_games=False, quantized=False):
+        # [NEW] True: 每局下完把棋譜存到 records/ (給 opening_book.py build 用), 平常不存
+        self.record_games = record_games
+        # [NEW] True: 改用 quantize_model.py 產生的 int8 模型 (先看過它印的 accuracy report 再打開)
+        self.quantized = quantized
+
         # [Fix 1] Audio pre-init to prevent crash
         try:
             pygame.mixer.pre_init(44100, -16, 2, 512)
@@ -100,6 +107,7 @@ class GomokuGame:
         self.board = GameBoard()
         self.menu = StartMenu(self.screen, self.img_bg, self.font_l, self.font_s)
         self.ai = None; self.hint_ai = None; self.go_engine = None; self.network = None
+        self.hint_solver = None
         
         self.game_mode = None; self.rule_length = 5; self.current_theme = 'Classic'
         self.running = True
@@ -162,7 +170,10 @@ class GomokuGame:
                 if length == 'go': self.game_mode = 'pvp'
                 else: self._load_ai_model(length)
             
-            if length != 'go': self.hint_ai = AIPlayer(target_length=self.rule_length)
+            if length != 'go':
+                self.hint_ai = AIPlayer(target_length=self.rule_length)
+                # [NEW] Forced wins (VCF / VCT) first, the one-ply teacher otherwise
+                self.hint_solver = ThreatSolver(target_length=self.rule_length, mode=VCT, time_ms=300)
             
             # 4. Start Game
             print(f"\n--- 🎮 Starting: {mode} | Rule: {self.rule_length} | Theme: {self.current_theme} ---")
@@ -256,15 +267,26 @@ class GomokuGame:
         if length == 4: model_path = "models/connect4_graduation.keras"
         elif length == 5: model_path = "models/gomoku_rl_model_final.keras"
         elif length == 6: model_path = "models/connect6_rl_model_latest.keras"
+        # [NEW] quantized=True 才用 int8 版本, 而且它要比 .keras 新 (舊模型留下來的不算)
+        if self.quantized:
+            quantized_path = os.path.splitext(model_path)[0] + ".int8.tflite"
+            if not os.path.exists(quantized_path):
+                print(f"⚠️ {quantized_path} not found, using {model_path}")
+            elif os.path.exists(model_path) and os.path.getmtime(quantized_path) < os.path.getmtime(model_path):
+                print(f"⚠️ {quantized_path} is older than {model_path}, not used (run quantize_model.py again)")
+            else:
+                model_path = quantized_path
 
+        book = get_book(length)  # [NEW] books/book_<length>.bin, if one was built
         if os.path.exists(model_path):
             try:
-                self.ai = RL_AIPlayer(model_path=model_path)
+                self.ai = RL_AIPlayer(model_path=model_path, book=book)
+                print(f"✅ AI model: {model_path}")
             except Exception as e:
                 print(f"Error loading AI: {e}")
-                self.ai = RL_AIPlayer()
+                self.ai = RL_AIPlayer(book=book)
         else:
-            self.ai = RL_AIPlayer() 
+            self.ai = RL_AIPlayer(book=book) 
 
     def _reset_game_state(self):
         t_len = 5 if self.rule_length == 'go' else self.rule_length
@@ -275,6 +297,7 @@ class GomokuGame:
         self.game_over = False; self.force_quit_to_menu = False 
         self.winner = 0; self.current_player_color = 1 
         self.hint_pos = None; self.ghost_pos = None 
+        if self.hint_solver: self.hint_solver.new_game()
         self._redraw_board()
 
     def _play_match(self):
@@ -424,11 +447,13 @@ class GomokuGame:
         
         if self.board.check_win(m, n, color):
             self.game_over = True; self.winner = color
+            self._record_game()
             self._play_end_sound(color)
             self._redraw_board(); return 
 
         if self.board.is_full():
             self.game_over = True; self.winner = 0
+            self._record_game()
             self._play_end_sound(0)
             self._redraw_board(); return
 
@@ -440,6 +465,14 @@ class GomokuGame:
         
         self._redraw_board()
 
+    def _record_game(self):
+        """[NEW] 把下完的棋譜存到 records/games_<規則>.jsonl, 給 opening_book.py build 用 (record_games 才存)"""
+        if not self.record_games: return
+        try:
+            append_game(record_path(self.rule_length), self.rule_length, self.board.history, self.winner)
+        except OSError as e:
+            print(f"Warning: could not save the game record: {e}")
+
     def _trigger_ai_move(self):
         if self.rule_length == 'go': return
         ai_color = -1 
@@ -448,8 +481,13 @@ class GomokuGame:
 
     def _show_hint(self):
         if self.rule_length == 'go': return
-        self.hint_ai.ai_move_count = 100 
-        x, y = self.hint_ai.get_move(self.board.grid, -1, -1, self.current_player_color)
+        line = self.hint_solver.solve(self.board.grid, self.current_player_color) if self.hint_solver else None
+        if line:
+            print(f"💡 Forced win found: {line}")
+            x, y = line[0]
+        else:
+            self.hint_ai.ai_move_count = 100 
+            x, y = self.hint_ai.get_move(self.board.grid, -1, -1, self.current_player_color)
         self.hint_pos = (x, y); self._redraw_board()
 
     def _redraw_board(self, update=True):
@@ -0,0 +1,125 @@
+# incremental_eval.py
+# Persistent score maps for the heuristic teachers, kept in sync with a GameBoard.
+#
+# A teacher's score for an empty cell is built from 4 per-direction parts, and
+# the part along direction d only depends on the cells of the line d through
+# that cell. So when a stone is placed or undone at p, only the empty cells on
+# the 4 lines through p need that one direction recomputed (plus, for teachers
+# that skip cells far from any stone, the cells within that radius of p).
+# The maps are always identical to a full rescan.
+
+from constants import LEVEL
+from game_board import DIRECTIONS
+
+class IncrementalScoreMap:
+    """
+    direction_score(grid, x, y, d, color) -> score of DIRECTIONS[d] for the empty cell (x, y)
+    combine(parts) -> the teacher's per-cell value from the 4 parts (default: sum)
+    gate(grid, x, y) -> False if the teacher skips this empty cell entirely
+    gate_radius: how far a stone can reach to change gate()
+    """
+    def __init__(self, board, direction_score, combine=sum, gate=None, gate_radius=0, colors=(1, -1)):
+        self.board = board
+        self.level = LEVEL
+        self.direction_score = direction_score
+        self.combine = combine
+        self.gate = gate
+        self.gate_radius = gate_radius
+        self.colors = colors
+        self.parts = {c: [[0] * (LEVEL * LEVEL) for _ in DIRECTIONS] for c in colors}
+        self.maps = {c: [[combine([0, 0, 0, 0]) for _ in range(LEVEL)] for _ in range(LEVEL)] for c in colors}
+        self._synced = []
+        self._empty = None  # empty-board parts / maps, see reset()
+        # combine may return a list that the teacher writes into (connect6): copy cell by cell then
+        self._cell_lists = isinstance(combine([0, 0, 0, 0]), list)
+        self.rescan()
+
+    def scores(self, color):
+        """Up-to-date score map for color (treat as read-only)."""
+        self.sync()
+        return self.maps[color]
+
+    def rescan(self):
+        grid = self.board.grid
+        cells = [(x, y) for x in range(self.level) for y in range(self.level)]
+        for d in range(len(DIRECTIONS)):
+            for x, y in cells:
+                self._refresh_part(grid, d, x, y)
+        for x, y in cells:
+            self._refresh_cell(grid, x, y)
+        self._synced = self._stones()
+
+    def reset(self):
+        """[NEW] For a board that was just reset(): the empty-board maps, copied from a snapshot
+        (taken by the first call) instead of rescanning all 225 cells."""
+        if self._empty is None:
+            self.rescan()
+            self._empty = ({c: [part[:] for part in self.parts[c]] for c in self.colors},
+                           {c: self._copy_rows(self.maps[c]) for c in self.colors})
+        parts, maps = self._empty
+        for c in self.colors:
+            for d, part in enumerate(parts[c]):
+                self.parts[c][d][:] = part
+            for x, row in enumerate(self._copy_rows(maps[c])):
+                self.maps[c][x][:] = row
+        self._synced = []
+
+    def sync(self):
+        """Apply whatever moves/undos happened on the board since the last call."""
+        stones, synced = self._stones(), self._synced
+        if stones == synced: return
+        same = 0
+        limit = min(len(stones), len(synced))
+        while same < limit and stones[same] == synced[same]:
+            same += 1
+        changed = {(x, y) for x, y, _ in synced[same:]} | {(x, y) for x, y, _ in stones[same:]}
+        self._update(changed)
+        self._synced = stones
+
+    # --- Internals ---
+    def _copy_rows(self, rows):
+        if self._cell_lists: return [[cell[:] for cell in row] for row in rows]
+        return [row[:] for row in rows]
+
+    def _stones(self):
+        # history only holds (x, y): an undo followed by the other color on the
+        # same cell must still count as a change, so keep the color too
+        grid = self.board.grid
+        return [(x, y, grid[x][y]) for x, y in self.board.history]
+
+    def _update(self, changed):
+        grid, level = self.board.grid, self.level
+        parts_todo, cells_todo = set(), set()
+        for px, py in changed:
+            for d, (dx, dy) in enumerate(DIRECTIONS):
+                for sign in (1, -1):
+                    x, y = px, py
+                    while 0 <= x < level and 0 <= y < level:
+                        parts_todo.add((d, x, y))
+                        cells_todo.add((x, y))
+                        x += sign * dx; y += sign * dy
+            r = self.gate_radius
+            for x in range(max(0, px - r), min(level, px + r + 1)):
+                for y in range(max(0, py - r), min(level, py + r + 1)):
+                    cells_todo.add((x, y))
+
+        for d, x, y in parts_todo:
+            self._refresh_part(grid, d, x, y)
+        for x, y in cells_todo:
+            self._refresh_cell(grid, x, y)
+
+    def _refresh_part(self, grid, d, x, y):
+        idx = x * self.level + y
+        empty = grid[x][y] == 0
+        for c in self.colors:
+            self.parts[c][d][idx] = self.direction_score(grid, x, y, d, c) if empty else 0
+
+    def _refresh_cell(self, grid, x, y):
+        idx = x * self.level + y
+        scored = grid[x][y] == 0 and (self.gate is None or self.gate(grid, x, y))
+        for c in self.colors:
+            parts = self.parts[c]
+            if scored:
+                self.maps[c][x][y] = self.combine([parts[0][idx], parts[1][idx], parts[2][idx], parts[3][idx]])
+            else:
+                self.maps[c][x][y] = self.combine([0, 0, 0, 0])
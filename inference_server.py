@@ -0,0 +1,175 @@
+# inference_server.py
+# One owner of the policy/value network for many games: clients send their
+# (n, 15, 15, 3) inputs over a queue, the server coalesces whatever arrives
+# within max_wait_us (up to max_batch rows) into a single predict call and
+# sends each client its own rows back. New weights published by the learner
+# are applied between batches, and every reply carries the weight version.
+#
+# Runs as a process (it builds / loads the model itself, so the clients never
+# need TensorFlow) or as a thread around an existing model (search threads).
+
+import queue
+import threading
+import time
+import multiprocessing as mp
+import numpy as np
+
+_WEIGHTS = -1  # client slot of a weight swap message
+
+class InferenceClient:
+    """
+    Drop-in for model in RL_AIPlayer / MCTSPlayer: predict(batch, verbose=0) -> (policy, value).
+    One client per game loop / thread (each has its own reply queue); blocks until its rows come back.
+    """
+    def __init__(self, requests, responses, slot):
+        self.slot = slot
+        self.version = 0  # weight version of the last reply
+        self._requests = requests
+        self._responses = responses
+        self._next_id = 0
+
+    @classmethod
+    def connect(cls, handle):
+        """Claim the next free slot of InferenceServer.handle() (e.g. in a Pool initializer)."""
+        requests, responses, slots = handle
+        with slots.get_lock():
+            slot = slots.value
+            slots.value += 1
+        if slot >= len(responses):
+            raise RuntimeError(f"inference server has only {len(responses)} client slots")
+        return cls(requests, responses[slot], slot)
+
+    def predict(self, batch, verbose=0):
+        self._next_id += 1
+        self._requests.put((self.slot, self._next_id, np.ascontiguousarray(batch, dtype=np.float32)))
+        while True:
+            request_id, policy, value, version = self._responses.get()
+            if request_id == self._next_id: break  # anything older was for an abandoned call
+        self.version = version
+        return policy, value
+
+class InferenceServer:
+    """
+    model: serve this model from a thread in this process, or
+    model_path / weights: build it in a server process (weights only = fresh RL_AIPlayer network + set_weights).
+
+    max_batch: rows per predict call; max_wait_us: how long the first request of a batch waits for company
+    num_clients: reply queues to create (one per InferenceClient)
+    """
+    def __init__(self, model=None, model_path=None, weights=None, max_batch=32, max_wait_us=1000, num_clients=1):
+        self.model = model
+        self.model_path = model_path
+        self.weights = weights
+        self.max_batch = max_batch
+        self.max_wait_us = max_wait_us
+        self.num_clients = num_clients
+        self.version = 0
+
+        self.use_process = model is None
+        ctx = mp.get_context("spawn")
+        make_queue = ctx.Queue if self.use_process else queue.Queue
+        self._requests = make_queue()
+        self._responses = [make_queue() for _ in range(num_clients)]
+        self._slots = ctx.Value("i", 0)
+        self._worker = None
+
+    def handle(self):
+        """Picklable connection info for InferenceClient.connect (pass it to the pool at creation)."""
+        return self._requests, self._responses, self._slots
+
+    def client(self):
+        return InferenceClient.connect(self.handle())
+
+    def start(self):
+        args = (self._requests, self._responses, self.max_batch, self.max_wait_us)
+        if self.use_process:
+            ctx = mp.get_context("spawn")
+            self._worker = ctx.Process(target=_serve_process, args=(self.model_path, self.weights) + args,
+                                       daemon=True)
+        else:
+            self._worker = threading.Thread(target=serve, args=(self.model,) + args, daemon=True)
+        self._worker.start()
+        return self
+
+    def set_weights(self, weights):
+        """Hot-swap: requests queued after this one are answered with the new weights."""
+        self.version += 1
+        self._requests.put((_WEIGHTS, self.version, weights))
+        return self.version
+
+    def stop(self):
+        if self._worker is None: return
+        self._requests.put(None)
+        self._worker.join()
+        self._worker = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+def _serve_process(model_path, weights, requests, responses, max_batch, max_wait_us):
+    import os
+    os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+    from rl_ai_player import RL_AIPlayer
+    model = RL_AIPlayer(model_path=model_path).model
+    if weights is not None:
+        model.set_weights(weights)
+    serve(model, requests, responses, max_batch, max_wait_us)
+
+def _bucket(n, max_batch):
+    """Pad batches to a power of two so the model only ever sees a few input shapes."""
+    size = 1
+    while size < n: size *= 2
+    return max(n, min(size, max_batch))
+
+def _answer(predict, pending, rows, max_batch, responses, version):
+    """One predict over the gathered requests, each client gets its own rows back."""
+    batch = np.concatenate([inputs for _, _, inputs in pending]) if len(pending) > 1 else pending[0][2]
+    size = _bucket(rows, max_batch)
+    if size > rows:
+        batch = np.concatenate([batch, np.zeros((size - rows,) + batch.shape[1:], dtype=batch.dtype)])
+    policy, value = predict(batch)
+    policy, value = np.asarray(policy), np.asarray(value)
+    start = 0
+    for slot, request_id, inputs in pending:
+        end = start + len(inputs)
+        responses[slot].put((request_id, policy[start:end], value[start:end], version))
+        start = end
+
+def serve(model, requests, responses, max_batch, max_wait_us):
+    """Server loop: until a None message, gather a batch, run one predict, scatter the rows."""
+    predict = getattr(model, "predict_on_batch", None) or (lambda x: model.predict(x, verbose=0))
+    max_wait = max_wait_us / 1e6
+    version = 0
+    running = True
+    while running:
+        pending, rows, swap = [], 0, None
+        item = requests.get()
+        deadline = time.perf_counter() + max_wait
+        while True:
+            if item is None:
+                running = False
+            elif item[0] == _WEIGHTS:
+                if pending:
+                    swap = item  # the rows gathered so far were queued before it: answer them on the old weights
+                    break
+                _, version, weights = item
+                model.set_weights(weights)
+            else:
+                pending.append(item)
+                rows += len(item[2])
+            if not running or rows >= max_batch: break
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0: break
+            try:
+                item = requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+        if pending:
+            _answer(predict, pending, rows, max_batch, responses, version)
+        if swap is not None:
+            _, version, weights = swap
+            model.set_weights(weights)
+
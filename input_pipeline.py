@@ -0,0 +1,81 @@
+# input_pipeline.py
+# Training input as a streaming tf.data pipeline. The replay memory holds
+# one packed sample per position (sample_codec.py); batches are drawn from it
+# lazily by a generator, then decoded and turned by a rotation / reflection
+# (the 8 symmetries of the board, the dihedral group D4) inside a parallel
+# tf.data map, with prefetching, so augmentation never materializes the 8
+# copies and runs while the previous batch trains.
+#
+#   augment=RANDOM: one random symmetry per sample (fit sees num_samples samples)
+#   augment=ALL:    all 8 symmetries of num_samples / 8 samples, like the old get_symmetries
+#   augment=None:   samples as stored
+
+import numpy as np
+from constants import LEVEL
+from eval_cache import SYMMETRY_PERMS
+from sample_codec import CELLS, PACKED_BYTES
+
+RANDOM, ALL = "random", "all"
+
+# _INVERSE[s][i] = cell that symmetry s moves to cell i
+_INVERSE = np.argsort(SYMMETRY_PERMS, axis=1).astype(np.int32)
+
+def _decode_and_augment(planes, moves, values, weights, augment):
+    """One packed batch -> (states, policy targets, value targets, weights) tensors, vectorized over the batch."""
+    import tensorflow as tf
+    if augment == ALL:
+        n = tf.shape(planes)[0]
+        symmetry = tf.tile(tf.range(8), [n])
+        planes, moves = tf.repeat(planes, 8, axis=0), tf.repeat(moves, 8, axis=0)
+        values, weights = tf.repeat(values, 8, axis=0), tf.repeat(weights, 8, axis=0)
+    elif augment == RANDOM:
+        symmetry = tf.random.uniform(tf.shape(moves), 0, 8, dtype=tf.int32)
+    moves = tf.cast(moves, tf.int32)
+
+    # Unpack the bits (np.packbits order: the first cell is the high bit)
+    shifts = tf.constant([7, 6, 5, 4, 3, 2, 1, 0], dtype=tf.uint8)
+    bits = tf.bitwise.bitwise_and(tf.bitwise.right_shift(planes[:, :, None], shifts), 1)
+    bits = tf.reshape(tf.reshape(bits, [-1, PACKED_BYTES * 8])[:, :2 * CELLS], [-1, 2, CELLS])
+    if augment is not None:
+        bits = tf.gather(bits, tf.gather(_INVERSE, symmetry), axis=2, batch_dims=1)
+        moves = tf.gather(tf.gather(SYMMETRY_PERMS.astype(np.int32), symmetry), moves, batch_dims=1)
+
+    stones = tf.transpose(tf.cast(tf.reshape(bits, [-1, 2, LEVEL, LEVEL]), tf.float32), [0, 2, 3, 1])
+    states = tf.concat([stones, tf.ones_like(stones[..., :1])], axis=-1)
+    return states, moves, tf.cast(values, tf.float32), weights
+
+def replay_dataset(replay, num_samples, batch_size=512, augment=RANDOM, output_names=None, weighted=False,
+                   drawn=None):
+    """
+    tf.data.Dataset of num_samples training samples from a ReplayBuffer / ReplayStore, batch by batch:
+    (states, targets) or, if weighted, (states, targets, sample weights), with targets / weights
+    listed in output_names order (the model's outputs). drawn: a list that gets
+    (slots, planes, moves, values) of every batch as it is drawn, e.g. for priority updates.
+    """
+    import tensorflow as tf
+    output_names = output_names or ["policy_output", "value_output"]
+    per_batch = max(1, batch_size // 8) if augment == ALL else batch_size
+    total = -(-num_samples // 8) if augment == ALL else num_samples
+
+    def batches():
+        for start in range(0, total, per_batch):
+            slots, planes, moves, values, weights = replay.sample_packed(min(per_batch, total - start))
+            if drawn is not None:
+                drawn.append((slots, planes, moves, values))
+            yield planes, moves, values, weights
+
+    dataset = tf.data.Dataset.from_generator(batches, output_signature=(
+        tf.TensorSpec((None, PACKED_BYTES), tf.uint8), tf.TensorSpec((None,), tf.uint8),
+        tf.TensorSpec((None,), tf.float16), tf.TensorSpec((None,), tf.float32)))
+    dataset = dataset.apply(tf.data.experimental.assert_cardinality(-(-total // per_batch)))  # fit knows the steps
+
+    def to_model_input(planes, moves, values, weights):
+        states, moves, values, weights = _decode_and_augment(planes, moves, values, weights, augment)
+        targets = {"policy_output": moves, "value_output": values}
+        targets = tuple(targets[name] for name in output_names)
+        if weighted:
+            return states, targets, tuple(weights for _ in output_names)
+        return states, targets
+
+    return (dataset.map(to_model_input, num_parallel_calls=tf.data.AUTOTUNE, deterministic=False)
+            .prefetch(tf.data.AUTOTUNE))
@@ -1,8 +1,12 @@
 # main.py
 # 程式主進入點
+#   python main.py            一般遊玩
+#   python main.py --record   [NEW] 另外把每局棋譜存到 records/ (給 opening_book.py 用)
+#   python main.py --int8     [NEW] 用 quantize_model.py 產生的 int8 模型 (比 .keras 新才會用)
 
+import sys
 from gomoku_game import GomokuGame
 
 if __name__ == "__main__":
-    game = GomokuGame()
+    game = GomokuGame(record_games="--record" in sys.argv, quantized="--int8" in sys.argv)
     game.run()
\ No newline at end of file
@@ -0,0 +1,215 @@
+# mcts_player.py
+# PUCT Monte Carlo tree search on top of the RL_AIPlayer policy/value network
+# (AlphaZero style). Leaves are collected with virtual loss and sent to the
+# network in one batch, the tree under the chosen move is kept for the next
+# call, and Dirichlet noise can be mixed into the root priors for self-play.
+
+import time
+import numpy as np
+from constants import LEVEL
+from game_board import GameBoard
+
+class _Node:
+    """One position. Edge statistics of its children live in arrays indexed like `moves`."""
+    __slots__ = ("moves", "prior", "net_prior", "visits", "value_sum", "children", "terminal", "expanded")
+
+    def __init__(self):
+        self.moves = None      # legal flat move indices
+        self.prior = None      # P(s, a)
+        self.net_prior = None  # P(s, a) as the network gave it, before any root noise
+        self.visits = None     # N(s, a)
+        self.value_sum = None  # W(s, a), from the point of view of the player to move here
+        self.children = {}     # slot in moves -> _Node
+        self.terminal = None   # value for the player to move if the game is over here
+        self.expanded = False
+
+    def expand(self, legal, policy):
+        self.moves = np.flatnonzero(legal)
+        prior = policy[self.moves].astype(np.float64)
+        total = prior.sum()
+        self.prior = prior / total if total > 0 else np.full(len(self.moves), 1.0 / len(self.moves))
+        self.net_prior = self.prior
+        self.visits = np.zeros(len(self.moves))
+        self.value_sum = np.zeros(len(self.moves))
+        self.expanded = True
+
+class MCTSPlayer:
+    """
+    model: anything with predict(batch, verbose=0) -> (policy (N, 225), value (N, 1)),
+    e.g. RL_AIPlayer().model. Same get_move(board_grid, player_color) as RL_AIPlayer.
+
+    simulations / time_ms: budget per move (time_ms wins if both are set)
+    batch_size: leaves evaluated per predict call
+    noise: mix Dir(dirichlet_alpha) into the root priors (self-play only)
+    temperature: 0 = play the most visited move, 1 = sample proportionally to visits
+    """
+    def __init__(self, model, target_length=5, simulations=200, time_ms=None, batch_size=8, c_puct=1.5,
+                 noise=False, dirichlet_alpha=0.3, noise_fraction=0.25, temperature=0.0, virtual_loss=1.0,
+                 book=None):
+        self.level = LEVEL
+        self.model = model
+        self.target_length = target_length
+        self.simulations = simulations
+        self.time_ms = time_ms
+        self.batch_size = batch_size
+        self.c_puct = c_puct
+        self.noise = noise
+        self.dirichlet_alpha = dirichlet_alpha
+        self.noise_fraction = noise_fraction
+        self.temperature = temperature
+        self.virtual_loss = virtual_loss
+        self.book = book  # optional opening_book.OpeningBook, consulted before searching
+
+        self.root = None
+        self._root_grid = None  # position the kept root belongs to
+        self.last_visits = None  # (225,) visit distribution of the last search (a policy target)
+        self.last_value = 0.0
+        self.predict_calls = 0
+
+        self._inputs = np.zeros((batch_size, self.level, self.level, 3), dtype=np.float32)
+        self._inputs[..., 2] = 1.0
+
+    def reset(self):
+        """Forget the tree (new game)."""
+        self.root = None
+        self._root_grid = None
+
+    # --- Public API ---
+    def get_move(self, board_grid, player_color):
+        grid = np.asarray(board_grid, dtype=np.int8)
+        if self.book is not None:
+            move = self.book.choose(grid, player_color)
+            if move is not None:
+                self.reset()  # the kept tree does not know about this move
+                return move
+        board = GameBoard(target_length=self.target_length, numpy_grid=True)
+        for x, y in zip(*np.nonzero(grid)):
+            board.place_stone(int(x), int(y), int(grid[x, y]))
+        if board.move_count == 0:
+            self.reset()
+        if board.is_full(): return -1, -1
+
+        root = self._reuse_root(grid)
+        if not root.expanded:
+            self._evaluate([(root, [], player_color, self._encode(board, player_color))])
+        if self.noise:
+            noise = np.random.dirichlet([self.dirichlet_alpha] * len(root.moves))
+            # Mixed into the network's prior, not the current one: a kept root would pile noise on noise
+            root.prior = (1 - self.noise_fraction) * root.net_prior + self.noise_fraction * noise
+
+        self._search(board, root, player_color)
+
+        visits = root.visits
+        if self.temperature > 0:
+            probs = visits ** (1.0 / self.temperature)
+            slot = int(np.random.choice(len(visits), p=probs / probs.sum()))
+        else:
+            slot = int(np.argmax(visits))
+        self.last_visits = np.zeros(self.level * self.level, dtype=np.float32)
+        self.last_visits[root.moves] = visits / max(visits.sum(), 1)
+        self.last_value = float(root.value_sum.sum() / max(visits.sum(), 1))
+
+        move = int(root.moves[slot])
+        # Keep the subtree under our move; the opponent's reply picks the next root
+        self.root = root.children.get(slot)
+        self._root_grid = grid.copy()
+        self._root_grid.flat[move] = player_color
+        return move // self.level, move % self.level
+
+    # --- Search ---
+    def _reuse_root(self, grid):
+        """The kept child for the opponent's reply if the position followed on from our last move."""
+        root = self.root
+        if root is not None and self._root_grid is not None:
+            diff = np.flatnonzero(grid.ravel() != self._root_grid.ravel())
+            if len(diff) == 1 and self._root_grid.flat[diff[0]] == 0 and root.expanded:
+                slots = np.flatnonzero(root.moves == diff[0])
+                if len(slots) and slots[0] in root.children:
+                    return root.children[slots[0]]
+            elif len(diff) == 0 and root.expanded:
+                return root
+        return _Node()
+
+    def _search(self, board, root, color):
+        deadline = time.perf_counter() + self.time_ms / 1000.0 if self.time_ms else None
+        done = 0
+        while True:
+            if deadline is not None:
+                if time.perf_counter() > deadline: break
+            elif done >= self.simulations: break
+            leaves = []
+            for _ in range(self.batch_size):
+                leaf = self._select(board, root, color)
+                done += 1
+                if leaf is None: continue
+                leaves.append(leaf)
+            if leaves: self._evaluate(leaves)
+
+    def _select(self, board, root, color):
+        """
+        Walk down by PUCT to an unexpanded node, adding virtual loss on the way.
+        Terminal leaves are backed up at once (returns None); otherwise returns
+        (node, path, color to move at node) for batched evaluation.
+        """
+        node, path = root, []
+        while node.expanded and node.terminal is None:
+            total = node.visits.sum()
+            q = np.divide(node.value_sum, node.visits, out=np.zeros_like(node.value_sum), where=node.visits > 0)
+            u = self.c_puct * node.prior * np.sqrt(total + 1) / (1 + node.visits)
+            slot = int(np.argmax(q + u))
+            move = int(node.moves[slot])
+            node.visits[slot] += self.virtual_loss
+            node.value_sum[slot] -= self.virtual_loss
+            path.append((node, slot))
+            x, y = move // self.level, move % self.level
+            board.place_stone(x, y, color)
+            child = node.children.get(slot)
+            if child is None:
+                child = node.children[slot] = _Node()
+                if board.check_win(x, y, color): child.terminal = -1.0  # the player to move there has lost
+                elif board.is_full(): child.terminal = 0.0
+            node = child
+            color = -color
+
+        if node.terminal is not None:
+            self._backup(path, node.terminal)
+            self._undo(board, len(path))
+            return None
+        # The leaf's input is taken now, while the board still holds its position
+        planes = self._encode(board, color)
+        self._undo(board, len(path))
+        return node, path, color, planes
+
+    def _undo(self, board, n):
+        for _ in range(n):
+            board.undo_last_move()
+
+    def _encode(self, board, color):
+        """Own / opponent stone planes of the current position (the constant plane is in the batch buffer)."""
+        planes = np.empty((self.level, self.level, 2), dtype=np.float32)
+        np.equal(board.array, color, out=planes[..., 0])
+        np.equal(board.array, -color, out=planes[..., 1])
+        return planes
+
+    def _evaluate(self, leaves):
+        """One predict call for all leaves, then expand + back up each of them."""
+        n = len(leaves)
+        batch = self._inputs[:n]
+        for i, (_, _, _, planes) in enumerate(leaves):
+            batch[i, :, :, :2] = planes
+        policy, value = self.model.predict(batch, verbose=0)
+        self.predict_calls += 1
+        policy, value = np.asarray(policy).reshape(n, -1), np.asarray(value).reshape(n)
+
+        for i, (node, path, color, planes) in enumerate(leaves):
+            if not node.expanded:
+                legal = (planes[..., 0] == 0) & (planes[..., 1] == 0)
+                node.expand(legal.ravel(), policy[i])
+            self._backup(path, float(value[i]))
+
+    def _backup(self, path, value):
+        """value is for the player to move at the leaf; undo virtual loss and add the real result."""
+        for node, slot in reversed(path):
+            value = -value
+            node.visits[slot] += 1 - self.virtual_loss
+            node.value_sum[slot] += value + self.virtual_loss
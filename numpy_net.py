@@ -0,0 +1,143 @@
+# numpy_net.py
+# Inference-only copy of the RL_AIPlayer network in plain NumPy, so actor
+# processes can play without importing TensorFlow.
+#
+# The BatchNormalization layers (which come after each ReLU) are folded
+# into the convolution that follows them: their per-channel scale goes into
+# the kernel, their shift into the bias. For the 3x3 convolutions the shift
+# is not seen through the zero padding at the edges, so their folded bias is
+# a (15, 15, C) map instead of a vector. The convolutions run as im2col + one
+# matmul each.
+#
+#   python numpy_net.py model.keras model.npz   # export
+#   RL_AIPlayer(model_path="model.npz")          # play with the exported net
+
+import sys
+import numpy as np
+from constants import LEVEL
+
+BN_EPSILON = 1e-3  # keras BatchNormalization default
+
+def _group_layers(weights):
+    """
+    Split a get_weights() list into [kernel, bias, *bn] groups: every array
+    with 2+ dims starts a layer, its bias follows, and the four 1-D arrays
+    after a convolution's bias are the BatchNormalization after it.
+    """
+    groups = []
+    for w in weights:
+        w = np.asarray(w, dtype=np.float32)
+        if w.ndim >= 2 or not groups:
+            groups.append([w])
+        else:
+            groups[-1].append(w)
+    return groups
+
+def fold_weights(weights, epsilon=BN_EPSILON):
+    """Keras get_weights() of RL_AIPlayer._build_model -> dict of folded arrays (see module comment)."""
+    trunk, heads = [], {}
+    for group in _group_layers(weights):
+        kernel = group[0]
+        if kernel.shape[:2] == (3, 3):
+            if len(group) != 6:
+                raise ValueError(f"3x3 convolution {kernel.shape} is not followed by BatchNormalization")
+            trunk.append(group)
+        elif kernel.ndim == 4:
+            heads["policy_conv" if kernel.shape[-1] == 2 else "value_conv"] = group
+        elif kernel.shape[1] == LEVEL * LEVEL:
+            heads["policy_dense"] = group
+        elif kernel.shape[1] == 1:
+            heads["value_out"] = group
+        else:
+            heads["value_dense"] = group
+    if len(trunk) != 3 or len(heads) != 5:
+        raise ValueError("weights do not match the RL_AIPlayer architecture")
+
+    arrays = {}
+    scale, shift = None, None  # BatchNormalization waiting to be folded into the next layer
+    for i, (kernel, bias, gamma, beta, mean, var) in enumerate(trunk):
+        if scale is None:
+            bias_map = np.broadcast_to(bias, (LEVEL, LEVEL, len(bias)))
+        else:
+            bias_map = bias + _conv3x3(np.broadcast_to(shift, (1, LEVEL, LEVEL, len(shift))), kernel)[0]
+            kernel = kernel * scale[:, None]
+        arrays[f"conv{i}_kernel"] = kernel.reshape(-1, kernel.shape[-1])
+        arrays[f"conv{i}_bias"] = np.ascontiguousarray(bias_map, dtype=np.float32)
+        scale = gamma / np.sqrt(var + epsilon)
+        shift = beta - mean * scale
+
+    for name in ("policy_conv", "value_conv"):
+        kernel, bias = heads[name]
+        kernel = kernel.reshape(kernel.shape[-2:])  # 1x1 convolution = matmul over channels
+        arrays[name + "_kernel"] = kernel * scale[:, None]
+        arrays[name + "_bias"] = bias + shift @ kernel
+    for name in ("policy_dense", "value_dense", "value_out"):
+        arrays[name + "_kernel"], arrays[name + "_bias"] = heads[name]
+    return {k: np.array(v, dtype=np.float32, order="C") for k, v in arrays.items()}  # owned copies
+
+def _conv3x3(x, kernel):
+    """'same' 3x3 convolution of (N, H, W, C) by a (3, 3, C, K) kernel (no bias)."""
+    return _im2col(x) @ kernel.reshape(-1, kernel.shape[-1])
+
+def _im2col(x):
+    """(N, H, W, C) -> (N, H, W, 9C) patches, in the (row, col, channel) order of a flattened kernel."""
+    n, h, w, c = x.shape
+    padded = np.zeros((n, h + 2, w + 2, c), dtype=np.float32)
+    padded[:, 1:-1, 1:-1] = x
+    return np.concatenate([padded[:, dx:dx + h, dy:dy + w] for dx in range(3) for dy in range(3)], axis=-1)
+
+def export_weights(model, path):
+    """Fold a keras model (or a .keras file) and save it as an .npz for NumpyNet."""
+    if isinstance(model, str):
+        from tensorflow import keras
+        model = keras.models.load_model(model)
+    np.savez(path, **fold_weights(model.get_weights()))
+
+class NumpyNet:
+    """
+    Same predict(batch, verbose=0) -> (policy (N, 225), value (N, 1)) as the keras model.
+    source: an exported .npz path, a fold_weights() dict, a raw keras get_weights() list,
+    or None (no weights until set_weights).
+    set_weights(keras weights) refolds, so it can follow the learner like the keras model does.
+    """
+    def __init__(self, source):
+        if isinstance(source, str):
+            with np.load(source) as data:
+                source = {k: data[k] for k in data.files}
+        if source is not None and not isinstance(source, dict):
+            source = fold_weights(source)
+        self.arrays = source
+
+    def set_weights(self, weights):
+        self.arrays = fold_weights(weights)
+
+    def predict(self, batch, verbose=0):
+        a = self.arrays
+        x = np.asarray(batch, dtype=np.float32)
+        n = len(x)
+        for i in range(3):
+            x = _im2col(x) @ a[f"conv{i}_kernel"]
+            x += a[f"conv{i}_bias"]
+            np.maximum(x, 0, out=x)
+        features = x.reshape(n * LEVEL * LEVEL, -1)
+
+        p = np.maximum(features @ a["policy_conv_kernel"] + a["policy_conv_bias"], 0).reshape(n, -1)
+        p = p @ a["policy_dense_kernel"] + a["policy_dense_bias"]
+        p -= p.max(axis=1, keepdims=True)
+        np.exp(p, out=p)
+        p /= p.sum(axis=1, keepdims=True)
+
+        v = np.maximum(features @ a["value_conv_kernel"] + a["value_conv_bias"], 0).reshape(n, -1)
+        v = np.maximum(v @ a["value_dense_kernel"] + a["value_dense_bias"], 0)
+        v = np.tanh(v @ a["value_out_kernel"] + a["value_out_bias"])
+        return p, v
+
+    def predict_on_batch(self, batch):
+        return self.predict(batch)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python numpy_net.py model.keras model.npz")
+        sys.exit(1)
+    export_weights(sys.argv[1], sys.argv[2])
+    print(f"saved {sys.argv[2]}")
@@ -0,0 +1,221 @@
+# opening_book.py
+# Opening book: move statistics of the first plies of recorded games
+# (teacher / self-play / LAN), per position up to symmetry, in one sorted
+# binary file per rule that is memory-mapped and binary-searched. A book hit
+# is a hash + a searchsorted, a few tens of microseconds.
+#
+#   python main.py --record                                    # save finished games to records/
+#   python opening_book.py build 5 records/games_5.jsonl ...   # from game records
+#   python opening_book.py selfplay 5 2000                     # from AIPlayer games
+#   -> books/book_5.bin, picked up by get_book(5)
+#
+# File layout (little endian): 32-byte header ("GBK1", version, rule,
+# max_depth, entry count), then the columns keys (u8), games (u4),
+# score (f4), moves (u2), sorted by key and then by games (most played first).
+# keys / moves are in the canonical orientation of eval_cache.canonical_keys.
+
+import os
+import sys
+import json
+import struct
+from random import random, randint
+import numpy as np
+from constants import LEVEL
+from eval_cache import SYMMETRY_PERMS, symmetric_hashes
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+BOOK_DIR = os.path.join(_HERE, "books")  # both next to the code, whatever the cwd
+RECORD_DIR = os.path.join(_HERE, "records")
+MAGIC = b"GBK1"
+VERSION = 1
+_HEADER = struct.Struct("<4sIiiQ8x")  # 32 bytes
+
+# _INVERSE[s][canonical cell] = cell in the query's orientation
+_INVERSE = np.argsort(SYMMETRY_PERMS, axis=1)
+
+def book_path(rule):
+    return os.path.join(BOOK_DIR, f"book_{rule}.bin")
+
+def record_path(rule):
+    return os.path.join(RECORD_DIR, f"games_{rule}.jsonl")
+
+# --- Game records ---
+def append_game(path, rule, moves, winner):
+    """One game per line: {"rule": 5, "moves": [[x, y], ...] (Black first), "winner": 1 / -1 / 0}."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"rule": rule, "moves": [[int(x), int(y)] for x, y in moves],
+                            "winner": int(winner)}) + "\n")
+
+def load_games(path, rule=None):
+    games = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip(): continue
+            game = json.loads(line)
+            if rule is None or game.get("rule") == rule:
+                games.append((game["moves"], game["winner"]))
+    return games
+
+def _canonical(array, color):
+    """
+    (key, symmetries): the position's smallest symmetric hash and every symmetry that
+    gives it (more than one when the position is itself symmetric).
+    """
+    planes = np.empty((1, LEVEL, LEVEL, 2), dtype=np.float32)
+    np.equal(array, color, out=planes[0, :, :, 0])
+    np.equal(array, -color, out=planes[0, :, :, 1])
+    hashes = symmetric_hashes(planes)[0]
+    key = hashes.min()
+    return int(key), np.flatnonzero(hashes == key)
+
+# --- Building ---
+class BookBuilder:
+    """Aggregates (position, move) -> games played / score for the mover over the first max_depth plies."""
+    def __init__(self, rule, max_depth=8):
+        self.rule = rule
+        self.max_depth = max_depth
+        self.stats = {}  # (key, canonical move) -> [games, score sum]
+        self.games = 0
+
+    def add_game(self, moves, winner):
+        board = np.zeros((LEVEL, LEVEL), dtype=np.int8)
+        color = 1
+        for x, y in moves[:self.max_depth]:
+            if board[x, y] != 0: break  # broken record
+            key, symmetries = _canonical(board, color)
+            # Moves that are the same up to the position's own symmetry share one entry
+            move = int(SYMMETRY_PERMS[symmetries, x * LEVEL + y].min())
+            entry = self.stats.setdefault((key, move), [0, 0.0])
+            entry[0] += 1
+            entry[1] += 1.0 if winner == color else 0.5 if winner == 0 else 0.0
+            board[x, y] = color
+            color = -color
+        self.games += 1
+
+    def write(self, path=None, min_games=1):
+        """Entries played fewer than min_games times are left out."""
+        path = path or book_path(self.rule)
+        items = [(k, m, g, s / g) for (k, m), (g, s) in self.stats.items() if g >= min_games]
+        keys = np.array([i[0] for i in items], dtype=np.uint64)
+        moves = np.array([i[1] for i in items], dtype=np.uint16)
+        games = np.array([i[2] for i in items], dtype=np.uint32)
+        score = np.array([i[3] for i in items], dtype=np.float32)
+        order = np.lexsort((-games.astype(np.int64), keys))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, self.rule, self.max_depth, len(items)))
+            for column in (keys, games, score, moves):
+                f.write(column[order].tobytes())
+        return path
+
+# --- Lookup ---
+class OpeningBook:
+    """
+    Memory-mapped book. lookup(board_grid, color) -> [(x, y, games, score), ...] for the side
+    to move, most played first; choose() picks one of them (or None: not in the book).
+    In a symmetric position, each entry is one of its equivalent cells at random.
+    """
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version, rule, max_depth, n = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not an opening book")
+        self.rule = rule
+        self.max_depth = max_depth
+        self.size = n
+        offset = _HEADER.size
+        columns = []
+        for dtype in (np.uint64, np.uint32, np.float32, np.uint16):
+            columns.append(np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(n,)) if n else
+                           np.zeros(0, dtype=dtype))
+            offset += n * np.dtype(dtype).itemsize
+        self.keys, self.games, self.score, self.moves = columns
+        self.hits = 0
+        self.lookups = 0
+
+    def lookup(self, board_grid, color):
+        array = np.asarray(board_grid)
+        if np.count_nonzero(array) >= self.max_depth or self.size == 0: return []
+        self.lookups += 1
+        key, symmetries = _canonical(array, color)
+        key = np.uint64(key)
+        start = int(np.searchsorted(self.keys, key, side="left"))
+        end = int(np.searchsorted(self.keys, key, side="right"))
+        result = []
+        for i in range(start, end):
+            cells = np.unique(_INVERSE[symmetries, self.moves[i]])
+            cell = int(cells[randint(0, len(cells) - 1)])
+            x, y = cell // LEVEL, cell % LEVEL
+            if array[x, y] == 0:
+                result.append((x, y, int(self.games[i]), float(self.score[i])))
+        if result: self.hits += 1
+        return result
+
+    def choose(self, board_grid, color, min_games=2, min_score=0.3):
+        """
+        A book move at random, weighted by how often it was played, among the moves seen
+        at least min_games times that scored at least min_score; None if there is none.
+        """
+        entries = [e for e in self.lookup(board_grid, color) if e[2] >= min_games and e[3] >= min_score]
+        if not entries: return None
+        pick = random() * sum(e[2] for e in entries)
+        for x, y, games, _ in entries:
+            pick -= games
+            if pick < 0: return x, y
+        return entries[-1][0], entries[-1][1]
+
+_BOOKS = {}
+
+def get_book(rule):
+    """The process-wide book for a rule (books/book_<rule>.bin), or None if there is no such file."""
+    if rule not in _BOOKS:
+        path = book_path(rule)
+        _BOOKS[rule] = OpeningBook(path) if os.path.exists(path) else None
+    return _BOOKS[rule]
+
+def selfplay_games(rule, num_games, mistake_rate=0.1):
+    """AIPlayer-vs-AIPlayer records (move list, winner); the first move is near the center, not always on it."""
+    from game_board import GameBoard
+    from ai_player import AIPlayer
+    from ai_player_connect4 import TeacherAI_4Row
+    from ai_player_connect6 import AIPlayer as AIPlayer6
+
+    def teacher():
+        if rule == 4: return TeacherAI_4Row(target_length=4)
+        if rule == 6: return AIPlayer6(target_length=6)
+        return AIPlayer(target_length=rule)
+
+    games = []
+    for _ in range(num_games):
+        board = GameBoard(target_length=rule, track_frontier=True)
+        players = {1: teacher(), -1: teacher()}
+        for p in players.values(): p.ai_move_count = 1  # skip the random autoplay openings
+        x, y = LEVEL // 2 + randint(-1, 1), LEVEL // 2 + randint(-1, 1)
+        color, winner = 1, 0
+        while True:
+            board.place_stone(x, y, color)
+            if board.check_win(x, y, color): winner = color; break
+            if board.is_full(): break
+            color = -color
+            if random() < mistake_rate: x, y = board.random_empty()
+            else: x, y = players[color].get_move(board.grid, x, y, color)
+            if not board.is_empty(x, y): x, y = board.random_empty()
+        games.append((list(board.history), winner))
+    return games
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] not in ("build", "selfplay"):
+        print("usage: python opening_book.py build RULE records.jsonl ... | selfplay RULE NUM_GAMES")
+        sys.exit(1)
+    rule = int(sys.argv[2])
+    builder = BookBuilder(rule)
+    if sys.argv[1] == "build":
+        for path in sys.argv[3:]:
+            for moves, winner in load_games(path, rule):
+                builder.add_game(moves, winner)
+    else:
+        for moves, winner in selfplay_games(rule, int(sys.argv[3])):
+            builder.add_game(moves, winner)
+    path = builder.write()
+    print(f"{builder.games} games -> {len(builder.stats)} positions/moves, saved {path}")
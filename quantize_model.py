@@ -0,0 +1,142 @@
+# quantize_model.py
+# Int8 / float16 TFLite versions of the RL_AIPlayer network for CPU-only
+# actors and the interactive game, with a calibration set recorded from
+# teacher games and an accuracy report against the float model.
+#
+#   python quantize_model.py models/gomoku_rl_model_final.keras int8 [positions.npy]
+#   -> models/gomoku_rl_model_final.int8.tflite, then RL_AIPlayer(model_path=...) loads it
+#      (python main.py --int8 plays with it, as long as it is newer than the .keras file)
+#
+# int8: per-channel int8 weights (conv + dense) and int8 activations, with
+#       the activation ranges calibrated on recorded positions
+# float16: float16 weights (half the size; the CPU kernels compute in float32)
+
+import os
+import sys
+import numpy as np
+from random import random
+from constants import LEVEL
+
+INT8, FLOAT16 = "int8", "float16"
+
+def record_positions(num_games=20, target_length=5, mistake_rate=0.3):
+    """
+    Calibration / test set: the (N, 15, 15, 3) network input of every position
+    of AIPlayer-vs-AIPlayer games, for the side to move. mistake_rate of the
+    moves are random so the set is not just one opening.
+    """
+    from game_board import GameBoard
+    from ai_player import AIPlayer
+
+    positions = []
+    for _ in range(num_games):
+        board = GameBoard(target_length=target_length, numpy_grid=True, track_frontier=True)
+        players = {1: AIPlayer(target_length=target_length), -1: AIPlayer(target_length=target_length)}
+        color, last = 1, (-1, -1)
+        while True:
+            planes = np.zeros((LEVEL, LEVEL, 3), dtype=np.float32)
+            np.equal(board.array, color, out=planes[..., 0])
+            np.equal(board.array, -color, out=planes[..., 1])
+            planes[..., 2] = 1.0
+            positions.append(planes)
+
+            if random() < mistake_rate: x, y = board.random_empty()
+            else: x, y = players[color].get_move(board.grid, last[0], last[1], color)
+            if not board.is_empty(x, y): x, y = board.random_empty()
+            board.place_stone(x, y, color)
+            if board.check_win(x, y, color) or board.is_full(): break
+            color, last = -color, (x, y)
+    return np.stack(positions)
+
+def convert(model, mode=INT8, calibration=None):
+    """Keras model -> TFLite flatbuffer (bytes). int8 needs calibration positions."""
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == FLOAT16:
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == INT8:
+        if calibration is None or len(calibration) == 0:
+            raise ValueError("int8 quantization needs calibration positions")
+        def representative_dataset():
+            for i in range(len(calibration)):
+                yield [np.asarray(calibration[i:i + 1], dtype=np.float32)]
+        converter.representative_dataset = representative_dataset
+        # Every op in int8 (inputs / outputs stay float32, converted at the edges)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    else:
+        raise ValueError(f"unknown quantization mode: {mode}")
+    return converter.convert()
+
+class TFLiteNet:
+    """
+    A .tflite network with the keras model's predict(batch, verbose=0) -> (policy (N, 225), value (N, 1)).
+    Uses tflite_runtime if it is installed (no TensorFlow import), else tf.lite.
+    """
+    def __init__(self, model_path, num_threads=1):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]["index"]
+        outputs = self.interpreter.get_output_details()
+        self._policy = next(o["index"] for o in outputs if o["shape"][-1] == LEVEL * LEVEL)
+        self._value = next(o["index"] for o in outputs if o["shape"][-1] == 1)
+        self._batch = 1
+
+    def predict(self, batch, verbose=0):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        if len(batch) != self._batch:
+            self.interpreter.resize_tensor_input(self._input, list(batch.shape))
+            self.interpreter.allocate_tensors()
+            self._batch = len(batch)
+        self.interpreter.set_tensor(self._input, batch)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._policy).copy(), self.interpreter.get_tensor(self._value).copy()
+
+    def predict_on_batch(self, batch):
+        return self.predict(batch)
+
+def accuracy_report(reference, candidate, positions, batch_size=64):
+    """
+    Both models' predict on the same positions:
+    top1 = share of positions where the best legal move is the same, value_mae = mean |value difference|.
+    """
+    agree, value_error = 0, 0.0
+    for start in range(0, len(positions), batch_size):
+        batch = positions[start:start + batch_size]
+        legal = ((batch[..., 0] == 0) & (batch[..., 1] == 0)).reshape(len(batch), -1)
+        ref_policy, ref_value = reference.predict(batch, verbose=0)
+        policy, value = candidate.predict(batch, verbose=0)
+        ref_move = np.argmax(np.where(legal, np.asarray(ref_policy).reshape(len(batch), -1), -1), axis=1)
+        move = np.argmax(np.where(legal, np.asarray(policy).reshape(len(batch), -1), -1), axis=1)
+        agree += int(np.sum(ref_move == move))
+        value_error += float(np.sum(np.abs(np.ravel(ref_value) - np.ravel(value))))
+    n = max(len(positions), 1)
+    return {"positions": len(positions), "top1": agree / n, "value_mae": value_error / n}
+
+def quantize(model_path, mode=INT8, positions=None, out_path=None):
+    """Convert a .keras file, save it next to it (or to out_path) and return (out_path, accuracy report)."""
+    from tensorflow import keras
+    model = keras.models.load_model(model_path)
+    if positions is None:
+        positions = record_positions()
+    out_path = out_path or f"{os.path.splitext(model_path)[0]}.{mode}.tflite"
+    # Calibrate on every other position, report on the ones the ranges were not fitted to
+    with open(out_path, "wb") as f:
+        f.write(convert(model, mode, positions[::2]))
+    report = accuracy_report(model, TFLiteNet(out_path), positions[1::2])
+    return out_path, report
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: python quantize_model.py model.keras int8|float16 [positions.npy]")
+        sys.exit(1)
+    positions = np.load(sys.argv[3]) if len(sys.argv) > 3 else None
+    path, report = quantize(sys.argv[1], sys.argv[2], positions)
+    print(f"saved {path}")
+    print(f"{report['positions']} positions: top-1 move agreement {report['top1'] * 100:.1f}%, "
+          f"value MAE {report['value_mae']:.4f}")
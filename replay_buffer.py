@@ -0,0 +1,173 @@
+# replay_buffer.py
+# Replay memory for the trainers: fixed-capacity ring buffer in preallocated
+# NumPy arrays (bit-packed planes, move index, value, side to move; see
+# sample_codec.py), so appending a sample is a slice copy and a training
+# batch is a fancy-index gather + decode, with no list of tuples and no
+# np.vstack per batch. The memory used is known up front (nbytes).
+#
+# Sampling is uniform, or prioritized (Schaul et al., PER) through a sum
+# tree over the slots: new samples get the current max priority, the
+# trainer feeds back per-sample losses with update_priorities, and sample()
+# returns the importance-sampling weights to pass to fit as sample_weight.
+
+import numpy as np
+from sample_codec import PACKED_BYTES, decode
+
+class SumTree:
+    """
+    Binary tree of priorities in one flat array: leaves at [size, 2 * size), every node the
+    sum of its two children, the root (index 1) the total. Updates and lookups are O(log n),
+    and both work on whole index / value arrays at once.
+    """
+    def __init__(self, capacity):
+        self.size = 1
+        while self.size < capacity: self.size *= 2
+        self.nodes = np.zeros(2 * self.size, dtype=np.float64)
+
+    @property
+    def total(self):
+        return self.nodes[1]
+
+    def update(self, slots, priorities):
+        nodes = np.asarray(slots, dtype=np.int64) + self.size
+        self.nodes[nodes] = priorities
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self.nodes[nodes] = self.nodes[2 * nodes] + self.nodes[2 * nodes + 1]
+            if nodes[0] == 1: break
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        """Slot of each cumulative value in [0, total): walk down, going right when value > left sum."""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        while nodes[0] < self.size:
+            left = 2 * nodes
+            go_right = values >= self.nodes[left]
+            values -= np.where(go_right, self.nodes[left], 0.0)
+            nodes = left + go_right
+        return nodes - self.size
+
+    def get(self, slots):
+        return self.nodes[np.asarray(slots, dtype=np.int64) + self.size]
+
+class ReplayBuffer:
+    """
+    buffer.add(planes, moves, values, colors) after each game, planes from sample_codec.encode;
+    sample(n) -> (slots, states, moves, values, weights), states decoded to the float32 network
+    input. moves are flat cell indices (x * 15 + y), the sparse policy targets.
+    prioritized: alpha = how strongly priorities skew sampling, beta = importance-sampling
+    correction (1.0 is a full correction), eps keeps every sample drawable.
+    """
+    def __init__(self, capacity, prioritized=False, alpha=0.6, beta=0.4, eps=1e-3):
+        self.capacity = capacity
+        self.planes = np.zeros((capacity, PACKED_BYTES), dtype=np.uint8)
+        self.moves = np.zeros(capacity, dtype=np.uint8)
+        self.values = np.zeros(capacity, dtype=np.float16)
+        self.colors = np.zeros(capacity, dtype=np.int8)
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.beta = beta
+        self.eps = eps
+        self.tree = SumTree(capacity) if prioritized else None
+        self.max_priority = 1.0
+        self.next = 0     # slot the next sample goes to
+        self.count = 0    # filled slots
+        self.added = 0    # samples added so far (the trainers' reuse ratio counts against it)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        arrays = (self.planes, self.moves, self.values, self.colors)
+        return sum(a.nbytes for a in arrays) + (self.tree.nodes.nbytes if self.tree is not None else 0)
+
+    def add(self, planes, moves, values, colors=0):
+        """Append a block of samples, overwriting the oldest ones once the buffer is full."""
+        planes = np.asarray(planes, dtype=np.uint8).reshape(-1, PACKED_BYTES)
+        n = len(planes)
+        if n > self.capacity:  # only the newest capacity samples would survive anyway
+            planes = planes[-self.capacity:]
+            moves, values = np.broadcast_to(moves, n)[-self.capacity:], np.broadcast_to(values, n)[-self.capacity:]
+            colors = np.broadcast_to(colors, n)[-self.capacity:]
+            self.added += n - self.capacity
+            n = self.capacity
+        slots = (self.next + np.arange(n)) % self.capacity
+        self.planes[slots] = planes
+        self.moves[slots] = moves
+        self.values[slots] = values
+        self.colors[slots] = colors
+        if self.tree is not None:
+            self.tree.update(slots, self.max_priority ** self.alpha)
+        self.next = (self.next + n) % self.capacity
+        self.count = min(self.count + n, self.capacity)
+        self.added += n
+        return slots
+
+    def sample(self, batch_size):
+        """
+        batch_size samples with replacement. weights are all 1 for uniform sampling,
+        else the importance-sampling weights (scaled so the largest is 1).
+        """
+        slots, planes, moves, values, weights = self.sample_packed(batch_size)
+        return slots, decode(planes), moves.astype(np.int32), values.astype(np.float32), weights
+
+    def sample_packed(self, batch_size):
+        """sample() without decoding: planes stay (N, 57) uint8, moves uint8, values float16."""
+        if self.count == 0:
+            raise ValueError("sample from an empty replay buffer")
+        if self.tree is None:
+            slots = np.random.randint(0, self.count, size=batch_size)
+            weights = np.ones(batch_size, dtype=np.float32)
+        else:
+            # One draw per equal slice of the total, so a batch covers the whole range
+            total = self.tree.total
+            bounds = (np.arange(batch_size) + np.random.random(batch_size)) * (total / batch_size)
+            slots = np.minimum(self.tree.find(np.minimum(bounds, np.nextafter(total, 0))), self.count - 1)
+            probs = self.tree.get(slots) / total
+            weights = (self.count * np.maximum(probs, 1e-12)) ** -self.beta
+            weights = (weights / weights.max()).astype(np.float32)
+        return slots, self.planes[slots], self.moves[slots], self.values[slots], weights
+
+    def update_priorities(self, slots, priorities):
+        """New priorities (e.g. the per-sample loss) for samples returned by sample()."""
+        if self.tree is None: return
+        priorities = np.abs(np.asarray(priorities, dtype=np.float64)) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(slots, priorities ** self.alpha)
+
+def sample_losses(model, states, moves, values):
+    """Per-sample loss (policy cross entropy + squared value error) to use as replay priorities."""
+    policy, value = model.predict(states, verbose=0)
+    policy = np.asarray(policy).reshape(len(states), -1)
+    cross_entropy = -np.log(np.maximum(policy[np.arange(len(states)), moves], 1e-7))
+    return cross_entropy + (np.ravel(value) - values) ** 2
+
+def fit_on_replay(model, replay, num_samples, batch_size=512, augment=None):
+    """
+    One epoch of fit over num_samples samples from the buffer (sparse policy targets: the model
+    must be compiled with RL_AIPlayer.compile_model); prioritized buffers get the new losses back.
+    augment: input_pipeline.RANDOM / ALL streams the batches through a tf.data pipeline that
+    rotates / reflects them on the fly; None fits on the samples as stored.
+    """
+    outputs = model.output_names
+    if augment is None:
+        slots, states, moves, values, weights = replay.sample(num_samples)
+        # Targets as a list in output order: Keras 3 only pairs per-sample weights with a list of targets
+        targets = {'policy_output': moves, 'value_output': values}
+        model.fit(states, [targets[name] for name in outputs],
+                  sample_weight=[weights] * len(outputs) if replay.prioritized else None,
+                  batch_size=batch_size, epochs=1, verbose=0)
+        if replay.prioritized:
+            replay.update_priorities(slots, sample_losses(model, states, moves, values))
+        return
+    from input_pipeline import replay_dataset
+    drawn = []
+    model.fit(replay_dataset(replay, num_samples, batch_size, augment, outputs, replay.prioritized, drawn),
+              epochs=1, shuffle=False, verbose=0)
+    if replay.prioritized:
+        # Priorities of the stored orientation
+        for slots, planes, moves, values in drawn:
+            losses = sample_losses(model, decode(planes), moves.astype(np.int32), values.astype(np.float32))
+            replay.update_priorities(slots, losses)
@@ -0,0 +1,169 @@
+# replay_store.py
+# Replay memory on disk, for more positions than fit in RAM and for keeping
+# them across runs. Same add / sample interface as replay_buffer.ReplayBuffer
+# (so fit_on_replay takes either), but the columns live in np.memmap shard
+# files and only the pages a batch touches are read.
+#
+#   replay/gomoku/index.bin        header: magic, version, count, shard size, column spec
+#   replay/gomoku/shard_00000.bin  shard_size rows, one column after another
+#   replay/gomoku/shard_00001.bin  ...
+#
+# Rows are only ever appended: a shard is filled front to back, then the
+# next one is created. The count in the header is updated after the rows are
+# written, so a run that is killed mid-append loses at most that append.
+# Reopening reads the 1-page header and maps shards lazily, whatever the size.
+
+import os
+import json
+import struct
+import numpy as np
+from sample_codec import PACKED_BYTES, decode
+
+MAGIC = b"GRP1"
+VERSION = 2  # 2: sample_codec's compact columns
+_HEADER = struct.Struct("<4sIQQI")  # magic, version, count, shard size, spec length
+_COUNT_OFFSET = 8
+SHARD_SIZE = 65536
+
+# name -> (shape of one row, dtype); the same columns as ReplayBuffer
+DEFAULT_COLUMNS = {
+    "planes": ((PACKED_BYTES,), "u1"),
+    "moves": ((), "u1"),
+    "values": ((), "<f2"),
+    "colors": ((), "i1"),
+}
+
+def _column_layout(columns, shard_size):
+    """name -> (row shape, dtype, byte offset in a shard file), and the shard file size."""
+    layout, offset = {}, 0
+    for name, (shape, dtype) in columns.items():
+        shape, dtype = tuple(shape), np.dtype(dtype)
+        layout[name] = (shape, dtype, offset)
+        offset += shard_size * int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        offset = -(-offset // 4096) * 4096  # every column starts on a page
+    return layout, offset
+
+class ReplayStore:
+    """
+    store = ReplayStore(directory) opens the store there, or creates it with columns /
+    shard_size. add(planes, moves, values, colors) appends; sample(n) returns
+    (rows, states, moves, values, weights) like ReplayBuffer.sample. window > 0 samples only
+    the newest window rows.
+    """
+    prioritized = False
+
+    def __init__(self, directory, columns=None, shard_size=SHARD_SIZE, window=0):
+        self.directory = directory
+        self.window = window
+        self.index_path = os.path.join(directory, "index.bin")
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                magic, version, count, shard_size, spec_length = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != MAGIC or version != VERSION:
+                    raise ValueError(f"{directory} is not a replay store (or has an older format)")
+                spec = json.loads(f.read(spec_length).decode("utf-8"))
+            columns = {name: (tuple(shape), dtype) for name, shape, dtype in spec}
+            self.count = count
+        else:
+            columns = columns or DEFAULT_COLUMNS
+            os.makedirs(directory, exist_ok=True)
+            spec = json.dumps([[name, list(shape), np.dtype(dtype).str] for name, (shape, dtype) in columns.items()])
+            with open(self.index_path, "wb") as f:
+                f.write(_HEADER.pack(MAGIC, VERSION, 0, shard_size, len(spec)) + spec.encode("utf-8"))
+            self.count = 0
+        self.shard_size = shard_size
+        self.layout, self.shard_bytes = _column_layout(columns, shard_size)
+        self._index = np.memmap(self.index_path, dtype="<u8", mode="r+", offset=_COUNT_OFFSET, shape=(1,))
+        self._shards = {}  # shard number -> {column: memmap}
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def added(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        """Size on disk."""
+        return -(-self.count // self.shard_size) * self.shard_bytes
+
+    def _shard(self, k):
+        shard = self._shards.get(k)
+        if shard is None:
+            path = os.path.join(self.directory, f"shard_{k:05d}.bin")
+            if not os.path.exists(path):
+                with open(path, "wb") as f:
+                    f.truncate(self.shard_bytes)  # sparse until written
+            shard = self._shards[k] = {
+                name: np.memmap(path, dtype=dtype, mode="r+", offset=offset, shape=(self.shard_size,) + shape)
+                for name, (shape, dtype, offset) in self.layout.items()}
+        return shard
+
+    def add(self, planes, moves, values, colors=0):
+        return self.append(planes=planes, moves=moves, values=values, colors=colors)
+
+    def append(self, **columns):
+        """Append rows (every column a block of the same length, or a scalar for all rows)."""
+        blocks, n = {}, 1
+        for name, (shape, dtype, _) in self.layout.items():
+            value = np.asarray(columns.get(name, 0), dtype=dtype)
+            if value.ndim > len(shape):
+                value = value.reshape((-1,) + shape)
+                n = len(value)
+            blocks[name] = value
+        blocks = {name: np.broadcast_to(value, (n,) + self.layout[name][0]) for name, value in blocks.items()}
+        start, done = self.count, 0
+        while done < n:
+            k, row = divmod(start + done, self.shard_size)
+            take = min(n - done, self.shard_size - row)
+            shard = self._shard(k)
+            for name, block in blocks.items():
+                shard[name][row:row + take] = block[done:done + take]
+            done += take
+        self.count += n
+        self._index[0] = self.count  # after the rows, so a reader never sees unwritten rows
+        return np.arange(start, start + n)
+
+    def sample(self, batch_size):
+        """Uniform over the rows (or the newest window). Rows are read in file order, shard by shard."""
+        rows, planes, moves, values, weights = self.sample_packed(batch_size)
+        return rows, decode(planes), moves.astype(np.int32), values.astype(np.float32), weights
+
+    def sample_packed(self, batch_size):
+        """sample() without decoding the planes."""
+        if self.count == 0:
+            raise ValueError("sample from an empty replay store")
+        low = max(0, self.count - self.window) if self.window else 0
+        rows = np.sort(np.random.randint(low, self.count, size=batch_size))
+        batch = self.gather(rows)
+        weights = np.ones(batch_size, dtype=np.float32)
+        return rows, batch["planes"], batch["moves"], batch["values"], weights
+
+    def gather(self, rows):
+        """Every column for the given (sorted) global row numbers."""
+        out = {name: np.empty((len(rows),) + shape, dtype=dtype) for name, (shape, dtype, _) in self.layout.items()}
+        shards = rows // self.shard_size
+        bounds = np.flatnonzero(np.diff(shards)) + 1
+        for part in np.split(np.arange(len(rows)), bounds):
+            if len(part) == 0: continue
+            shard = self._shard(int(shards[part[0]]))
+            local = rows[part] % self.shard_size
+            for name in out:
+                out[name][part] = shard[name][local]
+        return out
+
+    def update_priorities(self, rows, priorities):
+        pass  # uniform sampling only
+
+    def flush(self):
+        """Push written pages to disk (the OS does this anyway; call it at checkpoints)."""
+        for shard in self._shards.values():
+            for column in shard.values():
+                column.flush()
+        self._index.flush()
+
+    def close(self):
+        self.flush()
+        self._shards = {}
+        self._index = None
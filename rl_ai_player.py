@@ -3,11 +3,8 @@
 # [修正版] 加入了 _find_random_empty 函式
 
 import numpy as np
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras import layers, Model
-from tensorflow.keras.optimizers import Adam
 from random import randint # [新增] 需要用到隨機
+# [CHANGED] TensorFlow 改成用到時才 import: 只用 NumPy 推論的工人程序完全不需要載入它
 
 from constants import LEVEL, GRADE, MAX_SCORE
 
@@ -16,11 +13,24 @@ class RL_AIPlayer:
     強化學習 (RL) 玩家
     使用一個雙頭 (Policy/Value) 神經網路
     """
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, model=None, book=None):
         self.level = LEVEL
+        self.book = book  # [NEW] 可選: opening_book.OpeningBook, 開局查得到就不用跑網路
         
-        if model_path:
+        if model is not None:
+            # [NEW] 直接用現成的模型, 例如 inference_server.InferenceClient (只要有 predict)
+            self.model = model
+        elif model_path and model_path.endswith(".npz"):
+            # [NEW] numpy_net.py 匯出的權重, 用純 NumPy 推論
+            from numpy_net import NumpyNet
+            self.model = NumpyNet(model_path)
+        elif model_path and model_path.endswith(".tflite"):
+            # [NEW] quantize_model.py 產生的 int8 / float16 量化模型 (CPU 推論較快)
+            from quantize_model import TFLiteNet
+            self.model = TFLiteNet(model_path)
+        elif model_path:
             # 載入訓練好
+            from tensorflow import keras
             self.model = keras.models.load_model(model_path)
             # print(f"從 {model_path} 載入模型。") 
             # 註解掉 print 以免多核心訓練時洗版
@@ -29,10 +39,16 @@ class RL_AIPlayer:
             self.model = self._build_model()
             # print("建立一個新的空白模型。")
 
+        # [NEW] get_move 重複使用的輸入緩衝區 (第 3 層固定為 1, 只需要建立一次)
+        self._input_buffer = np.zeros((1, self.level, self.level, 3), dtype=np.float32)
+        self._input_buffer[0, :, :, 2] = 1.0
+
     def _build_model(self):
         """
         建立神經網路 (AI 的大腦)
         """
+        from tensorflow.keras import layers, Model
+
         # --- 共享的網路主幹 (CNN) ---
         board_input = layers.Input(shape=(self.level, self.level, 3), name="board_input")
         
@@ -56,35 +72,58 @@ class RL_AIPlayer:
 
         # --- 建立並編譯模型 ---
         model = Model(inputs=board_input, outputs=[policy_dense, value_output])
-        
+        return self.compile_model(model)
+
+    def compile_model(self, model=None):
+        """
+        [NEW] 訓練用的編譯設定: 策略頭用稀疏目標 (直接給落子的格子編號, 不用 225 維 one-hot)
+        載入的舊模型 (categorical_crossentropy) 在訓練前也要呼叫一次; 已有的 optimizer 狀態會沿用
+        """
+        from tensorflow.keras.optimizers import Adam
+        model = model if model is not None else self.model
+        optimizer = getattr(model, "optimizer", None) or Adam(learning_rate=0.001)
         model.compile(
-            optimizer=Adam(learning_rate=0.001),
+            optimizer=optimizer,
             loss={
-                'policy_output': 'categorical_crossentropy',
+                'policy_output': 'sparse_categorical_crossentropy',
                 'value_output': 'mean_squared_error'
             }
         )
         return model
 
-    def _prepare_input(self, board_grid, player_color):
+    def _as_array(self, board_grid):
+        """GameBoard.array (int8 ndarray) 直接使用; list 才需要轉換一次"""
+        if isinstance(board_grid, np.ndarray):
+            return board_grid
+        return np.asarray(board_grid, dtype=np.int8)
+
+    def _prepare_input(self, board_grid, player_color, out=None):
         """
-        將 15x15 的 list (0, 1, -1) 轉換為 (1, 15, 15, 3) 的 numpy 陣列
+        將 15x15 的棋盤 (list 或 int8 ndarray, 0, 1, -1) 轉換為 (1, 15, 15, 3) 的 numpy 陣列
+        out: 預先配置好的 (1, 15, 15, 3) float32 緩衝區 (第 3 層需已填 1), 直接寫入不重新配置
         """
-        state = np.zeros((self.level, self.level, 3), dtype=np.float32)
-        state[:, :, 0] = (np.array(board_grid) == player_color)
-        state[:, :, 1] = (np.array(board_grid) == -player_color)
-        state[:, :, 2] = 1.0 
-        return np.expand_dims(state, axis=0)
+        board = self._as_array(board_grid)
+        if out is None:
+            out = np.empty((1, self.level, self.level, 3), dtype=np.float32)
+            out[0, :, :, 2] = 1.0
+        np.equal(board, player_color, out=out[0, :, :, 0])
+        np.equal(board, -player_color, out=out[0, :, :, 1])
+        return out
 
     def get_move(self, board_grid, player_color):
         """
         AI 決策：根據目前局勢，決定下一步
+        board_grid 可以是 list 或 GameBoard.array (int8 ndarray, 不需轉換)
         """
-        board_tensor = self._prepare_input(board_grid, player_color)
+        board = self._as_array(board_grid)
+        if self.book is not None:
+            move = self.book.choose(board, player_color)
+            if move is not None: return move
+        board_tensor = self._prepare_input(board, player_color, out=self._input_buffer)
         policy_probs, value = self.model.predict(board_tensor, verbose=0)
         
         policy_probs = policy_probs.reshape((self.level, self.level))
-        legal_moves_mask = (np.array(board_grid) == 0)
+        legal_moves_mask = (board == 0)
         masked_probs = policy_probs * legal_moves_mask
         
         if np.sum(masked_probs) > 0:
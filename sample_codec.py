@@ -0,0 +1,65 @@
+# sample_codec.py
+# Compact training samples. A position is stored as its two stone planes
+# (side to move, opponent) bit-packed into 57 bytes, the move as a uint8
+# cell index, the value as float16; the float32 (15, 15, 3) network input
+# (with its constant plane) is only built by decode() when a training batch
+# is assembled. Workers send these to the learner and the replay memories
+# keep them: 61 bytes a sample instead of a float32 state + float64 one-hot
+# policy (~4.5 KB), and a game goes over IPC as a few arrays (pack_history).
+
+import numpy as np
+from constants import LEVEL
+from eval_cache import SYMMETRY_PERMS
+
+CELLS = LEVEL * LEVEL
+PACKED_BYTES = (2 * CELLS + 7) // 8  # 57
+
+# _INVERSE[s][i] = cell that symmetry s moves to cell i
+_INVERSE = np.argsort(SYMMETRY_PERMS, axis=1)
+
+def encode(board_array, color):
+    """(15, 15) int8 board and the side to move -> (57,) uint8."""
+    board = np.asarray(board_array).ravel()
+    return np.packbits(np.concatenate((board == color, board == -color)))
+
+def decode(packed, out=None):
+    """(N, 57) uint8 -> (N, 15, 15, 3) float32 network input (own, opponent, constant 1)."""
+    packed = np.asarray(packed, dtype=np.uint8).reshape(-1, PACKED_BYTES)
+    n = len(packed)
+    if out is None:
+        out = np.empty((n, LEVEL, LEVEL, 3), dtype=np.float32)
+    bits = np.unpackbits(packed, axis=1, count=2 * CELLS).reshape(n, 2, LEVEL, LEVEL)
+    out[..., 0] = bits[:, 0]
+    out[..., 1] = bits[:, 1]
+    out[..., 2] = 1.0
+    return out
+
+def transform(packed, moves, symmetry):
+    """Row i of (N, 57) planes / (N,) moves turned by SYMMETRY_PERMS[symmetry[i]]: ((N, 57), (N,)) uint8."""
+    packed = np.asarray(packed, dtype=np.uint8).reshape(-1, PACKED_BYTES)
+    n = len(packed)
+    bits = np.unpackbits(packed, axis=1, count=2 * CELLS).reshape(n, 2, CELLS)
+    moved = np.take_along_axis(bits, _INVERSE[symmetry][:, None, :], axis=2).reshape(n, 2 * CELLS)
+    moves = SYMMETRY_PERMS[symmetry, np.asarray(moves).reshape(n)]
+    return np.packbits(moved, axis=1), moves.astype(np.uint8)
+
+def symmetries(packed, moves):
+    """
+    The 8 rotations / reflections of N samples ((N, 57) planes, (N,) moves): ((8N, 57) uint8 planes,
+    (8N,) uint8 moves), each sample's 8 versions next to each other.
+    """
+    packed = np.asarray(packed, dtype=np.uint8).reshape(-1, PACKED_BYTES)
+    n = len(packed)
+    return transform(np.repeat(packed, 8, axis=0), np.repeat(np.asarray(moves).reshape(n), 8), np.tile(np.arange(8), n))
+
+def pack_history(steps):
+    """
+    Worker side: a game's step dicts ('planes', 'move', 'color', 'immediate_reward') -> one dict of
+    arrays 'planes' (T, 57), 'moves', 'colors', 'rewards', which is what goes back to the learner.
+    """
+    return {
+        'planes': np.array([s['planes'] for s in steps], dtype=np.uint8).reshape(-1, PACKED_BYTES),
+        'moves': np.array([s['move'] for s in steps], dtype=np.uint8),
+        'colors': np.array([s['color'] for s in steps], dtype=np.int8),
+        'rewards': np.array([s['immediate_reward'] for s in steps], dtype=np.float16),
+    }
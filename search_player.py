@@ -0,0 +1,235 @@
+# search_player.py
+# Alpha-beta teacher: negamax over the same line patterns the greedy AIPlayer
+# scores, with iterative deepening, a transposition table on the board's
+# Zobrist hash, killer / history move ordering and a hard time budget.
+# Same get_move(board_grid, last_x, last_y, color) signature as the other AIs.
+
+import time
+from constants import LEVEL
+from game_board import GameBoard
+
+WIN_SCORE = 10000000
+INF = WIN_SCORE * 10
+
+# Transposition table flags
+EXACT, LOWER, UPPER = 0, 1, 2
+KILLER_BONUS = 5000  # between a live three and a live four threat
+
+class _Timeout(Exception):
+    pass
+
+class SearchPlayer:
+    """
+    time_ms: hard budget per get_move (the deepest fully searched depth is used)
+    branching: candidate moves tried per node, best-first by the one-ply pattern score
+    """
+    def __init__(self, target_length=5, time_ms=100, max_depth=10, branching=8, root_branching=20,
+                 tt_limit=500000, solver=None, book=None):
+        self.level = LEVEL
+        self.target_length = target_length
+        self.time_ms = time_ms
+        self.max_depth = max_depth
+        self.branching = branching
+        self.root_branching = root_branching
+        self.tt_limit = tt_limit
+        self.tt = {}  # zobrist_hash -> (depth, value, flag, move); kept across moves of a game
+        self.killers = [[-1, -1] for _ in range(max_depth + 2)]
+        self.history = {}
+        self.board = None
+        self.solver = solver  # optional threat_search.ThreatSolver, tried before the alpha-beta search
+        self.book = book  # optional opening_book.OpeningBook, tried first
+        # Stats of the last get_move
+        self.nodes = 0
+        self.depth_reached = 0
+        self.ai_move_count = 0
+        self._deadline = 0.0
+
+    def bind_board(self, board):
+        """Search on this GameBoard (via place/undo) when get_move is given board.grid."""
+        self.board = board
+
+    def new_game(self):
+        self.tt.clear()
+        self.history.clear()
+        self.ai_move_count = 0
+        if self.solver is not None: self.solver.new_game()
+
+    # --- Public API ---
+    def get_move(self, board_grid, last_x, last_y, color):
+        self.ai_move_count += 1
+        if self.book is not None:
+            move = self.book.choose(board_grid, color)
+            if move is not None: return move
+        board = self._search_board(board_grid)
+        board.set_side_to_move(color)
+        if board.move_count == 0:
+            return self.level // 2, self.level // 2
+        if board.is_full(): return -1, -1
+        if self.solver is not None:
+            line = self.solver.solve(board, color)
+            if line: return line[0]
+
+        self._deadline = time.perf_counter() + self.time_ms / 1000.0
+        self.nodes = 0
+        self.depth_reached = 0
+        self.killers = [[-1, -1] for _ in range(self.max_depth + 2)]
+        if len(self.tt) > self.tt_limit: self.tt.clear()
+
+        moves = self._ordered_moves(board, color, 0, None, self.root_branching)
+        best = moves[0]
+        for depth in range(1, self.max_depth + 1):
+            try:
+                value, move = self._search_root(board, moves, depth, color)
+            except _Timeout:
+                break
+            best = move
+            self.depth_reached = depth
+            # Previous best first at the next depth
+            moves.remove(move)
+            moves.insert(0, move)
+            if abs(value) >= WIN_SCORE - self.max_depth: break  # forced win / loss found
+        return best // self.level, best % self.level
+
+    def _find_random_empty(self, board_grid):
+        board = self._search_board(board_grid)
+        return board.random_empty()
+
+    # --- Search ---
+    def _search_board(self, board_grid):
+        """The bound board if it matches, else a fresh GameBoard built from the grid."""
+        if (self.board is not None and self.board.grid is board_grid
+                and self.board.track_runs and self.board.track_frontier):
+            return self.board
+        board = GameBoard(target_length=self.target_length, track_runs=True, track_frontier=True)
+        for x in range(self.level):
+            for y in range(self.level):
+                if board_grid[x][y] != 0:
+                    board.place_stone(x, y, 1 if board_grid[x][y] > 0 else -1)
+        return board
+
+    def _search_root(self, board, moves, depth, color):
+        alpha, best_move = -INF, moves[0]
+        for idx in moves:
+            value = self._try(board, idx, depth, alpha, INF, color, 0)
+            if value > alpha:
+                alpha, best_move = value, idx
+        self.tt[board.zobrist_hash] = (depth, alpha, EXACT, best_move)
+        return alpha, best_move
+
+    def _try(self, board, idx, depth, alpha, beta, color, ply):
+        """Value of playing idx for color, from color's point of view."""
+        x, y = idx // self.level, idx % self.level
+        board.place_stone(x, y, color)
+        try:
+            if board.check_win(x, y, color):
+                return WIN_SCORE - ply
+            if board.is_full():
+                return 0
+            return -self._negamax(board, depth - 1, -beta, -alpha, -color, ply + 1)
+        finally:
+            board.undo_last_move()
+
+    def _negamax(self, board, depth, alpha, beta, color, ply):
+        self.nodes += 1
+        if self.nodes & 7 == 0 and time.perf_counter() > self._deadline:
+            raise _Timeout()
+
+        key = board.zobrist_hash
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry is not None:
+            e_depth, e_value, e_flag, tt_move = entry
+            if e_depth >= depth:
+                if e_flag == EXACT: return e_value
+                if e_flag == LOWER: alpha = max(alpha, e_value)
+                else: beta = min(beta, e_value)
+                if alpha >= beta: return e_value
+
+        if depth <= 0:
+            return self._evaluate(board, color, ply)
+
+        alpha_start = alpha
+        best, best_move = -INF, -1
+        for idx in self._ordered_moves(board, color, ply, tt_move, self.branching):
+            value = self._try(board, idx, depth, alpha, beta, color, ply)
+            if value > best:
+                best, best_move = value, idx
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                killers = self.killers[ply]
+                if killers[0] != idx:
+                    killers[1] = killers[0]
+                    killers[0] = idx
+                self.history[idx] = self.history.get(idx, 0) + depth * depth
+                break
+        if best_move < 0:
+            return 0
+
+        if best <= alpha_start: flag = UPPER
+        elif best >= beta: flag = LOWER
+        else: flag = EXACT
+        self.tt[key] = (depth, best, flag, best_move)
+        return best
+
+    # --- Move ordering ---
+    def _ordered_moves(self, board, color, ply, tt_move, limit):
+        """
+        Frontier cells sorted by: TT move, killers, then the one-ply pattern score
+        for both colors (attack + block) plus the history heuristic. Top `limit` only.
+        """
+        cells = board.candidates(1) or board.candidates(2)
+        killers = self.killers[ply] if ply < len(self.killers) else (-1, -1)
+        scored = []
+        for x, y in cells:
+            idx = x * self.level + y
+            if idx == tt_move: key = INF
+            else:
+                key = self._move_score(board, x, y, color) + self.history.get(idx, 0)
+                if idx == killers[0] or idx == killers[1]: key += KILLER_BONUS
+            scored.append((key, idx))
+        scored.sort(reverse=True)
+        # A winning move or a forced block makes every other move pointless
+        if scored and scored[0][0] >= WIN_SCORE and scored[0][1] != tt_move:
+            return [scored[0][1]]
+        return [idx for _, idx in scored[:limit]]
+
+    def _move_score(self, board, x, y, color):
+        attack = sum(self._line_value(c, o1, o2) for c, o1, o2 in board.lines_through(x, y, color))
+        defend = sum(self._line_value(c, o1, o2) for c, o1, o2 in board.lines_through(x, y, -color))
+        if attack >= WIN_SCORE: return attack * 2  # win now beats blocking
+        return attack + defend
+
+    def _line_value(self, count, open_1, open_2):
+        """AIPlayer's pattern values, relative to the target length."""
+        missing = self.target_length - count
+        opens = open_1 + open_2
+        if missing <= 0: return WIN_SCORE
+        if missing == 1: return 10000 if opens == 2 else 1000 if opens else 0
+        if missing == 2: return 1000 if opens == 2 else 100 if opens else 0
+        if missing == 3: return 50 if opens == 2 else 10 if opens else 0
+        return count if opens else 0
+
+    # --- Static evaluation ---
+    def _evaluate(self, board, color, ply):
+        """
+        Sum of the one-ply pattern values of the frontier cells, color's minus
+        the opponent's. Reading threats off empty cells also sees split shapes
+        (XX_XX). The side to move wins with any winning cell, and loses if the
+        opponent has two it cannot both block.
+        """
+        own_total = opp_total = opp_wins = 0
+        for x, y in board.candidates(1):
+            own = opp = 0
+            for count, open_1, open_2 in board.lines_through(x, y, color):
+                own += self._line_value(count, open_1, open_2)
+            if own >= WIN_SCORE: return WIN_SCORE - ply - 1
+            for count, open_1, open_2 in board.lines_through(x, y, -color):
+                opp += self._line_value(count, open_1, open_2)
+            if opp >= WIN_SCORE: opp_wins += 1
+            own_total += own
+            opp_total += opp
+        if opp_wins >= 2: return -(WIN_SCORE - ply - 2)
+        if opp_wins: opp_total -= WIN_SCORE  # must be blocked, does not count as won
+        # Tempo: the side to move converts its threats first
+        return int(own_total * 1.5) - opp_total
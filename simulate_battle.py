@@ -1,5 +1,6 @@
 from gomoku_game import GomokuGame
 from rl_ai_player import RL_AIPlayer
+from eval_cache import CachedModel, EvalCache
 import time
 
 def battle(num_games=100):
@@ -13,6 +14,10 @@ def battle(num_games=100):
         ai_p1 = RL_AIPlayer(model_path="models/gomoku_rl_model_latest.keras")
         # Player 2 (White)
         ai_p2 = RL_AIPlayer(model_path="可以用的model/5row1.keras")
+        # Both models are deterministic, so the same positions come back game after game:
+        # cache their outputs (one cache per model, mirrored positions share an entry)
+        ai_p1.model = CachedModel(ai_p1.model, EvalCache())
+        ai_p2.model = CachedModel(ai_p2.model, EvalCache())
         print("✅ Models loaded successfully!")
     except Exception as e:
         print(f"❌ Error loading models: {e}")
@@ -85,6 +90,10 @@ def battle(num_games=100):
     print(f"Player 1 (Latest): {p1_wins} wins ({(p1_wins/num_games)*100:.1f}%)")
     print(f"Player 2 (5row1):  {p2_wins} wins ({(p2_wins/num_games)*100:.1f}%)")
     print(f"Draws:             {draws}")
+    for name, ai in (("Player 1", ai_p1), ("Player 2", ai_p2)):
+        stats = ai.model.cache.stats()
+        print(f"{name} cache: {stats['hit_rate']*100:.1f}% hits, {stats['entries']} entries, "
+              f"{stats['bytes'] / 1e6:.1f} MB, {stats['evictions']} evictions")
     print("="*40)
 
 if __name__ == "__main__":
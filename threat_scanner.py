@@ -0,0 +1,126 @@
+# threat_scanner.py
+# NumPy version of AIPlayer._evaluate_board: the same score map (five,
+# open/closed four, open/closed three, open two, connection bonus), computed
+# for the whole board at once with shifted-plane (sliding window) operations
+# instead of one Python ray walk per empty cell and direction.
+#
+# Run this file directly to check it move-for-move against the Python scorer.
+
+from random import randint
+import numpy as np
+from constants import LEVEL
+
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+_PAD = LEVEL  # room for a step of up to LEVEL cells off the board in any direction
+_SIDE = LEVEL + 2 * _PAD
+_OFF_BOARD = 2  # padding value: neither a stone nor an empty cell
+
+def _ray_table():
+    """
+    Flat index into the padded board of the cell k steps (k = 1..LEVEL) from
+    every cell, for 8 rays: the 4 DIRECTIONS forwards, then the same backwards.
+    Shape (8, LEVEL, LEVEL * LEVEL).
+    """
+    xs, ys = np.meshgrid(np.arange(LEVEL), np.arange(LEVEL), indexing='ij')
+    xs, ys = xs.ravel() + _PAD, ys.ravel() + _PAD
+    rays = [(dx, dy) for dx, dy in DIRECTIONS] + [(-dx, -dy) for dx, dy in DIRECTIONS]
+    table = np.empty((8, LEVEL, LEVEL * LEVEL), dtype=np.intp)
+    for r, (dx, dy) in enumerate(rays):
+        for k in range(1, LEVEL + 1):
+            table[r, k - 1] = (xs + k * dx) * _SIDE + (ys + k * dy)
+    return table
+
+_RAYS = _ray_table()
+_RAY_IDS = np.arange(8)[None, :, None]
+_CELL_IDS = np.arange(LEVEL * LEVEL)[None, None, :]
+
+def score_maps(board, color):
+    """
+    AIPlayer._evaluate_board(board, color) and (board, -color) in one pass, as
+    two (LEVEL, LEVEL) int64 arrays; occupied cells score 0.
+    board: list of lists or ndarray.
+    """
+    board = np.asarray(board)
+    padded = np.full((_SIDE, _SIDE), _OFF_BOARD, dtype=np.int8)
+    padded[_PAD:_PAD + LEVEL, _PAD:_PAD + LEVEL] = board
+    flat = padded.ravel()
+    colors = np.array([color, -color], dtype=np.int8)[:, None, None]
+
+    # Sliding along every ray at once: run[c, r, cell] = stones of colors[c] right after cell
+    run = np.zeros((2, 8, LEVEL * LEVEL), dtype=np.int32)
+    alive = np.ones((2, 8, LEVEL * LEVEL), dtype=bool)
+    for k in range(LEVEL - 1):
+        alive &= (flat[_RAYS[:, k]][None] == colors)
+        if not alive.any(): break
+        run += alive
+    # The cell just past each run must be empty (padding never is)
+    is_open = flat[_RAYS[_RAY_IDS, run, _CELL_IDS]] == 0
+
+    count = 1 + run[:, :4] + run[:, 4:]
+    open_1, open_2 = is_open[:, :4], is_open[:, 4:]
+    both = open_1 & open_2
+    either = open_1 | open_2
+    # np.select takes the first matching rule, like the early returns in _analyze_line
+    per_direction = np.select(
+        [count >= 5,
+         (count == 4) & both,
+         (count == 4) & either,
+         (count == 3) & both,
+         (count == 3) & either,
+         (count == 2) & both],
+        [100000, 10000, 1000, 1000, 100, 50],
+        default=count * 10)
+    scores = per_direction.sum(axis=1).astype(np.int64)
+    scores[:, board.ravel() != 0] = 0
+    return scores[0].reshape(LEVEL, LEVEL), scores[1].reshape(LEVEL, LEVEL)
+
+def score_map(board, color):
+    """Same values as AIPlayer._evaluate_board(board, color)."""
+    return score_maps(board, color)[0]
+
+def best_move(score_self, score_opponent):
+    """AIPlayer._get_best_move on arrays: max of self + 1.2 x opponent, random among ties."""
+    total = score_self + score_opponent * 1.2
+    best = np.flatnonzero(total == total.max())
+    # Ties come out in the same row-major order, so randint picks the same cell
+    idx = int(best[randint(0, len(best) - 1)])
+    return idx // LEVEL, idx % LEVEL
+
+def _verify(num_games=30, seed=0):
+    """Play AIPlayer-vs-AIPlayer games and compare both scorers on every position."""
+    import random
+    from ai_player import AIPlayer
+    from game_board import GameBoard
+
+    random.seed(seed)
+    python_ai = AIPlayer(scorer="python")
+    numpy_ai = AIPlayer(scorer="numpy")
+    python_ai.ai_move_count = numpy_ai.ai_move_count = 100  # skip the random opening move
+    positions = 0
+    for game in range(num_games):
+        board = GameBoard()
+        board.place_stone(7, 7, 1)
+        color = -1
+        while True:
+            for c in (1, -1):
+                expected = python_ai._evaluate_board(board.grid, c)
+                assert (score_map(board.grid, c) == np.array(expected)).all(), f"score map differs (game {game})"
+            # Same RNG state for both, so even tie-breaks must agree
+            state = random.getstate()
+            move = python_ai.get_move(board.grid, -1, -1, color)
+            random.setstate(state)
+            assert numpy_ai.get_move(board.grid, -1, -1, color) == move, f"move differs (game {game})"
+            positions += 1
+
+            # Mix in random moves so the corpus is not only teacher-style shapes
+            if random.random() < 0.3:
+                empties = [(x, y) for x in range(LEVEL) for y in range(LEVEL) if board.grid[x][y] == 0]
+                move = empties[random.randint(0, len(empties) - 1)]
+            board.place_stone(move[0], move[1], color)
+            if board.check_win(move[0], move[1], color) or board.is_full(): break
+            color = -color
+    return positions
+
+if __name__ == "__main__":
+    n = _verify()
+    print(f"✅ NumPy scorer matches AIPlayer._evaluate_board on {n} positions")
@@ -0,0 +1,245 @@
+# threat_search.py
+# Threat-space search for k-in-a-row (k = 4 / 5 / 6): looks for a forced win
+# made only of fours (VCF, "victory by continuous fours") or of fours and
+# open threes (VCT). The attacker only plays threats, so the defender's
+# replies are limited to the cells that stop them, which is what keeps the
+# tree small enough to solve in a few thousand nodes.
+#
+# Threats are read off every line of the board as strings ('x' attacker,
+# 'o' defender, '.' empty, '#' off the board): each length-k / k+1 window is looked up in
+# a table of the shapes below, built once per k.
+#
+# Used as the H-key hint engine, as a pre-check in the players and as an
+# adjudicator that ends training games once a forced win exists.
+
+import time
+from constants import LEVEL
+from game_board import GameBoard
+
+VCF, VCT = "vcf", "vct"
+
+# Threat kinds, for the attacker ('x') and the defender ('o')
+WIN, FOUR, THREE, THREE_DEFENCE = 0, 1, 2, 3  # attacker
+D_WIN, D_FOUR = 4, 5                          # defender
+_NUM_KINDS = 6
+
+def _line_table():
+    """Every row, column and diagonal of the board as a list of flat indices."""
+    lines = []
+    for x in range(LEVEL):
+        lines.append([x * LEVEL + y for y in range(LEVEL)])
+    for y in range(LEVEL):
+        lines.append([x * LEVEL + y for x in range(LEVEL)])
+    for k in range(-(LEVEL - 1), LEVEL):  # x - y = k
+        lines.append([x * LEVEL + x - k for x in range(LEVEL) if 0 <= x - k < LEVEL])
+    for k in range(2 * LEVEL - 1):  # x + y = k
+        lines.append([x * LEVEL + k - x for x in range(LEVEL) if 0 <= k - x < LEVEL])
+    return lines
+
+_LINES = _line_table()
+_TABLES = {}
+
+def _shape_tables(L):
+    """
+    {window: [(kind, offset), ...]} for windows of length L and L + 1:
+      WIN    L window, L-1 'x' + one '.': the '.' completes the line
+      FOUR   L window, L-2 'x' + two '.': either '.' makes a four
+      THREE  L+1 window with empty ends, inner L-1 = L-3 'x' + two '.': either inner '.' makes an open three
+      THREE_DEFENCE  L+1 window with empty ends, inner = L-2 'x' + one '.' (an open three): every '.' stops it
+    plus D_WIN / D_FOUR, the same shapes for 'o'.
+    """
+    tables = _TABLES.get(L)
+    if tables is not None: return tables
+
+    def windows(n):
+        if n == 0:
+            yield ""
+            return
+        for rest in windows(n - 1):
+            for c in "xo.":
+                yield rest + c
+
+    short, long = {}, {}
+    for w in windows(L):
+        entries = []
+        for me, kinds in (("x", (WIN, FOUR)), ("o", (D_WIN, D_FOUR))):
+            if w.count(me) + w.count(".") != L: continue
+            empties = [i for i, c in enumerate(w) if c == "."]
+            if len(empties) == 1: entries += [(kinds[0], i) for i in empties]
+            elif len(empties) == 2: entries += [(kinds[1], i) for i in empties]
+        if entries: short[w] = entries
+    for w in windows(L + 1):
+        inner = w[1:-1]
+        if w[0] != "." or w[-1] != "." or "o" in inner: continue
+        empties = [i + 1 for i, c in enumerate(inner) if c == "."]
+        if len(empties) == 2: long[w] = [(THREE, i) for i in empties]
+        elif len(empties) == 1: long[w] = [(THREE_DEFENCE, i) for i in [0] + empties + [L]]
+    tables = (short, long)
+    _TABLES[L] = tables
+    return tables
+
+class _OutOfBudget(Exception):
+    pass
+
+class ThreatSolver:
+    """
+    solve(board, color) -> winning line [(x, y), ...] (attacker and defender
+    moves alternating, starting with the attacker), or None if no forced win
+    was found within max_depth attacker moves / max_nodes / time_ms.
+    The transposition table is kept between calls; call new_game() to drop it.
+    """
+    def __init__(self, target_length=5, mode=VCF, max_depth=10, max_threes=2, max_nodes=2000, time_ms=200,
+                 tt_limit=200000):
+        self.level = LEVEL
+        self.target_length = target_length
+        self.mode = mode
+        self.max_depth = max_depth
+        self.max_threes = max_threes  # VCT: open threes allowed in a line (the rest must be fours)
+        self.max_nodes = max_nodes
+        self.time_ms = time_ms
+        self.tt_limit = tt_limit
+        self.tt = {}  # (zobrist_hash, attacker, threes left) -> (depth, line or None)
+        self.nodes = 0
+        self._deadline = 0.0
+
+    def new_game(self):
+        self.tt.clear()
+
+    def solve(self, board, color, mode=None):
+        """
+        board: GameBoard (searched in place with place/undo, left unchanged) or board_grid.
+        color: the side to move (the attacker).
+        """
+        mode = mode or self.mode
+        if not isinstance(board, GameBoard):
+            board = self._board_from_grid(board)
+        attacker = 1 if color > 0 else -1
+        self.nodes = 0
+        self._deadline = time.perf_counter() + self.time_ms / 1000.0
+        if len(self.tt) > self.tt_limit: self.tt.clear()
+        line = None
+        try:
+            # Fours first: a VCF is cheaper to find and is also a VCT
+            line = self._attack(board, attacker, self.max_depth, 0)
+            if line is None and mode == VCT:
+                line = self._attack(board, attacker, self.max_depth, self.max_threes)
+        except _OutOfBudget:
+            return None
+        if line is None: return None
+        return [(idx // self.level, idx % self.level) for idx in line]
+
+    def _board_from_grid(self, grid):
+        board = GameBoard(target_length=self.target_length)
+        for x in range(self.level):
+            for y in range(self.level):
+                if grid[x][y] != 0:
+                    board.place_stone(x, y, 1 if grid[x][y] > 0 else -1)
+        return board
+
+    # --- Search ---
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes > self.max_nodes or time.perf_counter() > self._deadline:
+            raise _OutOfBudget()
+
+    def _attack(self, board, attacker, depth, threes):
+        """Attacker to move: a line that wins by force, or None. threes: open threes still allowed (0 = VCF)."""
+        threats = self._scan(board, attacker)
+        if threats[WIN]: return [next(iter(threats[WIN]))]
+        if depth <= 0: return None
+
+        key = (board.zobrist_hash, attacker, threes)
+        entry = self.tt.get(key)
+        if entry is not None:
+            e_depth, e_line = entry
+            # A win found with fewer moves still holds; a failure holds for shallower searches
+            if e_line is not None or e_depth >= depth: return e_line
+        self._tick()
+
+        blocks = threats[D_WIN]
+        if len(blocks) >= 2:
+            line = None
+        elif blocks:
+            # Forced to block; the search only goes on if the block is itself a threat
+            line = self._try_threat(board, next(iter(blocks)), attacker, depth, threes)
+        else:
+            line = None
+            for idx in self._threat_moves(threats, threes):
+                line = self._try_threat(board, idx, attacker, depth, threes)
+                if line is not None: break
+
+        self.tt[key] = (depth, line)
+        return line
+
+    def _try_threat(self, board, idx, attacker, depth, threes):
+        board.place_stone(idx // self.level, idx % self.level, attacker)
+        try:
+            threats = self._scan(board, attacker)
+            if not threats[WIN] and (threes <= 0 or not threats[THREE_DEFENCE]): return None
+            sub = self._defend(board, attacker, threats, depth - 1, threes)
+            return None if sub is None else [idx] + sub
+        finally:
+            board.undo_last_move()
+
+    def _defend(self, board, attacker, threats, depth, threes):
+        """Defender to move after an attacker threat. Returns the line if every reply still loses, else None."""
+        if threats[D_WIN]: return None  # defender just wins
+        wins = list(threats[WIN])
+        if len(wins) >= 2:
+            return wins[:2]  # two winning cells: blocking one is not enough
+        if wins:
+            replies = wins
+        else:
+            # Open three: block any of its cells, or counter with a four of our own
+            threes -= 1
+            defences = threats[THREE_DEFENCE]
+            replies = sorted(defences, key=lambda i: (defences[i], -i), reverse=True)
+            replies += [r for r in threats[D_FOUR] if r not in defences]
+
+        defender = -attacker
+        line = None
+        for r in replies:
+            self._tick()
+            board.place_stone(r // self.level, r % self.level, defender)
+            try:
+                sub = self._attack(board, attacker, depth, threes)
+            finally:
+                board.undo_last_move()
+            if sub is None: return None
+            if line is None: line = [r] + sub
+        return line
+
+    # --- Threat detection ---
+    def _scan(self, board, attacker):
+        """
+        One pass over every line: a list indexed by threat kind of {cell: number
+        of windows that make it that threat}.
+        """
+        L = self.target_length
+        short, long = _shape_tables(L)
+        to_char = {attacker: "x", -attacker: "o", 0: "."}
+        chars = [to_char[v] for row in board.grid for v in row]
+        threats = [{} for _ in range(_NUM_KINDS)]
+        for line in _LINES:
+            n = len(line)
+            if n < L: continue
+            s = "#" + "".join([chars[i] for i in line]) + "#"  # "#": off the board
+            if s.count(".") == n: continue  # no stones on this line
+            for width, table in ((L, short), (L + 1, long)):
+                for start in range(n + 3 - width):
+                    entries = table.get(s[start:start + width])
+                    if entries is None: continue
+                    for kind, offset in entries:
+                        idx = line[start + offset - 1]
+                        found = threats[kind]
+                        found[idx] = found.get(idx, 0) + 1
+        return threats
+
+    def _threat_moves(self, threats, threes):
+        """Attacker's fours (then open threes, in VCT), cells making the most threats first."""
+        fours, three_moves = threats[FOUR], threats[THREE]
+        moves = sorted(fours, key=lambda i: (fours[i] + three_moves.get(i, 0), -i), reverse=True)
+        if threes > 0:
+            moves += sorted((i for i in three_moves if i not in fours),
+                            key=lambda i: (three_moves[i], -i), reverse=True)
+        return moves
@@ -12,7 +12,18 @@ from tqdm import tqdm
 
 from game_board import GameBoard
 from ai_player import AIPlayer
+from search_player import SearchPlayer
+from threat_search import ThreatSolver
+from opening_book import get_book
 from rl_ai_player import RL_AIPlayer
+from numpy_net import NumpyNet
+from inference_server import InferenceServer, InferenceClient
+from weight_store import WeightStore
+from actor_learner import ActorPool, TaskStream
+from replay_buffer import ReplayBuffer, fit_on_replay
+from replay_store import ReplayStore
+from sample_codec import encode, pack_history
+from actor_runtime import ActorRuntime
 
 # --- 訓練超參數 ---
 NUM_TOTAL_GAMES = 20000     # 再跑 2 萬局來收尾
@@ -27,6 +38,45 @@ MODEL_SAVE_PATH = "models/"
 # 0.0 代表老師完全不失誤，這是最硬的仗
 TEACHER_MISTAKE_RATE = 0.0 
 
+# [NEW] > 0: 老師改用 SearchPlayer (alpha-beta), 每步最多思考這麼多毫秒
+TEACHER_SEARCH_MS = 0
+
+# [NEW] 裁判: 輪到的一方已經有連續衝四 (VCF) 必勝時, 直接判他贏, 提早結束這局
+# (預設關閉: 打開後, 這些局的殺棋收尾不會進入訓練資料, 資料分布會跟原本不同)
+ADJUDICATE_VCF = False
+
+# [NEW] True: 工人用 numpy_net 的純 NumPy 推論 (BN 已折進卷積), 不必載入 TensorFlow
+NUMPY_WORKERS = True
+
+# [NEW] True: 權重放在共享記憶體 (weight_store.py), 任務只帶版本 handle, 工人版本變了才重新載入
+SHARED_WEIGHTS = True
+
+# [NEW] 回放記憶體 (replay_buffer.py): 預先配置好的環形緩衝區, 舊樣本留著重複利用
+REPLAY_CAPACITY = 1 << 20   # 最多存幾步 (對稱在訓練時才做), 壓縮過每個 61 bytes, 約 80 MB (含 sum tree)
+REPLAY_REUSE = 1.0          # 每個新樣本平均被拿來訓練幾次
+PRIORITIZED_REPLAY = False  # True: 依照 loss 大小抽樣 (sum tree), 學得差的局面多練幾次
+AUGMENT = "random"          # [NEW] 旋轉/翻轉在 tf.data 裡即時做 (input_pipeline.py): "random" 每個樣本隨機一種, "all" 8 種都練
+# [NEW] 設定資料夾的話改用硬碟上的回放資料 (replay_store.py, memmap), 比記憶體大也沒關係,
+# 重新執行 train.py 時會接著用之前所有的對局 (例如 "replay/gomoku", 每個樣本 61 bytes)
+REPLAY_DIR = None
+REPLAY_WINDOW = 0           # > 0: 只從最新的這麼多個樣本抽
+
+# [NEW] > 0: 每個工人用 batched_actor.py 同時下這麼多局, 每一手所有輪到學生的局面只呼叫一次 predict
+# (一個任務 = 這麼多局; 任務全部下完才一起傳回, 所以這個模式是一批一批收, 不是一局一局)
+BATCHED_GAMES = 0
+
+# [NEW] 同時送出去在跑的任務數上限, 0 = 每個工人 2 個; 下完一局收一局 (actor_learner.TaskStream), 不再等整批
+IN_FLIGHT = 0
+
+# [NEW] True: 非同步模式 (actor_learner.py), 工人一直下棋把對局丟進佇列, 訓練同時進行, 不再等 pool.map 整批結束
+ASYNC_ACTORS = False
+MAX_STALENESS = 2  # 比目前權重落後超過幾個版本的對局直接丟掉
+
+# [NEW] True: 學生的網路只放在一個推論伺服器程序, 所有工人把局面送過去合併成批次預測
+USE_INFERENCE_SERVER = False
+INFERENCE_MAX_BATCH = 32       # 一次 predict 最多幾個局面
+INFERENCE_MAX_WAIT_US = 2000   # 第一個請求最多等多久 (微秒) 湊批次
+
 # [最終修改 2] 收斂心性
 # 探索率降到 0.1，讓 AI 專注於「贏棋」而不是「嘗試」
 EPSILON_START = 0.1  
@@ -36,39 +86,29 @@ EPSILON_DECAY = 0.995
 
 os.makedirs(MODEL_SAVE_PATH, exist_ok=True)
 
-# --- 資料增強 ---
-def get_symmetries(board_input, pi_policy):
-    state = np.squeeze(board_input)
-    pi = pi_policy.reshape(15, 15)
-    sym_data = []
-    for i in range(4):
-        rotated_state = np.rot90(state, i)
-        rotated_pi = np.rot90(pi, i)
-        sym_data.append((np.expand_dims(rotated_state, 0), rotated_pi.flatten()))
-        flipped_state = np.fliplr(rotated_state)
-        flipped_pi = np.fliplr(rotated_pi)
-        sym_data.append((np.expand_dims(flipped_state, 0), flipped_pi.flatten()))
-    return sym_data
-
 # --- 即時獎勵計算機 ---
-def calculate_move_quality(board_grid, x, y, color):
+def calculate_move_quality(board_grid, x, y, color, board=None):
     extra_reward = 0
     level = 15
     directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
     for dx, dy in directions:
-        count = 1 
-        i, j = x + dx, y + dy
-        while 0 <= i < level and 0 <= j < level and board_grid[i][j] == color:
-            count += 1
-            i += dx
-            j += dy
-        open_end_1 = (0 <= i < level and 0 <= j < level and board_grid[i][j] == 0)
-        i, j = x - dx, y - dy
-        while 0 <= i < level and 0 <= j < level and board_grid[i][j] == color:
-            count += 1
-            i -= dx
-            j -= dy
-        open_end_2 = (0 <= i < level and 0 <= j < level and board_grid[i][j] == 0)
+        if board is not None and board.track_runs:
+            # 直接讀 GameBoard 的連子索引, 不用再掃一次
+            count, open_end_1, open_end_2 = board.line_stats(x, y, dx, dy, color)
+        else:
+            count = 1 
+            i, j = x + dx, y + dy
+            while 0 <= i < level and 0 <= j < level and board_grid[i][j] == color:
+                count += 1
+                i += dx
+                j += dy
+            open_end_1 = (0 <= i < level and 0 <= j < level and board_grid[i][j] == 0)
+            i, j = x - dx, y - dy
+            while 0 <= i < level and 0 <= j < level and board_grid[i][j] == color:
+                count += 1
+                i -= dx
+                j -= dy
+            open_end_2 = (0 <= i < level and 0 <= j < level and board_grid[i][j] == 0)
         
         if count == 4 and open_end_1 and open_end_2: extra_reward += 0.5
         elif count == 4 and (open_end_1 or open_end_2): extra_reward += 0.3
@@ -77,17 +117,37 @@ def calculate_move_quality(board_grid, x, y, color):
     return extra_reward
 
 # --- 工人函式 ---
+# [CHANGED] 棋盤/老師/學生/裁判每個工人程序只建一次 (init_worker), 之後每局 reset 重用 (actor_runtime.py)
+runtime = None
+
+def make_board():
+    return GameBoard(track_runs=True, numpy_grid=True, track_frontier=True)
+
+def make_teacher(board):
+    if TEACHER_SEARCH_MS > 0:
+        teacher_ai = SearchPlayer(time_ms=TEACHER_SEARCH_MS, book=get_book(5))
+        teacher_ai.bind_board(board)
+    else:
+        teacher_ai = AIPlayer(book=get_book(5))  # [NEW] 有 books/book_5.bin 時開局照棋譜下
+        teacher_ai.bind_board(board, incremental=True)
+    return teacher_ai
+
+def init_worker(inference_handle=None):
+    """Pool initializer: 這個程序的 ActorRuntime"""
+    global runtime
+    if inference_handle is not None:
+        model = InferenceClient.connect(inference_handle)  # 權重由伺服器負責更新
+    else:
+        model = NumpyNet(None) if NUMPY_WORKERS else RL_AIPlayer().model
+    adjudicator = ThreatSolver(max_nodes=200, time_ms=20) if ADJUDICATE_VCF else None
+    runtime = ActorRuntime(make_board, make_teacher, model, adjudicator, served=inference_handle is not None)
+
 def simulation_worker(args):
     weights, epsilon = args
     
-    import os
-    os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
-    import tensorflow as tf
-    
-    board = GameBoard()
-    teacher_ai = AIPlayer()
-    student_ai = RL_AIPlayer() 
-    student_ai.model.set_weights(weights)
+    runtime.sync(weights)  # 共享權重的版本沒變就什麼都不做
+    board, teacher_ai = runtime.new_game()
+    student_ai, adjudicator = runtime.student, runtime.adjudicator
     
     # 稍微增加觀察模式，讓學生看老師如何完美左右互搏
     is_observation_mode = (random() < 0.2) 
@@ -104,17 +164,17 @@ def simulation_worker(args):
     
     while not game_over:
         role = p1 if current_color == 1 else p2
-        state_tensor = student_ai._prepare_input(board.grid, current_color)
+        planes = encode(board.array, current_color)  # [CHANGED] 57 bytes 的壓縮局面, 不再傳 float32 張量
         ax, ay = -1, -1
         
         move_immediate_reward = 0.0 
         
         if role == "student":
             if random() < epsilon:
-                ax, ay = student_ai._find_random_empty(board.grid)
+                ax, ay = board.random_empty()
             else:
-                ax, ay = student_ai.get_move(board.grid, current_color)
-            move_immediate_reward = calculate_move_quality(board.grid, ax, ay, current_color)
+                ax, ay = student_ai.get_move(board.array, current_color)
+            move_immediate_reward = calculate_move_quality(board.grid, ax, ay, current_color, board)
         else:
             # [老師邏輯]
             # 這一步很重要：TEACHER_MISTAKE_RATE 現在是 0，所以 make_mistake 永遠是 False
@@ -126,12 +186,9 @@ def simulation_worker(args):
                 if not board.is_empty(ax, ay):
                      ax, ay = teacher_ai._find_random_empty(board.grid)
                  
-        target_policy = np.zeros(225)
-        target_policy[ax * 15 + ay] = 1.0
-        
         game_history.append({
-            'state': state_tensor,
-            'policy': target_policy,
+            'planes': planes,
+            'move': ax * 15 + ay,  # [CHANGED] 稀疏的策略目標, 不再是 225 維 one-hot
             'color': current_color,
             'immediate_reward': move_immediate_reward
         })
@@ -145,11 +202,36 @@ def simulation_worker(args):
         elif board.is_full():
             winner_color = 0
             game_over = True
+        elif adjudicator is not None and adjudicator.solve(board, -current_color):
+            # 下一手的人已經必勝 (VCF), 剩下的棋不用下了
+            winner_color = -current_color
+            game_over = True
             
         current_color *= -1
         
     student_played = (p1 == "student")
-    return game_history, winner_color, student_played
+    return pack_history(game_history), winner_color, student_played  # [CHANGED] 整局壓成幾個小陣列再傳回
+
+# --- [NEW] 批次自我對弈 (BATCHED_GAMES > 0): 規則跟 simulation_worker 一樣 ---
+def batched_student_color():
+    # 兩成是觀察模式 (老師對老師), 其他局學生執黑
+    return 0 if random() < 0.2 else 1
+
+def batched_teacher_move(teacher_ai, board, last_xy, color, student_color):
+    if student_color != 0 and random() < TEACHER_MISTAKE_RATE:
+        return board.random_empty()
+    ax, ay = teacher_ai.get_move(board.grid, last_xy[0], last_xy[1], color)
+    if not board.is_empty(ax, ay): ax, ay = board.random_empty()
+    return ax, ay
+
+def batched_worker(args):
+    """(權重, epsilon[, 局數]) -> 下完的對局 list (全部下完才傳回), 格式跟 simulation_worker 的結果一樣"""
+    weights, epsilon = args[:2]
+    num_games = args[2] if len(args) > 2 else BATCHED_GAMES
+    runtime.sync(weights)
+    actor = runtime.batched_actor(num_games, batched_student_color, batched_teacher_move, calculate_move_quality)
+    return [(pack_history(history), winner, student_color != 0)
+            for history, winner, student_color in actor.play(num_games, epsilon)]
 
 def train():
     import tensorflow as tf
@@ -179,13 +261,19 @@ def train():
     else:
         print(f"⚠️ 警告：沒找到任何舊模型！你確定要從零開始挑戰 0 失誤老師嗎？(會被虐很慘喔)")
         student_ai = RL_AIPlayer()
+    student_ai.compile_model()  # [NEW] 策略頭改用稀疏目標 (舊模型是 categorical_crossentropy)
     # ==========================================
 
     num_workers = mp.cpu_count()
     
     print(f"--- 啟動第三階段訓練 (Teacher Mistake: {TEACHER_MISTAKE_RATE}) ---")
     
-    memory_buffer = []
+    if REPLAY_DIR:
+        replay = ReplayStore(REPLAY_DIR, window=REPLAY_WINDOW)
+        print(f"回放資料: {REPLAY_DIR} 已有 {len(replay)} 個樣本")
+    else:
+        replay = ReplayBuffer(REPLAY_CAPACITY, prioritized=PRIORITIZED_REPLAY)
+    trained_upto = replay.added  # replay.added 上次訓練時的值
     epsilon = EPSILON_START
     games_completed = 0
     batch_count = 0
@@ -195,19 +283,60 @@ def train():
     recent_draws = 0
     recent_games_count = 0
     
-    with mp.Pool(processes=num_workers) as pool:
+    server = None
+    if USE_INFERENCE_SERVER:
+        server = InferenceServer(weights=student_ai.model.get_weights(), max_batch=INFERENCE_MAX_BATCH,
+                                 max_wait_us=INFERENCE_MAX_WAIT_US, num_clients=num_workers).start()
+    # [CHANGED] 每個工人程序一開始就建好自己的 ActorRuntime
+    pool_kwargs = dict(initializer=init_worker, initargs=(server.handle() if server else None,))
+    store = None
+    weights_changed = False
+    if (SHARED_WEIGHTS and server is None) or ASYNC_ACTORS:  # 非同步模式靠它的版本號控制落後程度
+        store = WeightStore.create(student_ai.model.get_weights())
+
+    play_fn = batched_worker if BATCHED_GAMES > 0 else simulation_worker
+    if ASYNC_ACTORS:
+        # 留一個核心給訓練
+        workers = ActorPool(play_fn, store, max(1, num_workers - 1), epsilon,
+                            max_staleness=MAX_STALENESS, **pool_kwargs)
+    else:
+        workers = mp.Pool(processes=num_workers, **pool_kwargs)
+
+    with workers as pool:
+        stream = None if ASYNC_ACTORS else TaskStream(pool, play_fn, IN_FLIGHT or 2 * num_workers)
         with tqdm(total=NUM_TOTAL_GAMES, unit="game") as pbar:
             while games_completed < NUM_TOTAL_GAMES:
-                current_weights = student_ai.model.get_weights()
-                tasks = [(current_weights, epsilon)] * GAMES_PER_BATCH
-                
-                results = pool.map(simulation_worker, tasks)
+                published = store.bytes_written if store is not None else 0
+                sent = stream.bytes_sent if stream is not None else 0
+                if server is not None and weights_changed:
+                    server.set_weights(student_ai.model.get_weights())  # 熱更新, 工人不用再收整包權重
+                if store is not None:
+                    if weights_changed:
+                        store.publish(student_ai.model.get_weights())
+                    current_weights = store.handle()  # 任務只帶幾百 bytes 的 handle
+                elif server is not None:
+                    current_weights = None
+                else:
+                    current_weights = student_ai.model.get_weights()
+                weights_changed = False
                 
-                batch_games_count = len(results)
-                games_completed += batch_games_count
-                pbar.update(batch_games_count)
+                if ASYNC_ACTORS:
+                    # 拿下一批已經下完的對局; actor 在我們訓練的時候也沒停
+                    pool.set_epsilon(epsilon)
+                    games = pool.stream(GAMES_PER_BATCH)
+                else:
+                    # [CHANGED] 不再 pool.map 等整批最慢的那局: 先下完的 GAMES_PER_BATCH 局就是這一批,
+                    # 還沒下完的繼續跑, 算在下一批
+                    if BATCHED_GAMES > 0:
+                        stream.set_task((current_weights, epsilon, BATCHED_GAMES))
+                    else:
+                        stream.set_task((current_weights, epsilon))
+                    games = stream.games(GAMES_PER_BATCH)
                 
-                for history, winner, student_played in results:
+                # [CHANGED] 每收到一局就放進回放記憶體、更新進度條
+                for history, winner, student_played in games:
+                    games_completed += 1
+                    pbar.update(1)
                     if student_played:
                         recent_games_count += 1
                         if winner == 1: recent_student_wins += 1
@@ -219,28 +348,22 @@ def train():
                     elif winner == -1: reward_for_black = -1.0
                     else: reward_for_black = -0.1 
                     
-                    for step in history:
-                        base_val = reward_for_black if step['color'] == 1 else -reward_for_black
-                        final_val = base_val + step['immediate_reward']
-                        final_val = np.clip(final_val, -1.5, 1.5)
-                        
-                        aug_data = get_symmetries(step['state'], step['policy'])
-                        for s, p in aug_data:
-                            memory_buffer.append((s, p, final_val))
-                
-                if len(memory_buffer) >= TRAIN_THRESHOLD:
-                    states = np.vstack([m[0] for m in memory_buffer])
-                    policies = np.vstack([m[1] for m in memory_buffer])
-                    values = np.array([m[2] for m in memory_buffer])
+                    # [CHANGED] 整局一起算, 不再一步一步迴圈
+                    base_val = np.where(history['colors'] == 1, reward_for_black, -reward_for_black)
+                    final_val = np.clip(base_val + history['rewards'], -1.5, 1.5)
                     
-                    student_ai.model.fit(
-                        states, 
-                        {'policy_output': policies, 'value_output': values},
-                        batch_size=512, 
-                        epochs=1, 
-                        verbose=0
-                    )
-                    memory_buffer = []
+                    replay.add(history['planes'], history['moves'], final_val, history['colors'])
+                
+                # [NEW] 這一批實際送出的 bytes (任務 pickle + 寫進共享記憶體的權重)
+                batch_bytes = store.bytes_written - published if store is not None else 0
+                if stream is not None: batch_bytes += stream.bytes_sent - sent
+                
+                new_samples = (replay.added - trained_upto) * 8  # 跟以前一樣, 每步算 8 個 (對稱) 樣本
+                if new_samples >= TRAIN_THRESHOLD:
+                    fit_on_replay(student_ai.model, replay, int(new_samples * REPLAY_REUSE), batch_size=512,
+                                  augment=AUGMENT)
+                    trained_upto = replay.added
+                    weights_changed = True
                     if epsilon > EPSILON_END:
                         epsilon *= EPSILON_DECAY
                 
@@ -248,7 +371,8 @@ def train():
                 
                 if recent_games_count > 0:
                     win_rate = (recent_student_wins / recent_games_count) * 100
-                    pbar.set_postfix({'WR': f"{win_rate:.1f}%", 'Eps': f"{epsilon:.2f}"})
+                    pbar.set_postfix({'WR': f"{win_rate:.1f}%", 'Eps': f"{epsilon:.2f}",
+                                      'MB/batch': f"{batch_bytes / 1e6:.2f}"})
 
                 if batch_count % REPORT_EVERY == 0:
                     if recent_games_count > 0:
@@ -272,7 +396,14 @@ def train():
                 if batch_count % SAVE_MODEL_EVERY == 0:
                     path = os.path.join(MODEL_SAVE_PATH, "gomoku_rl_model_latest.keras")
                     student_ai.save_model(path)
+                    if REPLAY_DIR: replay.flush()
 
+    if server is not None:
+        server.stop()
+    if store is not None:
+        store.close()
+    if REPLAY_DIR:
+        replay.close()
     student_ai.save_model(os.path.join(MODEL_SAVE_PATH, "gomoku_rl_model_final.keras"))
     print("畢業考結束！恭喜你的 AI 完成所有訓練！")
 
@@ -11,8 +11,18 @@ from random import random
 from tqdm import tqdm
 import shutil
 
-from gomoku_game import GomokuGame
+from game_board import GameBoard
 from rl_ai_player import RL_AIPlayer
+from numpy_net import NumpyNet
+from inference_server import InferenceServer, InferenceClient
+from weight_store import WeightStore
+from actor_learner import TaskStream
+from threat_search import ThreatSolver
+from opening_book import get_book
+from replay_buffer import ReplayBuffer, fit_on_replay
+from replay_store import ReplayStore
+from sample_codec import encode, pack_history
+from actor_runtime import ActorRuntime
 
 try:
     from ai_player_connect4 import TeacherAI_4Row as TeacherAI
@@ -40,10 +50,25 @@ TEACHER_MISTAKE_RATE = 0.2   # Teacher plays randomly 40% of the time!
 EPSILON_START = 0.4         # 100% Random start (Fresh brain)
 EPSILON_END = 0.01           
 EPSILON_DECAY = 0.9995       # Very slow decay to ensure it learns basics
+ADJUDICATE_VCF = False       # [NEW] End a game once the side to move has a forced win by fours
+                             # (off by default: when on, the finishing sequences never reach the training data)
+NUMPY_WORKERS = True         # [NEW] Workers run the net in plain NumPy (numpy_net.py) and never import TensorFlow
+SHARED_WEIGHTS = True        # [NEW] Weights live in shared memory (weight_store.py); tasks carry a version handle
+USE_INFERENCE_SERVER = False # [NEW] One process owns the student network; workers send it positions to batch
+INFERENCE_MAX_BATCH = 32
+INFERENCE_MAX_WAIT_US = 2000
+REPLAY_CAPACITY = 1 << 20    # [NEW] Preallocated replay ring buffer (replay_buffer.py), one sample per move
+REPLAY_REUSE = 1.0           # [NEW] How many times each new sample is trained on, on average
+PRIORITIZED_REPLAY = False   # [NEW] Sample by loss through a sum tree instead of uniformly
+AUGMENT = "random"           # [NEW] Rotations / reflections made on the fly by tf.data (input_pipeline.py); "all" = all 8
+REPLAY_DIR = None            # [NEW] e.g. "replay/connect4": on-disk replay (replay_store.py) kept across runs
+REPLAY_WINDOW = 0            # [NEW] > 0: sample only the newest this many on-disk samples
+IN_FLIGHT = 0                # [NEW] Games kept running at once (actor_learner.TaskStream); 0 = 2 per worker
 # ==========================================
 
-global_student_ai = None
-global_teacher_ai = None
+# [CHANGED] Board, teacher, student and adjudicator are built once per worker process (init_worker)
+# and reset for every game (actor_runtime.py), instead of a GomokuGame (pygame) per game
+runtime = None
 
 class Quiet:
     def __enter__(self):
@@ -53,39 +78,31 @@ class Quiet:
         sys.stdout.close()
         sys.stdout = self._original_stdout
 
-def get_symmetries(board_input, pi_policy):
-    state = np.squeeze(board_input)
-    pi = pi_policy.reshape(15, 15)
-    sym_data = []
-    for i in range(4):
-        rotated_state = np.rot90(state, i)
-        rotated_pi = np.rot90(pi, i)
-        sym_data.append((np.expand_dims(rotated_state, 0), rotated_pi.flatten()))
-        flipped_state = np.fliplr(rotated_state)
-        flipped_pi = np.fliplr(rotated_pi)
-        sym_data.append((np.expand_dims(flipped_state, 0), flipped_pi.flatten()))
-    return sym_data
-
 # --- IMPROVED REWARD FUNCTION (Now Rewards Blocking!) ---
-def calculate_move_quality(board_grid, x, y, color):
+def calculate_move_quality(board_grid, x, y, color, board=None):
     extra_reward = 0
     level = 15
     # Check 4 directions
     directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
+    # With a run-indexed GameBoard the counts are O(1) lookups instead of ray walks
+    use_index = board is not None and board.track_runs
     
     for dx, dy in directions:
         # 1. Analyze MY line (Attack)
-        count_self = 1 
-        # ... forward scan ...
-        i, j = x + dx, y + dy
-        while 0 <= i < level and 0 <= j < level and board_grid[i][j] == color:
-            count_self += 1; i += dx; j += dy
-        open_1 = (0 <= i < level and 0 <= j < level and board_grid[i][j] == 0)
-        # ... backward scan ...
-        i, j = x - dx, y - dy
-        while 0 <= i < level and 0 <= j < level and board_grid[i][j] == color:
-            count_self += 1; i -= dx; j -= dy
-        open_2 = (0 <= i < level and 0 <= j < level and board_grid[i][j] == 0)
+        if use_index:
+            count_self, open_1, open_2 = board.line_stats(x, y, dx, dy, color)
+        else:
+            count_self = 1 
+            # ... forward scan ...
+            i, j = x + dx, y + dy
+            while 0 <= i < level and 0 <= j < level and board_grid[i][j] == color:
+                count_self += 1; i += dx; j += dy
+            open_1 = (0 <= i < level and 0 <= j < level and board_grid[i][j] == 0)
+            # ... backward scan ...
+            i, j = x - dx, y - dy
+            while 0 <= i < level and 0 <= j < level and board_grid[i][j] == color:
+                count_self += 1; i -= dx; j -= dy
+            open_2 = (0 <= i < level and 0 <= j < level and board_grid[i][j] == 0)
 
         # Attack Rewards
         if count_self == 3 and open_1 and open_2: extra_reward += 0.5
@@ -96,14 +113,17 @@ def calculate_move_quality(board_grid, x, y, color):
         # We pretend the opponent placed a stone here. If they had a long line,
         # then placing here was a good block!
         opponent_color = -color
-        count_opp = 1
-        i, j = x + dx, y + dy
-        while 0 <= i < level and 0 <= j < level and board_grid[i][j] == opponent_color:
-            count_opp += 1; i += dx; j += dy
-        
-        i, j = x - dx, y - dy
-        while 0 <= i < level and 0 <= j < level and board_grid[i][j] == opponent_color:
-            count_opp += 1; i -= dx; j -= dy
+        if use_index:
+            count_opp = board.line_stats(x, y, dx, dy, opponent_color)[0]
+        else:
+            count_opp = 1
+            i, j = x + dx, y + dy
+            while 0 <= i < level and 0 <= j < level and board_grid[i][j] == opponent_color:
+                count_opp += 1; i += dx; j += dy
+            
+            i, j = x - dx, y - dy
+            while 0 <= i < level and 0 <= j < level and board_grid[i][j] == opponent_color:
+                count_opp += 1; i -= dx; j -= dy
             
         # Defense Rewards (Blocking)
         if count_opp >= 3: # We blocked a 3 (which would become 4)
@@ -113,24 +133,31 @@ def calculate_move_quality(board_grid, x, y, color):
 
     return extra_reward
 
-def init_worker():
-    global global_student_ai, global_teacher_ai
+def make_board():
+    return GameBoard(target_length=TARGET_WIN, track_runs=True, numpy_grid=True, track_frontier=True)
+
+def make_teacher(board):
+    teacher_ai = TeacherAI(target_length=TARGET_WIN, book=get_book(TARGET_WIN))
+    teacher_ai.bind_board(board, incremental=True)
+    return teacher_ai
+
+def init_worker(inference_handle=None):
+    global runtime
     with Quiet():
-        global_student_ai = RL_AIPlayer()
-        global_teacher_ai = TeacherAI(target_length=TARGET_WIN)
+        if inference_handle is not None:
+            model = InferenceClient.connect(inference_handle)
+        elif NUMPY_WORKERS:
+            model = NumpyNet(None)  # weights arrive with each task
+        else:
+            model = RL_AIPlayer().model
+        adjudicator = ThreatSolver(target_length=TARGET_WIN, max_nodes=200, time_ms=20) if ADJUDICATE_VCF else None
+        runtime = ActorRuntime(make_board, make_teacher, model, adjudicator, served=inference_handle is not None)
 
 def simulation_worker(args):
     weights, epsilon = args
-    global global_student_ai, global_teacher_ai
-    
-    student_ai = global_student_ai
-    teacher_ai = global_teacher_ai
-    if weights is not None:
-        student_ai.model.set_weights(weights)
-
-    with Quiet():
-        game = GomokuGame()
-        game.board.target_length = TARGET_WIN 
+    runtime.sync(weights)  # a shared-memory handle only reloads on a new version
+    board, teacher_ai = runtime.new_game()
+    student_ai, adjudicator = runtime.student, runtime.adjudicator
 
     is_student_black = (random() > 0.5)
     p1 = "student" if is_student_black else "teacher"
@@ -143,54 +170,54 @@ def simulation_worker(args):
     
     while not game_over:
         role = p1 if current_color == 1 else p2
-        current_grid = game.board.grid
-        state_tensor = student_ai._prepare_input(current_grid, current_color)
+        current_grid = board.grid
+        planes = encode(board.array, current_color)  # [CHANGED] 57-byte packed position (sample_codec.py)
         row, col = -1, -1
         move_immediate_reward = 0.0 
         
         if role == "student":
             if random() < epsilon:
-                row, col = student_ai._find_random_empty(current_grid)
+                row, col = board.random_empty()
                 if row == -1: row, col = 7, 7
             else:
-                row, col = student_ai.get_move(current_grid, current_color)
+                row, col = student_ai.get_move(board.array, current_color)
             
             # Now uses the UPDATED quality check (Attack + Defense)
-            move_immediate_reward = calculate_move_quality(current_grid, row, col, current_color)
+            move_immediate_reward = calculate_move_quality(current_grid, row, col, current_color, board)
 
         else:
             # Teacher makes mistakes now!
             if random() < TEACHER_MISTAKE_RATE:
-                row, col = student_ai._find_random_empty(current_grid)
+                row, col = board.random_empty()
             else:
                 row, col = teacher_ai.get_move(current_grid, current_color)
                  
-        target_policy = np.zeros(225)
-        target_policy[row * 15 + col] = 1.0
-        
         game_history.append({
-            'state': state_tensor,
-            'policy': target_policy,
+            'planes': planes,
+            'move': row * 15 + col,  # [CHANGED] Sparse policy target instead of a 225-wide one-hot
             'color': current_color,
             'immediate_reward': move_immediate_reward,
             'is_student': (role == "student")
         })
         
-        if not game.board.is_valid(row, col):
+        if not board.is_valid(row, col):
              winner_color = -current_color
              game_over = True
         else:
-            game.board.place_stone(row, col, current_color)
-            if game.board.check_win(row, col, current_color):
+            board.place_stone(row, col, current_color)
+            if board.check_win(row, col, current_color):
                 winner_color = current_color
                 game_over = True
-            elif game.board.is_full():
+            elif board.is_full():
                 winner_color = 0
                 game_over = True
+            elif adjudicator is not None and adjudicator.solve(board, -current_color):
+                winner_color = -current_color
+                game_over = True
             
         current_color *= -1
         
-    return game_history, winner_color, is_student_black
+    return pack_history(game_history), winner_color, is_student_black  # [CHANGED] A few small arrays per game
 
 def train():
     import tensorflow as tf
@@ -211,7 +238,12 @@ def train():
     num_workers = max(1, mp.cpu_count() - 2)
     print(f"🔥 Using {num_workers} Workers")
     
-    memory_buffer = []
+    if REPLAY_DIR:
+        replay = ReplayStore(REPLAY_DIR, window=REPLAY_WINDOW)
+        print(f"📼 Replay store {REPLAY_DIR}: {len(replay)} samples")
+    else:
+        replay = ReplayBuffer(REPLAY_CAPACITY, prioritized=PRIORITIZED_REPLAY)
+    trained_upto = replay.added  # replay.added at the last fit
     epsilon = EPSILON_START
     games_completed = 0
     batch_count = 0
@@ -219,52 +251,64 @@ def train():
     recent_student_wins = 0
     recent_games_count = 0
     
-    with mp.Pool(processes=num_workers, initializer=init_worker) as pool:
+    server = None
+    if USE_INFERENCE_SERVER:
+        server = InferenceServer(weights=student_ai.model.get_weights(), max_batch=INFERENCE_MAX_BATCH,
+                                 max_wait_us=INFERENCE_MAX_WAIT_US, num_clients=num_workers).start()
+    store = None
+    weights_changed = False
+    if SHARED_WEIGHTS and server is None:
+        store = WeightStore.create(student_ai.model.get_weights())
+
+    with mp.Pool(processes=num_workers, initializer=init_worker,
+                 initargs=(server.handle() if server else None,)) as pool:
+        stream = TaskStream(pool, simulation_worker, IN_FLIGHT or 2 * num_workers)
         with tqdm(total=NUM_TOTAL_GAMES, unit="game") as pbar:
             while games_completed < NUM_TOTAL_GAMES:
                 
-                current_weights = student_ai.model.get_weights()
-                tasks = [(current_weights, epsilon)] * GAMES_PER_BATCH
-                
-                results = pool.map(simulation_worker, tasks)
+                published = store.bytes_written if store is not None else 0
+                sent = stream.bytes_sent
+                if server is not None:
+                    if weights_changed:
+                        server.set_weights(student_ai.model.get_weights())  # hot swap instead of shipping weights with every task
+                    current_weights = None
+                elif store is not None:
+                    if weights_changed:
+                        store.publish(student_ai.model.get_weights())
+                    current_weights = store.handle()  # a few hundred bytes per task
+                else:
+                    current_weights = student_ai.model.get_weights()
+                weights_changed = False
+                stream.set_task((current_weights, epsilon))
                 
-                batch_games_count = len(results)
-                games_completed += batch_games_count
-                pbar.update(batch_games_count)
-                
-                for history, winner, is_student_black in results:
+                # [CHANGED] Games stream in as they finish instead of pool.map waiting for the slowest one:
+                # the first GAMES_PER_BATCH to finish make the batch, the rest keep running into the next
+                for history, winner, is_student_black in stream.games(GAMES_PER_BATCH):
+                    games_completed += 1
+                    pbar.update(1)
                     student_color = 1 if is_student_black else -1
                     if winner == student_color:
                         recent_student_wins += 1
                     recent_games_count += 1
 
-                    for step in history:
-                        step_reward = 0
-                        if winner == step['color']: step_reward = 1.0
-                        elif winner == -step['color']: step_reward = -1.0
-                        else: step_reward = -0.1
-                        
-                        # Add immediate reward (Block/Attack) to final result
-                        final_val = step_reward + step['immediate_reward']
-                        final_val = np.clip(final_val, -1.5, 1.5)
-                        
-                        aug_data = get_symmetries(step['state'], step['policy'])
-                        for s, p in aug_data:
-                            memory_buffer.append((s, p, final_val))
-                
-                if len(memory_buffer) >= TRAIN_THRESHOLD:
-                    states = np.vstack([m[0] for m in memory_buffer])
-                    policies = np.vstack([m[1] for m in memory_buffer])
-                    values = np.array([m[2] for m in memory_buffer])
+                    # [CHANGED] Whole game at once instead of step by step
+                    colors = history['colors']
+                    step_reward = np.where(winner == 0, -0.1, np.where(colors == winner, 1.0, -1.0))
+                    
+                    # Add immediate reward (Block/Attack) to final result
+                    final_val = np.clip(step_reward + history['rewards'], -1.5, 1.5)
                     
-                    student_ai.model.fit(
-                        states, 
-                        {'policy_output': policies, 'value_output': values},
-                        batch_size=512, 
-                        epochs=1, 
-                        verbose=0
-                    )
-                    memory_buffer = [] 
+                    replay.add(history['planes'], history['moves'], final_val, colors)
+                
+                # [NEW] Bytes sent this batch: pickled tasks + weights written to shared memory
+                batch_bytes = stream.bytes_sent - sent + (store.bytes_written - published if store is not None else 0)
+
+                new_samples = (replay.added - trained_upto) * 8  # Counted as 8 symmetric samples per move, as before
+                if new_samples >= TRAIN_THRESHOLD:
+                    fit_on_replay(student_ai.model, replay, int(new_samples * REPLAY_REUSE), batch_size=512,
+                                  augment=AUGMENT)
+                    trained_upto = replay.added
+                    weights_changed = True
                     if epsilon > EPSILON_END:
                         epsilon *= EPSILON_DECAY
                 
@@ -272,7 +316,8 @@ def train():
                 
                 if recent_games_count > 0:
                     win_rate = (recent_student_wins / recent_games_count) * 100
-                    pbar.set_postfix({'WR': f"{win_rate:.1f}%", 'Eps': f"{epsilon:.2f}"})
+                    pbar.set_postfix({'WR': f"{win_rate:.1f}%", 'Eps': f"{epsilon:.2f}",
+                                      'MB/batch': f"{batch_bytes / 1e6:.2f}"})
 
                 if batch_count % REPORT_EVERY == 0:
                      if recent_games_count > 0:
@@ -283,7 +328,14 @@ def train():
 
                 if batch_count % SAVE_MODEL_EVERY == 0:
                     student_ai.save_model(MODEL_FILE)
+                    if REPLAY_DIR: replay.flush()
 
+    if server is not None:
+        server.stop()
+    if store is not None:
+        store.close()
+    if REPLAY_DIR:
+        replay.close()
     student_ai.save_model(MODEL_FILE)
     print("🎓 Training Complete!")
 
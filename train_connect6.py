@@ -12,6 +12,16 @@ from tqdm import tqdm
 from game_board import GameBoard
 from ai_player_connect6 import AIPlayer
 from rl_ai_player import RL_AIPlayer
+from numpy_net import NumpyNet
+from inference_server import InferenceServer, InferenceClient
+from weight_store import WeightStore
+from actor_learner import TaskStream
+from threat_search import ThreatSolver
+from opening_book import get_book
+from replay_buffer import ReplayBuffer, fit_on_replay
+from replay_store import ReplayStore
+from sample_codec import encode, pack_history
+from actor_runtime import ActorRuntime
 
 # --- Settings ---
 NUM_TOTAL_GAMES = 20000
@@ -23,42 +33,49 @@ MODEL_SAVE_PATH = "models/"
 TARGET_RULE = 6  # [IMPORTANT] Training for Connect 6
 
 TEACHER_MISTAKE_RATE = 0.4 
+ADJUDICATE_VCF = False  # [NEW] End a game as soon as the side to move has a forced win by fours
+                        # (off by default: when on, the finishing sequences never reach the training data)
+NUMPY_WORKERS = True  # [NEW] Workers run the net in plain NumPy (numpy_net.py) and never import TensorFlow
+SHARED_WEIGHTS = True  # [NEW] Weights live in shared memory (weight_store.py); tasks carry a version handle
+USE_INFERENCE_SERVER = False  # [NEW] One process owns the student network; workers send it positions to batch
+INFERENCE_MAX_BATCH = 32
+INFERENCE_MAX_WAIT_US = 2000
+REPLAY_CAPACITY = 1 << 20  # [NEW] Preallocated replay ring buffer (replay_buffer.py), one sample per move
+REPLAY_REUSE = 1.0  # [NEW] How many times each new sample is trained on, on average
+PRIORITIZED_REPLAY = False  # [NEW] Sample by loss through a sum tree instead of uniformly
+AUGMENT = "random"  # [NEW] Rotations / reflections made on the fly by tf.data (input_pipeline.py); "all" = all 8
+REPLAY_DIR = None  # [NEW] e.g. "replay/connect6": on-disk replay (replay_store.py) kept across runs
+REPLAY_WINDOW = 0  # [NEW] > 0: sample only the newest this many on-disk samples
+BATCHED_GAMES = 0  # [NEW] > 0: each worker plays this many games in lockstep (batched_actor.py), one predict per ply
+                   # (a task returns its games together when the last one ends: results stream per task, not per game)
+IN_FLIGHT = 0  # [NEW] Tasks kept running at once (actor_learner.TaskStream); 0 = 2 per worker
 EPSILON_START = 0.3  
 EPSILON_END = 0.01
 EPSILON_DECAY = 0.995
 
 os.makedirs(MODEL_SAVE_PATH, exist_ok=True)
 
-def get_symmetries(board_input, pi_policy):
-    state = np.squeeze(board_input)
-    pi = pi_policy.reshape(15, 15)
-    sym_data = []
-    for i in range(4):
-        rotated_state = np.rot90(state, i)
-        rotated_pi = np.rot90(pi, i)
-        sym_data.append((np.expand_dims(rotated_state, 0), rotated_pi.flatten()))
-        flipped_state = np.fliplr(rotated_state)
-        flipped_pi = np.fliplr(rotated_pi)
-        sym_data.append((np.expand_dims(flipped_state, 0), flipped_pi.flatten()))
-    return sym_data
-
 # --- [MODIFIED] Heuristic for 6-in-a-Row ---
-def calculate_move_quality(board_grid, x, y, color):
+def calculate_move_quality(board_grid, x, y, color, board=None):
     extra_reward = 0
     level = 15
     directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
     
     for dx, dy in directions:
-        count = 1 
-        i, j = x + dx, y + dy
-        while 0 <= i < level and 0 <= j < level and board_grid[i][j] == color:
-            count += 1; i += dx; j += dy
-        open_end_1 = (0 <= i < level and 0 <= j < level and board_grid[i][j] == 0)
-        
-        i, j = x - dx, y - dy
-        while 0 <= i < level and 0 <= j < level and board_grid[i][j] == color:
-            count += 1; i -= dx; j -= dy
-        open_end_2 = (0 <= i < level and 0 <= j < level and board_grid[i][j] == 0)
+        if board is not None and board.track_runs:
+            # O(1) read from the board's run-length index
+            count, open_end_1, open_end_2 = board.line_stats(x, y, dx, dy, color)
+        else:
+            count = 1 
+            i, j = x + dx, y + dy
+            while 0 <= i < level and 0 <= j < level and board_grid[i][j] == color:
+                count += 1; i += dx; j += dy
+            open_end_1 = (0 <= i < level and 0 <= j < level and board_grid[i][j] == 0)
+            
+            i, j = x - dx, y - dy
+            while 0 <= i < level and 0 <= j < level and board_grid[i][j] == color:
+                count += 1; i -= dx; j -= dy
+            open_end_2 = (0 <= i < level and 0 <= j < level and board_grid[i][j] == 0)
         
         # [REWARDS FOR CONNECT 6]
         if count == 5 and open_end_1 and open_end_2: extra_reward += 0.6
@@ -68,17 +85,34 @@ def calculate_move_quality(board_grid, x, y, color):
         
     return extra_reward
 
+# [CHANGED] Board, teacher, student and adjudicator are built once per worker process (init_worker)
+# and reset for every game (actor_runtime.py)
+runtime = None
+
+def make_board():
+    # [IMPORTANT] Board with RULE = 6
+    return GameBoard(target_length=TARGET_RULE, track_runs=True, numpy_grid=True, track_frontier=True)
+
+def make_teacher(board):
+    teacher_ai = AIPlayer(target_length=TARGET_RULE, book=get_book(TARGET_RULE))
+    teacher_ai.bind_board(board, incremental=True)
+    return teacher_ai
+
+def init_worker(inference_handle=None):
+    """Pool initializer: this process's ActorRuntime"""
+    global runtime
+    if inference_handle is not None:
+        model = InferenceClient.connect(inference_handle)  # the server holds the current weights
+    else:
+        model = NumpyNet(None) if NUMPY_WORKERS else RL_AIPlayer().model
+    adjudicator = ThreatSolver(target_length=TARGET_RULE, max_nodes=200, time_ms=20) if ADJUDICATE_VCF else None
+    runtime = ActorRuntime(make_board, make_teacher, model, adjudicator, served=inference_handle is not None)
+
 def simulation_worker(args):
     weights, epsilon = args
-    import os
-    os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
-    import tensorflow as tf
-    
-    # [IMPORTANT] Initialize Board and Teacher with RULE = 6
-    board = GameBoard(target_length=TARGET_RULE)
-    teacher_ai = AIPlayer(target_length=TARGET_RULE)
-    student_ai = RL_AIPlayer() 
-    student_ai.model.set_weights(weights)
+    runtime.sync(weights)  # a shared-memory handle only reloads on a new version
+    board, teacher_ai = runtime.new_game()
+    student_ai, adjudicator = runtime.student, runtime.adjudicator
     
     is_observation_mode = (random() < 0.2) 
     if is_observation_mode: p1, p2 = "teacher", "teacher"
@@ -92,14 +126,14 @@ def simulation_worker(args):
     
     while not game_over:
         role = p1 if current_color == 1 else p2
-        state_tensor = student_ai._prepare_input(board.grid, current_color)
+        planes = encode(board.array, current_color)  # [CHANGED] 57-byte packed position (sample_codec.py)
         ax, ay = -1, -1
         move_immediate_reward = 0.0 
         
         if role == "student":
-            if random() < epsilon: ax, ay = student_ai._find_random_empty(board.grid)
-            else: ax, ay = student_ai.get_move(board.grid, current_color)
-            move_immediate_reward = calculate_move_quality(board.grid, ax, ay, current_color)
+            if random() < epsilon: ax, ay = board.random_empty()
+            else: ax, ay = student_ai.get_move(board.array, current_color)
+            move_immediate_reward = calculate_move_quality(board.grid, ax, ay, current_color, board)
         else:
             make_mistake = (p1 == "student") and (random() < TEACHER_MISTAKE_RATE)
             if make_mistake: ax, ay = teacher_ai._find_random_empty(board.grid)
@@ -107,11 +141,8 @@ def simulation_worker(args):
                 ax, ay = teacher_ai.get_move(board.grid, last_xy[0], last_xy[1], current_color)
                 if not board.is_empty(ax, ay): ax, ay = teacher_ai._find_random_empty(board.grid)
                  
-        target_policy = np.zeros(225)
-        target_policy[ax * 15 + ay] = 1.0
-        
         game_history.append({
-            'state': state_tensor, 'policy': target_policy,
+            'planes': planes, 'move': ax * 15 + ay,  # [CHANGED] Sparse policy target, no 225-wide one-hot
             'color': current_color, 'immediate_reward': move_immediate_reward
         })
         
@@ -124,11 +155,37 @@ def simulation_worker(args):
         elif board.is_full():
             winner_color = 0
             game_over = True
+        elif adjudicator is not None and adjudicator.solve(board, -current_color):
+            winner_color = -current_color
+            game_over = True
             
         current_color *= -1
         
     student_played = (p1 == "student")
-    return game_history, winner_color, student_played
+    return pack_history(game_history), winner_color, student_played  # [CHANGED] A few small arrays per game
+
+# --- [NEW] Batched self-play (BATCHED_GAMES > 0): same rules as simulation_worker ---
+def batched_student_color():
+    # 20% observation games (teacher vs teacher), otherwise the student plays black
+    return 0 if random() < 0.2 else 1
+
+def batched_teacher_move(teacher_ai, board, last_xy, color, student_color):
+    if student_color != 0 and random() < TEACHER_MISTAKE_RATE:
+        return board.random_empty()
+    ax, ay = teacher_ai.get_move(board.grid, last_xy[0], last_xy[1], color)
+    if not board.is_empty(ax, ay): ax, ay = board.random_empty()
+    return ax, ay
+
+def batched_worker(args):
+    """(weights, epsilon[, number of games]) -> list of finished games (returned once all have ended),
+    each like a simulation_worker result"""
+    weights, epsilon = args[:2]
+    num_games = args[2] if len(args) > 2 else BATCHED_GAMES
+    runtime.sync(weights)
+    actor = runtime.batched_actor(num_games, batched_student_color, batched_teacher_move, calculate_move_quality,
+                                  target_length=TARGET_RULE)
+    return [(pack_history(history), winner, student_color != 0)
+            for history, winner, student_color in actor.play(num_games, epsilon)]
 
 def train():
     import tensorflow as tf
@@ -147,10 +204,16 @@ def train():
     else:
         print(f"🚀 Starting New Training for Connect-6!")
         student_ai = RL_AIPlayer()
+    student_ai.compile_model()  # [NEW] Sparse policy targets (older saved models use categorical_crossentropy)
     
     # 2. Setup Variables
     num_workers = mp.cpu_count()
-    memory_buffer = []
+    if REPLAY_DIR:
+        replay = ReplayStore(REPLAY_DIR, window=REPLAY_WINDOW)
+        print(f"📼 Replay store {REPLAY_DIR}: {len(replay)} samples")
+    else:
+        replay = ReplayBuffer(REPLAY_CAPACITY, prioritized=PRIORITIZED_REPLAY)
+    trained_upto = replay.added  # replay.added at the last fit
     epsilon = EPSILON_START
     games_completed = 0
     batch_count = 0
@@ -161,19 +224,46 @@ def train():
     recent_draws = 0
     recent_games_count = 0
     
+    server = None
+    if USE_INFERENCE_SERVER:
+        server = InferenceServer(weights=student_ai.model.get_weights(), max_batch=INFERENCE_MAX_BATCH,
+                                 max_wait_us=INFERENCE_MAX_WAIT_US, num_clients=num_workers).start()
+    # [CHANGED] Every worker builds its ActorRuntime once, at startup
+    pool_kwargs = dict(initializer=init_worker, initargs=(server.handle() if server else None,))
+    store = None
+    weights_changed = False
+    if SHARED_WEIGHTS and server is None:
+        store = WeightStore.create(student_ai.model.get_weights())
+
     # 3. Training Loop
-    with mp.Pool(processes=num_workers) as pool:
+    with mp.Pool(processes=num_workers, **pool_kwargs) as pool:
+        play_fn = batched_worker if BATCHED_GAMES > 0 else simulation_worker
+        stream = TaskStream(pool, play_fn, IN_FLIGHT or 2 * num_workers)
         with tqdm(total=NUM_TOTAL_GAMES, unit="game") as pbar:
             while games_completed < NUM_TOTAL_GAMES:
-                current_weights = student_ai.model.get_weights()
-                tasks = [(current_weights, epsilon)] * GAMES_PER_BATCH
-                results = pool.map(simulation_worker, tasks)
+                published = store.bytes_written if store is not None else 0
+                sent = stream.bytes_sent
+                if server is not None:
+                    if weights_changed:
+                        server.set_weights(student_ai.model.get_weights())  # hot swap instead of shipping weights with every task
+                    current_weights = None
+                elif store is not None:
+                    if weights_changed:
+                        store.publish(student_ai.model.get_weights())
+                    current_weights = store.handle()  # a few hundred bytes per task
+                else:
+                    current_weights = student_ai.model.get_weights()
+                weights_changed = False
+                if BATCHED_GAMES > 0:
+                    stream.set_task((current_weights, epsilon, BATCHED_GAMES))
+                else:
+                    stream.set_task((current_weights, epsilon))
                 
-                batch_games_count = len(results)
-                games_completed += batch_games_count
-                pbar.update(batch_games_count)
-                
-                for history, winner, student_played in results:
+                # [CHANGED] Games stream in as they finish instead of pool.map waiting for the slowest one:
+                # the first GAMES_PER_BATCH to finish make the batch, the rest keep running into the next
+                for history, winner, student_played in stream.games(GAMES_PER_BATCH):
+                    games_completed += 1
+                    pbar.update(1)
                     # [NEW] Count wins/losses for the report
                     if student_played:
                         recent_games_count += 1
@@ -187,26 +277,27 @@ def train():
                     elif winner == -1: reward_for_black = -1.0
                     else: reward_for_black = -0.1 
                     
-                    for step in history:
-                        base_val = reward_for_black if step['color'] == 1 else -reward_for_black
-                        final_val = base_val + step['immediate_reward']
-                        final_val = np.clip(final_val, -1.5, 1.5)
-                        aug_data = get_symmetries(step['state'], step['policy'])
-                        for s, p in aug_data: memory_buffer.append((s, p, final_val))
+                    base_val = np.where(history['colors'] == 1, reward_for_black, -reward_for_black)
+                    final_val = np.clip(base_val + history['rewards'], -1.5, 1.5)
+                    replay.add(history['planes'], history['moves'], final_val, history['colors'])
+
+                # [NEW] Bytes sent this batch: pickled tasks + weights written to shared memory
+                batch_bytes = stream.bytes_sent - sent + (store.bytes_written - published if store is not None else 0)
 
                 # Train Model
-                if len(memory_buffer) >= TRAIN_THRESHOLD:
-                    states = np.vstack([m[0] for m in memory_buffer])
-                    policies = np.vstack([m[1] for m in memory_buffer])
-                    values = np.array([m[2] for m in memory_buffer])
-                    student_ai.model.fit(states, {'policy_output': policies, 'value_output': values}, batch_size=512, epochs=1, verbose=0)
-                    memory_buffer = []
+                new_samples = (replay.added - trained_upto) * 8  # Counted as 8 symmetric samples per move, as before
+                if new_samples >= TRAIN_THRESHOLD:
+                    fit_on_replay(student_ai.model, replay, int(new_samples * REPLAY_REUSE), batch_size=512,
+                                  augment=AUGMENT)
+                    trained_upto = replay.added
+                    weights_changed = True
                     if epsilon > EPSILON_END: epsilon *= EPSILON_DECAY
                 
                 # [NEW] Update Progress Bar with Win Rate
                 if recent_games_count > 0:
                     win_rate = (recent_student_wins / recent_games_count) * 100
-                    pbar.set_postfix({'WR': f"{win_rate:.1f}%", 'Eps': f"{epsilon:.2f}"})
+                    pbar.set_postfix({'WR': f"{win_rate:.1f}%", 'Eps': f"{epsilon:.2f}",
+                                      'MB/batch': f"{batch_bytes / 1e6:.2f}"})
 
                 # [NEW] Print Detailed Report
                 batch_count += 1
@@ -222,7 +313,14 @@ def train():
 
                 if batch_count % SAVE_MODEL_EVERY == 0:
                     student_ai.save_model(latest_model_path)
+                    if REPLAY_DIR: replay.flush()
     
+    if server is not None:
+        server.stop()
+    if store is not None:
+        store.close()
+    if REPLAY_DIR:
+        replay.close()
     student_ai.save_model(final_model_path)
     print("Connect 6 Training Complete!")
 
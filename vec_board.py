@@ -0,0 +1,131 @@
+# vec_board.py
+# N games in one (N, 15, 15) int8 array, advanced together one ply at a time.
+# This is the data structure batched self-play is built on: every game's
+# position can go into a single model.predict call.
+
+import numpy as np
+from constants import LEVEL
+
+class VecBoard:
+    """
+    Vectorized counterpart of GameBoard.
+    Cells hold 0 / 1 (Black) / -1 (White); moves are flat indices x * LEVEL + y.
+    Most methods take an optional `games` index array to act on a subset of games.
+    """
+    def __init__(self, num_games, target_length=5):
+        self.num_games = num_games
+        self.level = LEVEL
+        self.target_length = target_length
+        self.boards = np.zeros((num_games, LEVEL, LEVEL), dtype=np.int8)
+        self.move_count = np.zeros(num_games, dtype=np.int32)
+        self.done = np.zeros(num_games, dtype=bool)
+        self.winner = np.zeros(num_games, dtype=np.int8)  # 1 / -1, 0 = draw or still playing
+        self.last_move = np.full((num_games, 2), -1, dtype=np.int32)
+
+    def _games(self, games):
+        return np.arange(self.num_games) if games is None else np.asarray(games)
+
+    # --- Queries ---
+    def legal_mask(self, games=None):
+        """(len(games), LEVEL * LEVEL) bool mask of empty cells; finished games have none."""
+        games = self._games(games)
+        mask = (self.boards[games] == 0).reshape(len(games), -1)
+        mask &= ~self.done[games, None]
+        return mask
+
+    def active_games(self):
+        return np.flatnonzero(~self.done)
+
+    def check_win(self, colors, games=None):
+        """
+        Does `colors[k]` have target_length in a row anywhere on board games[k]?
+        Directional convolution: summing the stone plane shifted 0..L-1 steps
+        along a direction is the valid convolution with a length-L line kernel,
+        and a window sum of L means L stones in a row.
+        """
+        games = self._games(games)
+        colors = np.broadcast_to(np.asarray(colors, dtype=np.int8), games.shape)
+        stones = (self.boards[games] == colors[:, None, None]).astype(np.int8)
+        L = self.target_length
+        n = self.level - L + 1
+        won = np.zeros(len(games), dtype=bool)
+        if n <= 0: return won
+
+        horizontal = np.zeros((len(games), n, self.level), dtype=np.int8)  # along x, direction (1, 0)
+        vertical = np.zeros((len(games), self.level, n), dtype=np.int8)    # along y, direction (0, 1)
+        diagonal = np.zeros((len(games), n, n), dtype=np.int8)             # direction (1, 1)
+        anti_diagonal = np.zeros((len(games), n, n), dtype=np.int8)        # direction (1, -1)
+        for t in range(L):
+            horizontal += stones[:, t:t + n, :]
+            vertical += stones[:, :, t:t + n]
+            diagonal += stones[:, t:t + n, t:t + n]
+            anti_diagonal += stones[:, t:t + n, L - 1 - t:L - 1 - t + n]
+
+        for sums in (horizontal, vertical, diagonal, anti_diagonal):
+            won |= (sums == L).reshape(len(games), -1).any(axis=1)
+        return won
+
+    # --- Moves ---
+    def place(self, moves, colors, games=None):
+        """
+        Place one stone per game. Returns a bool array: False where the cell was
+        taken or the game is already over (nothing is placed there).
+        """
+        games = self._games(games)
+        moves = np.asarray(moves)
+        colors = np.broadcast_to(np.asarray(colors, dtype=np.int8), games.shape)
+        xs, ys = moves // self.level, moves % self.level
+        ok = (self.boards[games, xs, ys] == 0) & ~self.done[games]
+        g = games[ok]
+        self.boards[g, xs[ok], ys[ok]] = colors[ok]
+        self.move_count[g] += 1
+        self.last_move[g, 0] = xs[ok]
+        self.last_move[g, 1] = ys[ok]
+        return ok
+
+    def step(self, moves, colors, games=None):
+        """
+        place() + win / full-board detection. Games that end get done=True and
+        their winner set. Returns (ok, finished) bool arrays aligned with games.
+        """
+        games = self._games(games)
+        colors = np.broadcast_to(np.asarray(colors, dtype=np.int8), games.shape)
+        ok = self.place(moves, colors, games)
+        won = np.zeros(len(games), dtype=bool)
+        if ok.any():
+            won[ok] = self.check_win(colors[ok], games[ok])
+        full = ok & ~won & (self.move_count[games] == self.level * self.level)
+        finished = won | full
+        self.done[games[finished]] = True
+        self.winner[games[won]] = colors[won]
+        return ok, finished
+
+    def reset(self, games=None):
+        games = self._games(games)
+        self.boards[games] = 0
+        self.move_count[games] = 0
+        self.done[games] = False
+        self.winner[games] = 0
+        self.last_move[games] = -1
+
+    def reset_done(self):
+        """Restart every finished game; returns the indices that were reset."""
+        games = np.flatnonzero(self.done)
+        if len(games): self.reset(games)
+        return games
+
+    # --- Network input ---
+    def prepare_input(self, colors, games=None, out=None):
+        """
+        (len(games), LEVEL, LEVEL, 3) float32 batch in RL_AIPlayer._prepare_input
+        layout: own stones, opponent stones, constant 1 plane.
+        """
+        games = self._games(games)
+        colors = np.broadcast_to(np.asarray(colors, dtype=np.int8), games.shape)
+        if out is None:
+            out = np.empty((len(games), self.level, self.level, 3), dtype=np.float32)
+            out[..., 2] = 1.0
+        boards = self.boards[games]
+        np.equal(boards, colors[:, None, None], out=out[..., 0])
+        np.equal(boards, -colors[:, None, None], out=out[..., 1])
+        return out
@@ -0,0 +1,180 @@
+# weight_store.py
+# Versioned copy of the student's weights in multiprocessing.shared_memory.
+# The learner publishes each new version once; tasks carry a small
+# WeightHandle instead of the full weight list, and each worker maps the
+# block once and copies the weights into its model only when the version
+# changed (copies: a model left holding views into the block would change
+# under it on the next publish).
+#
+# Block layout: 64-byte header (sequence u64, version u64), then every
+# array at a 64-byte aligned offset. The sequence number is odd while a
+# write is in progress, so a reader that overlapped a write retries.
+#
+#   python weight_store.py   check that a synced model ignores later publishes until it syncs
+
+import pickle
+from collections import namedtuple
+from multiprocessing import shared_memory
+import numpy as np
+
+_HEADER_BYTES = 64
+_ALIGN = 64
+
+# name: shared memory block, layout: ((shape, dtype str, offset), ...)
+WeightHandle = namedtuple("WeightHandle", ["name", "layout"])
+
+def _layout(weights):
+    layout, offset = [], _HEADER_BYTES
+    for w in weights:
+        w = np.asarray(w)
+        layout.append((tuple(w.shape), w.dtype.str, offset))
+        offset += -(-w.nbytes // _ALIGN) * _ALIGN
+    return tuple(layout), offset
+
+def _attach_block(name):
+    """Map an existing block without letting this process's resource tracker unlink it on exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+    # Older Pythons register every attach; skip that (unregistering instead would also drop the
+    # learner's own registration when the worker shares its tracker)
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None if rtype == "shared_memory" else register(name, rtype)
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+class WeightStore:
+    """
+    Learner: store = WeightStore.create(model.get_weights()); store.publish(new weights); store.close()
+    Worker:  attach(handle).sync(model) (or sync_weights(model, handle)) before playing.
+    """
+    def __init__(self, block, layout, owner):
+        self.block = block
+        self.layout = layout
+        self.owner = owner
+        self._header = np.ndarray((2,), dtype=np.uint64, buffer=block.buf)  # sequence, version
+        self.arrays = [np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf, offset=offset)
+                       for shape, dtype, offset in layout]
+        self._loaded = {}  # id(model) -> (model, version it holds)
+        self.bytes_written = 0  # learner side: bytes copied into the block so far
+
+    @classmethod
+    def create(cls, weights):
+        layout, size = _layout(weights)
+        store = cls(shared_memory.SharedMemory(create=True, size=size), layout, owner=True)
+        store.publish(weights)
+        return store
+
+    @classmethod
+    def attach(cls, handle):
+        return cls(_attach_block(handle.name), handle.layout, owner=False)
+
+    @property
+    def version(self):
+        return int(self._header[1])
+
+    def handle(self):
+        return WeightHandle(self.block.name, self.layout)
+
+    def publish(self, weights):
+        """Write a new version (shapes must match the layout). Returns the version number."""
+        self._header[0] += 1  # odd: write in progress
+        for dst, src in zip(self.arrays, weights):
+            dst[...] = src
+            self.bytes_written += dst.nbytes
+        self._header[1] += 1
+        self._header[0] += 1
+        return self.version
+
+    def sync(self, model):
+        """model.set_weights(current version) unless model already has it. True if it reloaded."""
+        while True:
+            seq = int(self._header[0])
+            version = int(self._header[1])
+            entry = self._loaded.get(id(model))
+            if entry is not None and entry[0] is model and entry[1] == version: return False
+            if seq % 2: continue
+            # Copies, inside the seqlock: a model must never keep views into the block (NumpyNet
+            # would, for arrays it does not need to fold), or a later publish changes it mid-game
+            model.set_weights([a.copy() for a in self.arrays])
+            if int(self._header[0]) == seq: break  # no publish overlapped the copy
+        self._loaded[id(model)] = (model, version)
+        return True
+
+    def close(self):
+        self.arrays = []
+        self._header = None
+        self.block.close()
+        if self.owner:
+            self.block.unlink()
+
+_ATTACHED = {}
+
+def attach(handle):
+    """The process's WeightStore for a handle (mapped once, then reused by every task)."""
+    store = _ATTACHED.get(handle.name)
+    if store is None:
+        store = _ATTACHED[handle.name] = WeightStore.attach(handle)
+    return store
+
+def sync_weights(model, weights):
+    """
+    A task's weights into model: a WeightHandle only reloads when the shared version changed,
+    a plain weight list (the old way) is always set. True if the model was changed.
+    """
+    if weights is None: return False
+    if isinstance(weights, WeightHandle):
+        return attach(weights).sync(model)
+    model.set_weights(weights)
+    return True
+
+def task_bytes(tasks):
+    """Pickled size of a task list, i.e. what pool.map sends to the workers (repeated tasks pickled once)."""
+    sizes, total = {}, 0
+    for task in tasks:
+        size = sizes.get(id(task))
+        if size is None:
+            size = sizes[id(task)] = len(pickle.dumps(task, protocol=pickle.HIGHEST_PROTOCOL))
+        total += size
+    return total
+
+def _random_weights(rng):
+    """get_weights()-shaped random arrays for RL_AIPlayer._build_model (no TensorFlow needed)."""
+    from constants import LEVEL
+    weights, channels = [], 3
+    for _ in range(3):
+        weights += [rng.standard_normal((3, 3, channels, 64)), rng.standard_normal(64),
+                    rng.random(64) + 0.5, rng.standard_normal(64), rng.standard_normal(64), rng.random(64) + 0.5]
+        channels = 64
+    weights += [rng.standard_normal((1, 1, 64, 2)), rng.standard_normal(2),
+                rng.standard_normal((1, 1, 64, 1)), rng.standard_normal(1),
+                rng.standard_normal((2 * LEVEL * LEVEL, LEVEL * LEVEL)), rng.standard_normal(LEVEL * LEVEL),
+                rng.standard_normal((LEVEL * LEVEL, 64)), rng.standard_normal(64),
+                rng.standard_normal((64, 1)), rng.standard_normal(1)]
+    return [(w * 0.1).astype(np.float32) for w in weights]
+
+if __name__ == "__main__":
+    # Check: a model synced from the store keeps its weights until the next sync, whatever is published
+    from numpy_net import NumpyNet
+    from constants import LEVEL
+    rng = np.random.default_rng(0)
+    store = WeightStore.create(_random_weights(rng))
+    try:
+        worker = attach(store.handle())
+        model = NumpyNet(None)
+        assert worker.sync(model)
+        batch = rng.integers(0, 2, (4, LEVEL, LEVEL, 3)).astype(np.float32)
+        before = model.predict(batch)
+        store.publish(_random_weights(rng))
+        after = model.predict(batch)
+        assert all(np.array_equal(b, a) for b, a in zip(before, after)), "publish changed a synced model"
+        assert worker.sync(model) and not np.array_equal(model.predict(batch)[0], before[0])
+        print("✅ synced models are unaffected by later publishes until they sync again")
+    finally:
+        _ATTACHED.clear()
+        worker.close()
+        store.close()
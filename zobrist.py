@@ -0,0 +1,43 @@
+# zobrist.py
+# 64-bit Zobrist keys shared by GameBoard and GoEngine.
+# A position hash = XOR of one key per stone, SIDE_KEY when White (-1) is to
+# move, and the key of the rule being played (4 / 5 / 6 in a row, or 'go').
+
+import random
+from constants import LEVEL
+
+# Fixed seed: hashes must agree between processes and across runs
+_rng = random.Random(0x15B0A4D)
+
+STONE_KEYS = {
+    1: [_rng.getrandbits(64) for _ in range(LEVEL * LEVEL)],
+    -1: [_rng.getrandbits(64) for _ in range(LEVEL * LEVEL)],
+}
+SIDE_KEY = _rng.getrandbits(64)
+
+_RULE_KEYS = {}
+
+def rule_key(rule):
+    """Key for a rule (target length or 'go'); derived from the rule itself so it is stable."""
+    key = _RULE_KEYS.get(rule)
+    if key is None:
+        key = random.Random(f"zobrist-rule:{rule}").getrandbits(64)
+        _RULE_KEYS[rule] = key
+    return key
+
+def stone_key(color, idx):
+    """Key of a stone at flat index idx (x * LEVEL + y); any positive color counts as Black."""
+    return STONE_KEYS[1 if color > 0 else -1][idx]
+
+def hash_grid(grid, side_to_move=1, rule=None):
+    """Full (non-incremental) hash of a grid, for checks and for boards built from a grid."""
+    h = 0
+    for x, row in enumerate(grid):
+        for y, color in enumerate(row):
+            if color != 0:
+                h ^= stone_key(color, x * LEVEL + y)
+    if side_to_move < 0:
+        h ^= SIDE_KEY
+    if rule is not None:
+        h ^= rule_key(rule)
+    return h